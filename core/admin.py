@@ -2,6 +2,8 @@
 Admin configuration for core models.
 """
 
+import json
+
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.contrib.auth.models import User
@@ -9,7 +11,7 @@ from django.utils.translation import gettext_lazy as _
 from django.utils.html import format_html
 from django.urls import reverse
 
-from .models import Company, Profile, Seller, VendorBill, Order
+from .models import Company, Job, Profile, Seller, SellerSyncSchedule, VendorBill, Order
 
 
 @admin.register(Company)
@@ -265,7 +267,7 @@ class OrderAdmin(admin.ModelAdmin):
     list_display = ['order_id', 'seller', 'order_type', 'status_code', 'payment_mode', 'total', 'order_created_at', 'days_to_deliver']
     list_filter = ['order_type', 'status_code', 'payment_mode', 'is_delayed', 'delay_category', 'seller']
     search_fields = ['order_id', 'seller__name', 'customer_first_name', 'customer_last_name', 'customer_email']
-    readonly_fields = ['order_id', 'omniful_id', 'created_at', 'updated_at', 'days_to_deliver', 'is_delayed', 'delay_category']
+    readonly_fields = ['order_id', 'omniful_id', 'created_at', 'updated_at', 'days_to_deliver', 'is_delayed', 'delay_category', 'raw_payload']
     ordering = ['-order_created_at']
     
     fieldsets = (
@@ -285,11 +287,42 @@ class OrderAdmin(admin.ModelAdmin):
             'fields': ('shipping_city', 'shipping_region', 'shipping_country', 'delivery_status')
         }),
         (_('Raw Data'), {
-            'fields': ('raw_data',),
+            'fields': ('raw_payload',),
             'classes': ('collapse',)
         }),
         (_('Timestamps'), {
             'fields': ('created_at', 'updated_at'),
             'classes': ('collapse',)
         }),
-    )
\ No newline at end of file
+    )
+
+    def raw_payload(self, obj):
+        # Only the change form shows this, so the payload table is read per order
+        return format_html('<pre>{}</pre>', json.dumps(obj.raw_data, indent=2))
+    raw_payload.short_description = _('Raw data')
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    """Queued and finished background jobs (read-only)."""
+
+    list_display = ['id', 'job_type', 'status', 'requested_by', 'worker',
+                    'created_at', 'started_at', 'finished_at']
+    list_filter = ['status', 'job_type']
+    search_fields = ['job_type', 'worker']
+    readonly_fields = [f.name for f in Job._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(SellerSyncSchedule)
+class SellerSyncScheduleAdmin(admin.ModelAdmin):
+    """Order sync schedule per seller; tick ``force`` to sync one on the next run."""
+
+    list_display = ['seller', 'orders_per_hour', 'interval_minutes',
+                    'last_synced_at', 'next_sync_at', 'force']
+    list_editable = ['force']
+    list_select_related = ['seller']
+    ordering = ['next_sync_at']
+    readonly_fields = ['orders_per_hour', 'interval_minutes', 'last_synced_at', 'next_sync_at']
@@ -25,15 +25,16 @@ class SyncSellersCronJob(CronJobBase):
         call_command('sync_sellers')
 
 
-# Sync Orders every 25 minutes
+# Look for due sellers every 5 minutes; each seller's own interval follows
+# its order velocity (see core.utils.scheduling)
 class SyncOrdersCronJob(CronJobBase):
-    RUN_EVERY_MINS = 25  # Run every 30 minutes
+    RUN_EVERY_MINS = 5
     schedule = Schedule(run_every_mins=RUN_EVERY_MINS)
     code = 'core.sync_orders_cron'
 
     def do(self):
         logging.info("Running Sync Orders Cron Job")
-        call_command('sync_orders')
+        call_command('sync_orders', scheduled=True)
 
 
 # Sync Bills every 35 minutes
@@ -45,3 +46,26 @@ class SyncBillsCronJob(CronJobBase):
     def do(self):
         logging.info("Running Sync Bills Cron Job")
         call_command('sync_bills')
+
+
+# Webhook events are normally applied by a queued job right away; this
+# catches anything left behind (e.g. while no worker was running)
+class DrainOrderEventsCronJob(CronJobBase):
+    RUN_EVERY_MINS = 5
+    schedule = Schedule(run_every_mins=RUN_EVERY_MINS)
+    code = 'core.drain_order_events_cron'
+
+    def do(self):
+        logging.info("Running Drain Order Events Cron Job")
+        call_command('drain_order_events')
+
+
+# Apply the sync log retention policy once a day
+class CleanupSyncLogsCronJob(CronJobBase):
+    RUN_EVERY_MINS = 24 * 60
+    schedule = Schedule(run_every_mins=RUN_EVERY_MINS)
+    code = 'core.cleanup_sync_logs_cron'
+
+    def do(self):
+        logging.info("Running Cleanup Sync Logs Cron Job")
+        call_command('cleanup_sync_logs')
@@ -0,0 +1,85 @@
+"""
+Micro-benchmark of core.utils.dates against the per-command parsers it replaced.
+"""
+
+import timeit
+from datetime import datetime
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from core.utils.dates import _parse_cached, cache_info, parse_omniful_datetime
+
+
+# One representative value per format, repeated the way a sync sees them
+SAMPLES = {
+    'order ISO': ['2024-11-%02dT08:15:30.%03dZ' % (d % 28 + 1, d) for d in range(500)],
+    'bill listing': ['Nov %02d, 2024 08:15:30 AM' % (d % 28 + 1) for d in range(500)],
+    'bill created_at': ['November %02d, 2024 08:15 PM' % (d % 28 + 1) for d in range(500)],
+    'bill period': ['November 01, 2024'] * 500,
+}
+
+
+def legacy_sync_all_orders(date_str):
+    """Hand-padded ISO parsing formerly in sync_all_orders."""
+    if 'Z' in date_str:
+        date_str = date_str.replace('Z', '+00:00')
+    if '+00:00' in date_str and '.' in date_str:
+        parts = date_str.split('.')
+        if len(parts) == 2:
+            ms_part = parts[1].split('+')[0]
+            if len(ms_part) < 6:
+                ms_part = ms_part.ljust(6, '0')
+            date_str = f"{parts[0]}.{ms_part}+00:00"
+    return datetime.fromisoformat(date_str)
+
+
+def legacy_strptime(fmt):
+    """strptime + make_aware as in sync_bills, refresh_bill and fix_all_dates."""
+    def parse(date_str):
+        return timezone.make_aware(datetime.strptime(date_str, fmt))
+    return parse
+
+
+LEGACY = {
+    'order ISO': legacy_sync_all_orders,
+    'bill listing': legacy_strptime('%b %d, %Y %I:%M:%S %p'),
+    'bill created_at': legacy_strptime('%B %d, %Y %I:%M %p'),
+    'bill period': legacy_strptime('%B %d, %Y'),
+}
+
+
+class Command(BaseCommand):
+    help = 'Benchmark shared Omniful date parsing against the legacy code paths'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rounds',
+            type=int,
+            default=20,
+            help='Times each sample list is parsed (default: 20)',
+        )
+
+    def handle(self, *args, **options):
+        rounds = options['rounds']
+        self.stdout.write(f'{"format":<16} {"legacy":>10} {"uncached":>10} {"cached":>10}  (µs/value)')
+
+        for name, values in SAMPLES.items():
+            legacy = LEGACY[name]
+            # Check both paths agree before timing them
+            for value in set(values):
+                if legacy(value) != parse_omniful_datetime(value):
+                    self.stdout.write(self.style.ERROR(f'Mismatch for {value!r}'))
+                    return
+
+            count = len(values) * rounds
+            legacy_time = timeit.timeit(lambda: [legacy(v) for v in values], number=rounds)
+            uncached_time = timeit.timeit(
+                lambda: [_parse_cached.__wrapped__(v) for v in values], number=rounds)
+            cached_time = timeit.timeit(
+                lambda: [parse_omniful_datetime(v) for v in values], number=rounds)
+
+            self.stdout.write(
+                f'{name:<16} {legacy_time / count * 1e6:>10.2f} '
+                f'{uncached_time / count * 1e6:>10.2f} {cached_time / count * 1e6:>10.2f}'
+            )
+
+        self.stdout.write(self.style.SUCCESS(f'Cache: {cache_info()}'))
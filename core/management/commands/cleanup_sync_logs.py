@@ -1,15 +1,41 @@
+from django.conf import settings
 from django.core.management.base import BaseCommand
-from core.models import SyncLog
+from django.db.models import Max
+from core.models import Job, JobProgress, OrderEvent, SyncLog
 from django.utils import timezone
 from datetime import timedelta
 
 
 class Command(BaseCommand):
-    help = "Delete completed sync logs older than 5 minutes"
+    help = ("Delete sync log and job progress runs, finished jobs and applied order events "
+            "older than SYNC_LOG_RETENTION_DAYS, keeping the latest run of each sync")
 
-    def handle(self, *args, **kwargs):
-        threshold = timezone.now() - timedelta(minutes=5)
-        deleted, _ = SyncLog.objects.filter(
-            completed=True, updated_at__lt=threshold).delete()
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=settings.SYNC_LOG_RETENTION_DAYS,
+            help='Keep runs newer than this many days (default: SYNC_LOG_RETENTION_DAYS)',
+        )
+
+    def handle(self, *args, **options):
+        threshold = timezone.now() - timedelta(days=options['days'])
+        # The pages show the last run of each sync, however old it is
+        latest_ids = SyncLog.objects.values('key').annotate(latest=Max('id')).values('latest')
+        deleted, by_model = SyncLog.objects.filter(
+            created_at__lt=threshold).exclude(id__in=latest_ids).delete()
         self.stdout.write(self.style.SUCCESS(
-            f"🧹 Deleted {deleted} old sync logs."))
+            f"🧹 Deleted {by_model.get('core.SyncLog', 0)} old sync logs "
+            f"({by_model.get('core.SyncLogChunk', 0)} chunks)."))
+
+        latest_ids = JobProgress.objects.values('job').annotate(latest=Max('id')).values('latest')
+        deleted, _ = JobProgress.objects.filter(
+            started_at__lt=threshold).exclude(id__in=latest_ids).delete()
+        self.stdout.write(self.style.SUCCESS(f"🧹 Deleted {deleted} old job progress runs."))
+
+        deleted, _ = Job.objects.filter(
+            status__in=[Job.SUCCEEDED, Job.FAILED], finished_at__lt=threshold).delete()
+        self.stdout.write(self.style.SUCCESS(f"🧹 Deleted {deleted} finished jobs."))
+
+        deleted, _ = OrderEvent.objects.filter(processed_at__lt=threshold).delete()
+        self.stdout.write(self.style.SUCCESS(f"🧹 Deleted {deleted} applied order events."))
@@ -2,10 +2,8 @@
 Debug command to check bill API response structure.
 """
 
-import requests
 from django.core.management.base import BaseCommand
-from django.conf import settings
-from decouple import config
+from core.utils.omniful_client import get_client
 import json
 
 
@@ -17,21 +15,17 @@ class Command(BaseCommand):
     
     def handle(self, *args, **options):
         bill_name = options['bill_name']
-        token = config('OMNIFUL_ACCESS_TOKEN', default='')
+        client = get_client()
         
-        if not token:
+        if not client.has_token:
             self.stdout.write(self.style.ERROR('OMNIFUL_ACCESS_TOKEN not configured'))
             return
         
-        headers = {
-            'Authorization': f'Bearer {token}'
-        }
-        
-        url = f'https://prodapi.omniful.com/sales-channel/public/v1/tenants/bills/{bill_name}'
+        path = f'/tenants/bills/{bill_name}'
         
         try:
-            self.stdout.write(f'Fetching: {url}')
-            response = requests.get(url, headers=headers, timeout=30)
+            self.stdout.write(f'Fetching: {client.url(path)}')
+            response = client.get(path)
             self.stdout.write(f'Status: {response.status_code}')
             
             if response.status_code == 200:
@@ -0,0 +1,27 @@
+"""
+Management command to apply webhook order events from the inbox.
+"""
+
+from django.core.management.base import BaseCommand
+from core.utils.dashboard_cache import bumps_data_version
+from core.utils.leases import exclusive
+from core.utils.order_events import drain_events
+
+
+class Command(BaseCommand):
+    help = 'Apply pending Omniful order events received by the webhook'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch',
+            type=int,
+            default=500,
+            help='Events applied per transaction (default: 500)',
+        )
+
+    @exclusive('drain_order_events')
+    @bumps_data_version
+    def handle(self, *args, **options):
+        applied, failed = drain_events(options['batch'], log=self.stdout.write)
+        style = self.style.WARNING if failed else self.style.SUCCESS
+        self.stdout.write(style(f'Applied {applied} order events, {failed} failed'))
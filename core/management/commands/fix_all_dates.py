@@ -2,15 +2,16 @@
 Management command to fix all bill dates with progress feedback.
 """
 
-import requests
-import time
-import json
-from datetime import datetime
 from django.core.management.base import BaseCommand
-from django.utils import timezone
-from django.db import connection
 from core.models import VendorBill
-from decouple import config
+from core.utils.dashboard_cache import bumps_data_version, record_changes
+from core.utils.dates import parse_omniful_datetime
+from core.utils.omniful_client import get_client
+from core.utils.progress import FIX_DATES_DEFAULTS, ProgressReporter
+
+
+# JobProgress.job of this command
+PROGRESS_JOB = 'fix_all_dates'
 
 
 class Command(BaseCommand):
@@ -23,140 +24,115 @@ class Command(BaseCommand):
             default=20,
             help='Number of bills to process in each batch (default: 20)',
         )
+        parser.add_argument(
+            '--run_id',
+            type=str,
+            help='Report progress on this JobProgress run (created by the page '
+                 'that started the fix); a new run is created by default',
+        )
     
+    @bumps_data_version
     def handle(self, *args, **options):
-        token = config('OMNIFUL_ACCESS_TOKEN', default='')
-        
-        if not token:
-            self.stdout.write(self.style.ERROR('OMNIFUL_ACCESS_TOKEN not configured'))
-            return
+        with ProgressReporter(PROGRESS_JOB, data=FIX_DATES_DEFAULTS, run_id=options['run_id']) as reporter:
+            client = get_client()
         
-        headers = {
-            'Authorization': f'Bearer {token}'
-        }
+            if not client.has_token:
+                self.stdout.write(self.style.ERROR('OMNIFUL_ACCESS_TOKEN not configured'))
+                reporter.finish(error='OMNIFUL_ACCESS_TOKEN not configured')
+                return
         
-        batch_size = options['batch']
+            batch_size = options['batch']
         
-        # Count total bills
-        total_bills = VendorBill.objects.count()
-        self.stdout.write(f'Total bills to process: {total_bills}')
+            # Count total bills
+            total_bills = VendorBill.objects.count()
+            self.stdout.write(f'Total bills to process: {total_bills}')
+            reporter.update(total=total_bills)
         
-        # Process in batches
-        processed = 0
-        success_count = 0
-        error_count = 0
+            # Process in batches
+            processed = 0
+            success_count = 0
+            error_count = 0
         
-        while processed < total_bills:
-            # Get next batch
-            bills = VendorBill.objects.all()[processed:processed+batch_size]
-            if not bills:
-                break
+            while processed < total_bills:
+                # Get next batch
+                bills = VendorBill.objects.all()[processed:processed+batch_size]
+                if not bills:
+                    break
                 
-            self.stdout.write(f'Processing batch {processed//batch_size + 1} ({len(bills)} bills)...')
+                self.stdout.write(f'Processing batch {processed//batch_size + 1} ({len(bills)} bills)...')
             
-            for i, bill in enumerate(bills):
-                try:
-                    self.stdout.write(f'  [{processed+i+1}/{total_bills}] Updating {bill.name}...')
-                    url = f'https://prodapi.omniful.com/sales-channel/public/v1/tenants/bills/{bill.name}'
-                    
-                    response = requests.get(url, headers=headers, timeout=30)
-                    response.raise_for_status()
-                    data = response.json()
+                for i, bill in enumerate(bills):
+                    try:
+                        self.stdout.write(f'  [{processed+i+1}/{total_bills}] Updating {bill.name}...')
+                        data = client.get_json(f'/tenants/bills/{bill.name}')
                     
-                    bill_data = data.get('data', {})
+                        bill_data = data.get('data', {})
                     
-                    # Parse created_at date
-                    created_at_str = bill_data.get('created_at')
-                    if created_at_str:
-                        try:
-                            created_at = datetime.strptime(created_at_str, '%B %d, %Y %I:%M %p')
-                            created_at_aware = timezone.make_aware(created_at)
+                        # Parse created_at date
+                        created_at_str = bill_data.get('created_at')
+                        if created_at_str:
+                            try:
+                                created_at_aware = parse_omniful_datetime(created_at_str)
+                                if created_at_aware is None:
+                                    raise ValueError(f'Unrecognised date {created_at_str!r}')
+                                bill.created_at_api = created_at_aware
                             
-                            # Update directly in the database
-                            with connection.cursor() as cursor:
-                                cursor.execute(
-                                    "UPDATE core_vendorbill SET created_at = %s WHERE name = %s",
-                                    [created_at_aware, bill.name]
-                                )
+                                # Also update other fields
+                                if bill_data.get('status'):
+                                    bill.status = bill_data.get('status')
                             
-                            # Also update other fields
-                            if bill_data.get('status'):
-                                bill.status = bill_data.get('status')
-                            
-                            if bill_data.get('currency'):
-                                bill.currency = bill_data.get('currency')
+                                if bill_data.get('currency'):
+                                    bill.currency = bill_data.get('currency')
                                 
-                            if bill_data.get('grand_total'):
-                                bill.grand_total = bill_data.get('grand_total')
+                                if bill_data.get('grand_total'):
+                                    bill.grand_total = bill_data.get('grand_total')
                                 
-                            if bill_data.get('contract_name'):
-                                bill.contract_name = bill_data.get('contract_name')
+                                if bill_data.get('contract_name'):
+                                    bill.contract_name = bill_data.get('contract_name')
                                 
-                            # Parse period dates
-                            if bill_data.get('period_start_date'):
-                                try:
-                                    bill.period_start_date = datetime.strptime(
-                                        bill_data['period_start_date'], '%B %d, %Y'
-                                    ).date()
-                                except:
-                                    pass
-                                    
-                            if bill_data.get('period_end_date'):
-                                try:
-                                    bill.period_end_date = datetime.strptime(
-                                        bill_data['period_end_date'], '%B %d, %Y'
-                                    ).date()
-                                except:
-                                    pass
-                                    
-                            if bill_data.get('due_date'):
-                                try:
-                                    bill.due_date = datetime.strptime(
-                                        bill_data['due_date'], '%B %d, %Y'
-                                    ).date()
-                                except:
-                                    pass
+                                # Parse period dates
+                                for field in ('period_start_date', 'period_end_date', 'due_date'):
+                                    parsed = parse_omniful_datetime(bill_data.get(field))
+                                    if parsed:
+                                        setattr(bill, field, parsed)
                             
-                            # Save the model to update other fields
-                            bill.save()
+                                # One save writes created_at_api and the other fields
+                                bill.save()
+                                record_changes()
                             
-                            self.stdout.write(f'    Updated: {created_at_aware}')
-                            success_count += 1
-                        except Exception as e:
-                            self.stdout.write(self.style.ERROR(f'    Error parsing date: {str(e)}'))
+                                self.stdout.write(f'    Updated: {created_at_aware}')
+                                success_count += 1
+                            except Exception as e:
+                                self.stdout.write(self.style.ERROR(f'    Error parsing date: {str(e)}'))
+                                error_count += 1
+                        else:
+                            self.stdout.write('    No created_at date in API response')
                             error_count += 1
-                    else:
-                        self.stdout.write('    No created_at date in API response')
-                        error_count += 1
                         
-                except Exception as e:
-                    self.stdout.write(self.style.ERROR(f'    Error updating {bill.name}: {str(e)}'))
-                    error_count += 1
-                
-                # Add a small delay to avoid overwhelming the API
-                time.sleep(0.2)
-            
-            # Update processed count
-            processed += len(bills)
-            self.stdout.write(f'Completed batch: {processed}/{total_bills} bills processed')
+                    except Exception as e:
+                        self.stdout.write(self.style.ERROR(f'    Error updating {bill.name}: {str(e)}'))
+                        error_count += 1
             
-            # Write progress to a file for the web UI to read
-            progress = {
-                'total': total_bills,
-                'processed': processed,
-                'success': success_count,
-                'errors': error_count,
-                'percentage': round((processed / total_bills) * 100, 1)
-            }
+                # Update processed count
+                processed += len(bills)
+                self.stdout.write(f'Completed batch: {processed}/{total_bills} bills processed')
             
-            try:
-                with open('date_fix_progress.json', 'w') as f:
-                    json.dump(progress, f)
-            except:
-                pass
+                # Report progress for the web UI
+                reporter.update(
+                    processed=processed,
+                    success=success_count,
+                    errors=error_count,
+                    percentage=round((processed / total_bills) * 100, 1),
+                )
         
-        self.stdout.write(
-            self.style.SUCCESS(
-                f'Completed: {success_count} successful, {error_count} errors'
+            reporter.finish(
+                processed=processed,
+                success=success_count,
+                errors=error_count,
+                percentage=100 if total_bills else 0,
+            )
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f'Completed: {success_count} successful, {error_count} errors'
+                )
             )
-        )
\ No newline at end of file
@@ -2,14 +2,12 @@
 Management command to fix bill dates directly in the database.
 """
 
-import requests
-import time
-from datetime import datetime
 from django.core.management.base import BaseCommand
-from django.utils import timezone
 from django.db import connection
 from core.models import VendorBill
-from decouple import config
+from core.utils.dashboard_cache import bumps_data_version, record_changes
+from core.utils.dates import parse_omniful_datetime
+from core.utils.omniful_client import get_client
 
 
 class Command(BaseCommand):
@@ -28,17 +26,14 @@ class Command(BaseCommand):
             help='Force update all bills even if they already have dates',
         )
     
+    @bumps_data_version
     def handle(self, *args, **options):
-        token = config('OMNIFUL_ACCESS_TOKEN', default='')
+        client = get_client()
         
-        if not token:
+        if not client.has_token:
             self.stdout.write(self.style.ERROR('OMNIFUL_ACCESS_TOKEN not configured'))
             return
         
-        headers = {
-            'Authorization': f'Bearer {token}'
-        }
-        
         limit = options['limit']
         force = options['force']
         
@@ -48,7 +43,7 @@ class Command(BaseCommand):
             self.stdout.write(f'Forcing update for {len(bills)} bills...')
         else:
             # Get bills with default dates (likely from today)
-            bills = VendorBill.objects.filter(created_at__year=2025, created_at__month=7)[:limit]
+            bills = VendorBill.objects.filter(created_at_api__year=2025, created_at_api__month=7)[:limit]
             self.stdout.write(f'Found {len(bills)} bills with incorrect dates...')
         
         success_count = 0
@@ -57,11 +52,7 @@ class Command(BaseCommand):
         for i, bill in enumerate(bills):
             try:
                 self.stdout.write(f'[{i+1}/{len(bills)}] Updating {bill.name}...')
-                url = f'https://prodapi.omniful.com/sales-channel/public/v1/tenants/bills/{bill.name}'
-                
-                response = requests.get(url, headers=headers, timeout=30)
-                response.raise_for_status()
-                data = response.json()
+                data = client.get_json(f'/tenants/bills/{bill.name}')
                 
                 bill_data = data.get('data', {})
                 
@@ -69,17 +60,19 @@ class Command(BaseCommand):
                 created_at_str = bill_data.get('created_at')
                 if created_at_str:
                     try:
-                        created_at = datetime.strptime(created_at_str, '%B %d, %Y %I:%M %p')
-                        created_at_aware = timezone.make_aware(created_at)
+                        created_at_aware = parse_omniful_datetime(created_at_str)
+                        if created_at_aware is None:
+                            raise ValueError(f'Unrecognised date {created_at_str!r}')
                         
                         # Update directly in the database for reliability
                         with connection.cursor() as cursor:
                             cursor.execute(
-                                "UPDATE core_vendorbill SET created_at = %s WHERE name = %s",
+                                "UPDATE core_vendorbill SET created_at_api = %s WHERE name = %s",
                                 [created_at_aware, bill.name]
                             )
+                            record_changes(cursor.rowcount)
                         
-                        self.stdout.write(f'  Updated created_at: {created_at_aware} (was: {bill.created_at})')
+                        self.stdout.write(f'  Updated created_at: {created_at_aware} (was: {bill.created_at_api})')
                         success_count += 1
                     except Exception as e:
                         self.stdout.write(self.style.ERROR(f'  Error parsing date: {str(e)}'))
@@ -87,9 +80,6 @@ class Command(BaseCommand):
                 else:
                     self.stdout.write('  No created_at date in API response')
                     error_count += 1
-                
-                # Add a small delay to avoid overwhelming the API
-                time.sleep(0.5)
                     
             except Exception as e:
                 self.stdout.write(self.style.ERROR(f'Error updating {bill.name}: {str(e)}'))
@@ -0,0 +1,71 @@
+"""
+Management command to recompute the daily order rollups over a date range.
+"""
+
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from core.models import Order, Seller
+from core.utils.rollups import ROLLUP_TZ, rebuild_rollups, rollup_day
+
+
+def parse_day(value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise CommandError(f'Invalid date {value!r}, expected YYYY-MM-DD')
+
+
+class Command(BaseCommand):
+    help = 'Recompute daily order rollups (Asia/Riyadh days) from the orders table'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--from',
+            dest='date_from',
+            help='First day to rebuild, YYYY-MM-DD (default: day of the oldest order)',
+        )
+        parser.add_argument(
+            '--to',
+            dest='date_to',
+            help='Last day to rebuild, YYYY-MM-DD (default: today)',
+        )
+        parser.add_argument(
+            '--sellers',
+            nargs='+',
+            metavar='CODE',
+            help='Only rebuild these sellers (default: all)',
+        )
+
+    def handle(self, *args, **options):
+        orders = Order.objects.all()
+        seller_ids = None
+        if options['sellers']:
+            seller_ids = list(Seller.objects.filter(code__in=options['sellers'])
+                              .values_list('pk', flat=True))
+            if not seller_ids:
+                raise CommandError('No seller with these codes')
+            orders = orders.filter(seller_id__in=seller_ids)
+
+        bounds = orders.aggregate(oldest=Min('order_created_at'), newest=Max('order_created_at'))
+        if options['date_from']:
+            date_from = parse_day(options['date_from'])
+        elif bounds['oldest']:
+            date_from = rollup_day(bounds['oldest'])
+        else:
+            self.stdout.write('No orders to roll up')
+            return
+        if options['date_to']:
+            date_to = parse_day(options['date_to'])
+        else:
+            date_to = max(timezone.localtime(timezone=ROLLUP_TZ).date(),
+                          rollup_day(bounds['newest']) if bounds['newest'] else date_from)
+        if date_to < date_from:
+            raise CommandError('--to is before --from')
+
+        self.stdout.write(f'Rebuilding order rollups from {date_from} to {date_to}')
+        written = rebuild_rollups(date_from, date_to, seller_ids, log=self.stdout.write)
+        self.stdout.write(self.style.SUCCESS(f'Wrote {written} rollup rows'))
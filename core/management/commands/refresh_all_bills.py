@@ -5,6 +5,7 @@ Management command to refresh all vendor bills with detailed data from Omniful A
 from django.core.management.base import BaseCommand
 from django.core.management import call_command
 from core.models import VendorBill
+from core.utils.dashboard_cache import bumps_data_version
 
 
 class Command(BaseCommand):
@@ -18,6 +19,7 @@ class Command(BaseCommand):
             help='Limit number of bills to refresh (default: 10)',
         )
     
+    @bumps_data_version
     def handle(self, *args, **options):
         limit = options['limit']
         
@@ -3,13 +3,12 @@ Management command to refresh a specific vendor bill from Omniful API.
 """
 
 import requests
-from datetime import datetime
 from decimal import Decimal
 from django.core.management.base import BaseCommand
-from django.conf import settings
-from django.utils import timezone
 from core.models import VendorBill
-from decouple import config
+from core.utils.dashboard_cache import bumps_data_version, record_changes
+from core.utils.dates import parse_omniful_datetime
+from core.utils.omniful_client import get_client
 
 
 class Command(BaseCommand):
@@ -18,12 +17,13 @@ class Command(BaseCommand):
     def add_arguments(self, parser):
         parser.add_argument('bill_name', type=str, help='Bill name to refresh')
     
+    @bumps_data_version
     def handle(self, *args, **options):
         bill_name = options['bill_name']
         
-        token = config('OMNIFUL_ACCESS_TOKEN', default='')
+        client = get_client()
         
-        if not token:
+        if not client.has_token:
             self.stdout.write(self.style.ERROR('OMNIFUL_ACCESS_TOKEN not configured'))
             return
         
@@ -33,17 +33,9 @@ class Command(BaseCommand):
             self.stdout.write(self.style.ERROR(f'Bill not found: {bill_name}'))
             return
         
-        headers = {
-            'Authorization': f'Bearer {token}'
-        }
-        
-        url = f'https://prodapi.omniful.com/sales-channel/public/v1/tenants/bills/{bill_name}'
-        
         try:
             self.stdout.write(f'Fetching bill details for: {bill_name}')
-            response = requests.get(url, headers=headers, timeout=30)
-            response.raise_for_status()
-            data = response.json()
+            data = client.get_json(f'/tenants/bills/{bill_name}')
             
             self.stdout.write('Successfully fetched bill data from API')
             
@@ -69,38 +61,23 @@ class Command(BaseCommand):
             bill.currency = bill_data.get('currency', 'SAR')
             
             # Parse dates (Omniful format: "November 01, 2024")
-            if bill_data.get('period_start_date'):
-                try:
-                    bill.period_start_date = datetime.strptime(bill_data['period_start_date'], '%B %d, %Y').date()
-                except:
-                    pass
-            
-            if bill_data.get('period_end_date'):
-                try:
-                    bill.period_end_date = datetime.strptime(bill_data['period_end_date'], '%B %d, %Y').date()
-                except:
-                    pass
-            
-            if bill_data.get('due_date'):
-                try:
-                    bill.due_date = datetime.strptime(bill_data['due_date'], '%B %d, %Y').date()
-                except:
-                    pass
+            for field in ('period_start_date', 'period_end_date', 'due_date'):
+                parsed = parse_omniful_datetime(bill_data.get(field))
+                if parsed:
+                    setattr(bill, field, parsed)
             
-            bill.finalised_on = bill_data.get('finalised_on', '')
+            bill.finalised_on = parse_omniful_datetime(bill_data.get('finalised_on'))
             bill.finalised_by = bill_data.get('finalised_by', '')
             bill.remark = bill_data.get('remark', '')
             bill.pdf = bill_data.get('pdf', '')
             
             # Parse created_at date from API
-            if bill_data.get('created_at'):
-                try:
-                    api_created_at = datetime.strptime(bill_data['created_at'], '%B %d, %Y %I:%M %p')
-                    bill.created_at = timezone.make_aware(api_created_at)
-                except:
-                    pass
+            api_created_at = parse_omniful_datetime(bill_data.get('created_at'))
+            if api_created_at:
+                bill.created_at_api = api_created_at
             
             bill.save()
+            record_changes()
             
             self.stdout.write(
                 self.style.SUCCESS(f'Successfully refreshed bill: {bill_name}')
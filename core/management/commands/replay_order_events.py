@@ -0,0 +1,86 @@
+"""
+Management command that sends signed order events to the webhook, as
+Omniful would; for testing the push ingestion locally.
+"""
+
+import json
+import time
+import uuid
+import requests
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from core.models import Order
+from core.utils.order_events import SIGNATURE_HEADER, TIMESTAMP_HEADER, sign
+
+
+class Command(BaseCommand):
+    help = 'Replay order events to the webhook endpoint, signed like Omniful does'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'source',
+            nargs='?',
+            help='JSON Lines file of events; without it, events are made from stored orders',
+        )
+        parser.add_argument(
+            '--url',
+            type=str,
+            default='http://127.0.0.1:8000/webhooks/omniful/orders/',
+            help='Webhook URL (default: local runserver)',
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=100,
+            help='Stored orders to turn into order.updated events (default: 100)',
+        )
+        parser.add_argument(
+            '--batch',
+            type=int,
+            default=50,
+            help='Events per request (default: 50)',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=1,
+            help='Send every request this many times, to exercise deduplication (default: 1)',
+        )
+
+    def handle(self, *args, **options):
+        secret = settings.OMNIFUL_WEBHOOK_SECRET
+        if not secret:
+            raise CommandError('OMNIFUL_WEBHOOK_SECRET is not set')
+
+        events = list(self._events(options))
+        self.stdout.write(f'Sending {len(events)} events to {options["url"]}')
+        batch = max(1, options['batch'])
+        for start in range(0, len(events), batch):
+            body = json.dumps(events[start:start + batch]).encode('utf-8')
+            for _ in range(max(1, options['repeat'])):
+                timestamp = str(int(time.time()))
+                response = requests.post(options['url'], data=body, timeout=30, headers={
+                    'Content-Type': 'application/json',
+                    TIMESTAMP_HEADER: timestamp,
+                    SIGNATURE_HEADER: sign(secret, timestamp, body),
+                })
+                self.stdout.write(f'  {response.status_code} {response.text[:200]}')
+
+    def _events(self, options):
+        if options['source']:
+            with open(options['source']) as f:
+                for line in f:
+                    if line.strip():
+                        yield json.loads(line)
+            return
+
+        orders = (Order.objects.select_related('seller', 'payload')
+                  .exclude(seller__code__isnull=True).exclude(seller__code='')
+                  .order_by('-order_created_at')[:options['limit']])
+        for order in orders:
+            yield {
+                'id': f'replay-{uuid.uuid4()}',
+                'event': 'order.updated',
+                'seller_code': order.seller.code,
+                'data': order.raw_data,
+            }
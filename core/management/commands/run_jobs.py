@@ -0,0 +1,99 @@
+"""
+Worker that runs the management commands queued by the web pages.
+"""
+
+import signal
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, close_old_connections, connections
+from core.utils.jobs import claim_next, heartbeat, run_job, worker_name
+
+
+class Command(BaseCommand):
+    help = 'Run queued jobs (sync commands started from the web pages)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--threads',
+            type=int,
+            default=2,
+            help='Jobs this worker runs at the same time (default: 2)',
+        )
+        parser.add_argument(
+            '--types',
+            nargs='+',
+            help='Only run jobs of these types (default: all)',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Exit once no runnable job is left instead of waiting for more',
+        )
+
+    def handle(self, *args, **options):
+        threads = max(1, options['threads'])
+        self.worker = worker_name()
+        self.stopping = threading.Event()
+        # Finish the running jobs on SIGTERM/SIGINT instead of dropping them
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(sig, lambda *_: self.stopping.set())
+
+        self.stdout.write(f'Worker {self.worker} running up to {threads} jobs')
+        slots = threading.Semaphore(threads)
+        stop_beating = threading.Event()
+        beat = threading.Thread(target=self._heartbeat, args=(stop_beating,),
+                                name='run_jobs-heartbeat', daemon=True)
+        beat.start()
+        try:
+            self._loop(options, slots, threads)
+        finally:
+            stop_beating.set()
+            beat.join()
+        self.stdout.write(f'Worker {self.worker} stopped')
+
+    def _loop(self, options, slots, threads):
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            while not self.stopping.is_set():
+                slots.acquire()
+                close_old_connections()
+                job = claim_next(self.worker, options['types'])
+                if job is None:
+                    slots.release()
+                    if options['once'] and self._idle(slots, threads):
+                        break
+                    self.stopping.wait(settings.JOB_POLL_INTERVAL)
+                    continue
+                self.stdout.write(f'Started {job}')
+                pool.submit(self._run, job, slots)
+
+    def _heartbeat(self, stop):
+        """Keep this worker's running jobs from being failed as stale."""
+        interval = settings.JOB_HEARTBEAT_TTL / 3
+        while not stop.wait(interval):
+            try:
+                heartbeat(self.worker)
+            except DatabaseError as e:
+                # e.g. the database is locked; the next beat is still in time
+                self.stderr.write(f'Heartbeat failed: {e}')
+        connections.close_all()
+
+    def _run(self, job, slots):
+        try:
+            job = run_job(job)
+            style = self.style.SUCCESS if job.status == job.SUCCEEDED else self.style.ERROR
+            self.stdout.write(style(f'Finished {job}'))
+        finally:
+            connections.close_all()
+            slots.release()
+
+    def _idle(self, slots, threads):
+        """Whether no job of this worker is running (all slots are free)."""
+        taken = 0
+        while taken < threads and slots.acquire(blocking=False):
+            taken += 1
+        for _ in range(taken):
+            slots.release()
+        return taken == threads
@@ -3,19 +3,49 @@ Management command to sync all orders from Omniful API with progress tracking.
 """
 
 import requests
-import time
-import json
-import os
-from datetime import datetime
+import threading
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from django.core.management.base import BaseCommand
-from django.utils import timezone
-from core.models import Seller, Order
-from decouple import config
+from django.db import transaction
+from core.models import Seller, SyncCheckpoint
+from core.utils.dashboard_cache import bumps_data_version
+from core.utils.leases import ORDER_SYNC_LEASE, exclusive
+from core.utils.omniful_client import get_client
+from core.utils.order_ingest import bulk_upsert_orders, transform_order_page
+from core.utils.pipeline import IngestionPipeline
+from core.utils.progress import ORDERS_SYNC_DEFAULTS, ProgressReporter
+from core.utils.sync_utils import (
+    advance_watermark, get_watermark, order_watermark_key, page_behind_watermark,
+)
+
+
+# How many times a fanned-out page fetch is tried before giving up on it
+PAGE_FETCH_ATTEMPTS = 3
+
+# SyncCheckpoint.job of this command
+CHECKPOINT_JOB = 'sync_all_orders'
+
+
+def report_coalesced(command, options):
+    """Close the progress run of a request folded into the active sync."""
+    if options['run_id']:
+        ProgressReporter(CHECKPOINT_JOB, scope=options['seller_code'], data=ORDERS_SYNC_DEFAULTS,
+                         run_id=options['run_id']).finish(
+            error='A sync with these options was already running; it runs once more afterwards')
+
+
+def report_skipped(command, options):
+    """Close the progress run of a request skipped while another sync ran."""
+    if options['run_id']:
+        ProgressReporter(CHECKPOINT_JOB, scope=options['seller_code'], data=ORDERS_SYNC_DEFAULTS,
+                         run_id=options['run_id']).finish(
+            error='Another order sync was running; try again once it finishes')
 
 
 class Command(BaseCommand):
     help = 'Sync all orders from Omniful API with progress tracking'
-    
+
     def add_arguments(self, parser):
         parser.add_argument(
             '--seller_code',
@@ -29,290 +59,432 @@ class Command(BaseCommand):
             help='Number of orders per page (default: 100)',
         )
         parser.add_argument(
-            '--sleep',
-            type=float,
-            default=0.5,
-            help='Sleep time between API calls in seconds (default: 0.5)',
+            '--run_id',
+            type=str,
+            help='Report progress on this JobProgress run (created by the page '
+                 'that started the sync); a new run is created by default',
         )
         parser.add_argument(
-            '--progress_file',
-            type=str,
-            default='orders_sync_progress.json',
-            help='File to store progress information',
+            '--full',
+            action='store_true',
+            help='Re-scan every order page instead of stopping at the per-seller watermark',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Number of sellers to fetch in parallel (default: 1)',
+        )
+        parser.add_argument(
+            '--transform_workers',
+            type=int,
+            default=1,
+            help='Threads mapping fetched pages to order rows (default: 1)',
+        )
+        parser.add_argument(
+            '--transform_processes',
+            type=int,
+            default=0,
+            help='Map pages in this many worker processes instead of threads, '
+                 'for CPU-heavy payloads (default: 0, disabled)',
+        )
+        parser.add_argument(
+            '--queue_size',
+            type=int,
+            default=8,
+            help='Pages buffered between pipeline stages before fetchers wait (default: 8)',
+        )
+        parser.add_argument(
+            '--page_workers',
+            type=int,
+            default=1,
+            help='Pages of one seller to fetch in parallel once the page count is known '
+                 '(full scans and first syncs only, default: 1)',
+        )
+        parser.add_argument(
+            '--resume',
+            action='store_true',
+            help='Continue the previous run from its last committed page '
+                 '(use the same --per_page as that run)',
+        )
+        parser.add_argument(
+            '--max_rps',
+            type=float,
+            help='Cap the orders API rate (requests per second) shared by all workers; '
+                 'defaults to OMNIFUL_RATE_LIMITS["orders"]',
         )
-    
+
+    @exclusive(ORDER_SYNC_LEASE, on_coalesced=report_coalesced, on_skipped=report_skipped)
+    @bumps_data_version
     def handle(self, *args, **options):
-        token = config('OMNIFUL_ACCESS_TOKEN', default='')
-        
-        if not token:
-            self.stdout.write(self.style.ERROR('OMNIFUL_ACCESS_TOKEN not configured'))
-            return
-        
-        headers = {
-            'Authorization': f'Bearer {token}'
-        }
-        
-        # Get sellers to process
-        if options['seller_code']:
-            try:
-                sellers = [Seller.objects.get(code=options['seller_code'])]
-                self.stdout.write(f'Processing single seller: {sellers[0].name}')
-            except Seller.DoesNotExist:
-                self.stdout.write(self.style.ERROR(f'Seller with code {options["seller_code"]} not found'))
+        with ProgressReporter(
+                CHECKPOINT_JOB, scope=options['seller_code'],
+                data=ORDERS_SYNC_DEFAULTS, run_id=options['run_id']) as self.reporter:
+            self.client = get_client()
+
+            if not self.client.has_token:
+                self.stdout.write(self.style.ERROR('OMNIFUL_ACCESS_TOKEN not configured'))
+                self.reporter.finish(error='OMNIFUL_ACCESS_TOKEN not configured')
                 return
-        else:
-            sellers = Seller.objects.filter(is_active=True)
-            self.stdout.write(f'Processing {len(sellers)} active sellers')
-        
-        total_orders = 0
-        per_page = options['per_page']
-        sleep_time = options['sleep']
-        progress_file = options['progress_file']
-        
-        # Initialize progress tracking
-        progress = {
-            'total_sellers': len(sellers),
-            'processed_sellers': 0,
-            'total_orders': 0,
-            'processed_orders': 0,
-            'current_seller': '',
-            'current_page': 0,
-            'total_pages': 0,
-            'percentage': 0,
-            'is_complete': False
+
+            # Get sellers to process
+            if options['seller_code']:
+                try:
+                    sellers = [Seller.objects.get(code=options['seller_code'])]
+                    self.stdout.write(f'Processing single seller: {sellers[0].name}')
+                except Seller.DoesNotExist:
+                    self.stdout.write(self.style.ERROR(f'Seller with code {options["seller_code"]} not found'))
+                    self.reporter.finish(error=f'Seller {options["seller_code"]} not found')
+                    return
+            else:
+                sellers = list(Seller.objects.filter(is_active=True))
+                self.stdout.write(f'Processing {len(sellers)} active sellers')
+
+            self.per_page = options['per_page']
+            self.full_scan = options['full']
+            workers = max(1, options['workers'])
+            self.page_workers = max(1, options['page_workers'])
+
+            # Progress, stdout and seller_runs are shared by the pipeline threads
+            self._lock = threading.Lock()
+            self.active_sellers = []
+            self.seller_runs = {}
+            self.progress = dict(ORDERS_SYNC_DEFAULTS, total_sellers=len(sellers))
+
+            # Save initial progress
+            self._save_progress()
+
+            self.checkpoints = self._load_checkpoints(sellers, options['resume'])
+
+            # Fetchers page through sellers, transformers map pages to rows and
+            # this thread writes them, so the API and the database work side by side
+            pipeline = IngestionPipeline(
+                fetch_workers=workers,
+                transform_workers=options['transform_workers'],
+                transform_processes=options['transform_processes'],
+                queue_size=options['queue_size'],
+                on_error=self._pipeline_error,
+            )
+            if workers > 1:
+                self.stdout.write(f'Using {workers} workers')
+            # --max_rps only holds for this run; the limiter outlives it
+            with self.client.limiter('orders').capped(options['max_rps']):
+                stats = pipeline.run(sellers, self._seller_batches, transform_order_page,
+                                     self._write_batch)
+
+            # Sellers whose last page never reached the writer end incomplete
+            for run in self.seller_runs.values():
+                if not run['finished']:
+                    self._finish_seller(run)
+
+            total_orders = sum(run['orders'] for run in self.seller_runs.values())
+
+            # Mark as complete
+            self.reporter.finish(**self.progress)
+
+            for stage in stats.values():
+                self.stdout.write(f'  {stage}')
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f'Successfully synced {total_orders} orders for {len(sellers)} sellers '
+                    f'({self.progress["unchanged_orders"]} unchanged)')
+            )
+
+    def _seller_batches(self, seller):
+        """Fetch stage: yield one seller's order pages, then an end marker.
+
+        Page batches are ``{'seller', 'page', 'orders', 'meta'}`` dicts. The
+        final ``{'seller', 'end': True, 'pages', 'completed'}`` marker tells
+        the writer how many pages to expect and whether the pass was clean.
+        """
+        if not seller.code:
+            self._write(f'Skipping seller {seller.name} - no code available')
+            return
+
+        checkpoint = self.checkpoints[seller.code]
+        if checkpoint.is_complete:
+            self._write(f'Skipping seller {seller.name} - already completed in the resumed run')
+            with self._lock:
+                self.progress['processed_sellers'] += 1
+            return
+
+        self._write(f'Fetching orders for seller: {seller.name} (code: {seller.code})')
+        self._seller_started(seller)
+
+        watermark = None if self.full_scan else get_watermark(order_watermark_key(seller.code))
+        run = {
+            'seller': seller, 'orders': 0, 'unchanged': 0, 'newest_seen': None,
+            'write_failed': False, 'pages_stored': 0, 'pages_expected': None,
+            'completed': False, 'finished': False,
         }
-        
-        # Save initial progress
-        self._save_progress(progress, progress_file)
-        
-        for seller in sellers:
-            if not seller.code:
-                self.stdout.write(f'Skipping seller {seller.name} - no code available')
+        with self._lock:
+            self.seller_runs[seller.code] = run
+        if watermark:
+            self._write(f'  Incremental sync from watermark {watermark.isoformat()}')
+
+        pages = 0
+        completed = False
+        page = checkpoint.last_page + 1
+        last_page = checkpoint.total_pages or 1
+        if page > 1:
+            self._write(f'  Resuming at page {page} of {last_page}')
+            with self._lock:
+                self.progress['total_orders'] += checkpoint.total_orders
+
+        # Stop early once the writer reports a failed page, so a resumed run
+        # picks it up again
+        while not completed and not run['write_failed']:
+            if page > 1 and self.page_workers > 1 and watermark is None:
+                # The page count is known, so fetch the rest side by side
+                remaining = [p for p in range(page, last_page + 1) if not checkpoint.is_page_done(p)]
+                completed, fanned_out = yield from self._fan_out_pages(seller, remaining)
+                pages += fanned_out
+                break
+
+            if checkpoint.is_page_done(page):
+                # Committed out of order by an earlier fan-out run
+                completed = page >= last_page
+                page += 1
                 continue
-                
-            self.stdout.write(f'Fetching orders for seller: {seller.name} (code: {seller.code})')
-            
-            # Update progress
-            progress['current_seller'] = seller.name
-            progress['current_page'] = 0
-            self._save_progress(progress, progress_file)
-            
-            # First, get the total number of orders for this seller
-            url = f'https://prodapi.omniful.com/sales-channel/public/v1/tenants/sellers/{seller.code}/orders?page=1&per_page={per_page}'
-            
+
             try:
-                response = requests.get(url, headers=headers, timeout=30)
-                if response.status_code == 200:
-                    data = response.json()
-                    meta = data.get('meta', {})
-                    seller_total_orders = meta.get('total', 0)
-                    last_page = meta.get('last_page', 1)
-                    
-                    self.stdout.write(f'  Total orders for {seller.name}: {seller_total_orders} (Pages: {last_page})')
-                    
-                    # Update progress
-                    progress['total_orders'] += seller_total_orders
-                    progress['total_pages'] = last_page
-                    self._save_progress(progress, progress_file)
-                else:
-                    self.stdout.write(self.style.ERROR(f'  Failed to get total orders for {seller.name}'))
-                    continue
-            except Exception as e:
-                self.stdout.write(self.style.ERROR(f'  Error getting total orders: {str(e)}'))
-                continue
-            
-            page = 1
-            seller_orders = 0
-            
-            while True:
-                url = f'https://prodapi.omniful.com/sales-channel/public/v1/tenants/sellers/{seller.code}/orders?page={page}&per_page={per_page}'
-                
-                try:
-                    self.stdout.write(f'  Requesting page {page} of {last_page}...')
-                    
-                    # Update progress
-                    progress['current_page'] = page
-                    self._save_progress(progress, progress_file)
-                    
-                    response = requests.get(url, headers=headers, timeout=30)
-                    
-                    if response.status_code != 200:
-                        self.stdout.write(self.style.ERROR(f'  API request failed with status code: {response.status_code}'))
-                        self.stdout.write(f'  Response: {response.text[:200]}')
-                        break
-                    
-                    data = response.json()
-                    
-                    orders = data.get('data', [])
-                    meta = data.get('meta', {})
-                    
-                    if not orders:
-                        self.stdout.write(f'  No orders found for {seller.name} on page {page}')
-                        break
-                    
-                    self.stdout.write(f'  Processing {len(orders)} orders from page {page}')
-                    
-                    # Process orders in batches for better performance
-                    batch_size = 20
-                    for i in range(0, len(orders), batch_size):
-                        batch = orders[i:i+batch_size]
-                        self.stdout.write(f'  Processing batch {i//batch_size + 1} of {(len(orders) + batch_size - 1) // batch_size}')
-                        
-                        for order_data in batch:
-                            # Extract order details
-                            order_id = order_data.get('order_id')
-                            omniful_id = order_data.get('id')
-                            
-                            if not order_id or not omniful_id:
-                                continue
-                            
-                            # Parse dates
-                            order_created_at = None
-                            if order_data.get('order_created_at'):
-                                try:
-                                    # Fix common ISO format issues
-                                    date_str = order_data['order_created_at']
-                                    if 'Z' in date_str:
-                                        date_str = date_str.replace('Z', '+00:00')
-                                    # Fix milliseconds format if needed
-                                    if '+00:00' in date_str and '.' in date_str:
-                                        parts = date_str.split('.')
-                                        if len(parts) == 2:
-                                            ms_part = parts[1].split('+')[0]
-                                            if len(ms_part) < 6:
-                                                # Pad with zeros to get microseconds
-                                                ms_part = ms_part.ljust(6, '0')
-                                            date_str = f"{parts[0]}.{ms_part}+00:00"
-                                    
-                                    order_created_at = datetime.fromisoformat(date_str)
-                                except Exception as e:
-                                    order_created_at = timezone.now()
-                            
-                            # Get delivery date if available
-                            delivery_date = None
-                            delivery_status = None
-                            shipment = order_data.get('shipment', {})
-                            if shipment:
-                                delivery_status = shipment.get('delivery_status')
-                                # If there's a delivery timestamp, use it
-                                if shipment.get('delivery_timestamp'):
-                                    try:
-                                        # Fix common ISO format issues
-                                        date_str = shipment['delivery_timestamp']
-                                        if 'Z' in date_str:
-                                            date_str = date_str.replace('Z', '+00:00')
-                                        # Fix milliseconds format if needed
-                                        if '+00:00' in date_str and '.' in date_str:
-                                            parts = date_str.split('.')
-                                            if len(parts) == 2:
-                                                ms_part = parts[1].split('+')[0]
-                                                if len(ms_part) < 6:
-                                                    # Pad with zeros to get microseconds
-                                                    ms_part = ms_part.ljust(6, '0')
-                                                date_str = f"{parts[0]}.{ms_part}+00:00"
-                                        
-                                        delivery_date = datetime.fromisoformat(date_str)
-                                    except Exception as e:
-                                        pass
-                            
-                            # Extract customer info
-                            customer = order_data.get('customer', {})
-                            customer_first_name = customer.get('first_name', '')
-                            customer_last_name = customer.get('last_name', '')
-                            customer_email = customer.get('email')
-                            customer_phone = customer.get('phone')
-                            
-                            # Extract shipping address
-                            shipping_address = order_data.get('shipping_address', {})
-                            shipping_city = shipping_address.get('city', '')
-                            shipping_region = shipping_address.get('region', '')
-                            shipping_country = shipping_address.get('country', '')
-                            
-                            # Create or update order
-                            try:
-                                order, created = Order.objects.update_or_create(
-                                    omniful_id=omniful_id,
-                                    defaults={
-                                        'order_id': order_id,
-                                        'seller': seller,
-                                        'store_name': order_data.get('store_name', ''),
-                                        'status_code': order_data.get('status_code', ''),
-                                        'order_type': order_data.get('type', 'B2C'),
-                                        'delivery_type': order_data.get('delivery_type', ''),
-                                        'order_created_at': order_created_at or timezone.now(),
-                                        'delivery_date': delivery_date,
-                                        'payment_mode': order_data.get('payment_mode', ''),
-                                        'payment_method': order_data.get('payment_method', ''),
-                                        'total': order_data.get('total', 0),
-                                        'customer_first_name': customer_first_name,
-                                        'customer_last_name': customer_last_name,
-                                        'customer_email': customer_email,
-                                        'customer_phone': customer_phone,
-                                        'shipping_city': shipping_city,
-                                        'shipping_region': shipping_region,
-                                        'shipping_country': shipping_country,
-                                        'delivery_status': delivery_status,
-                                        'raw_data': order_data,
-                                    }
-                                )
-                                
-                                seller_orders += 1
-                                progress['processed_orders'] += 1
-                                
-                                # Update progress percentage
-                                if progress['total_orders'] > 0:
-                                    progress['percentage'] = round((progress['processed_orders'] / progress['total_orders']) * 100, 1)
-                                
-                                # Save progress periodically
-                                if seller_orders % 50 == 0:
-                                    self._save_progress(progress, progress_file)
-                                    
-                            except Exception as e:
-                                self.stdout.write(self.style.ERROR(f'    Error saving order {order_id}: {str(e)}'))
-                    
-                    # Check if this is the last page
-                    current_page = meta.get('current_page', page)
+                self._write(f'  Requesting page {page} of {last_page}...')
+                self._update_progress(current_page=page)
+
+                response = self._fetch_page(seller, page)
+                if response.status_code != 200:
+                    self._write(f'  API request failed with status code: {response.status_code}', self.style.ERROR)
+                    self._write(f'  Response: {response.text[:200]}')
+                    break
+
+                data = response.json()
+                orders = data.get('data', [])
+                meta = data.get('meta', {})
+
+                if page == 1:
+                    # The first page also tells us the size of the seller
                     last_page = meta.get('last_page', 1)
-                    
-                    if current_page >= last_page:
-                        self.stdout.write(f'  Reached last page ({last_page}) for {seller.name}')
-                        break
-                    
-                    page += 1
-                    
-                    # Sleep to avoid overwhelming the API
-                    if sleep_time > 0:
-                        time.sleep(sleep_time)
-                    
-                except requests.RequestException as e:
-                    self.stdout.write(self.style.ERROR(f'  API request failed: {str(e)}'))
-                    if hasattr(e, 'response') and e.response is not None:
-                        self.stdout.write(f'  Response status: {e.response.status_code}')
-                        self.stdout.write(f'  Response text: {e.response.text[:200]}')
+                    seller_total_orders = meta.get('total', 0)
+                    self._write(f'  Total orders for {seller.name}: {seller_total_orders} (Pages: {last_page})')
+                    with self._lock:
+                        self.progress['total_orders'] += seller_total_orders
+                        self.progress['total_pages'] = last_page
+
+                if not orders:
+                    self._write(f'  No orders found for {seller.name} on page {page}')
+                    completed = True
                     break
-                except Exception as e:
-                    self.stdout.write(self.style.ERROR(f'  Error processing data: {str(e)}'))
+
+                pages += 1
+                yield {'seller': seller, 'page': page, 'orders': orders,
+                       'meta': meta if page == 1 else None}
+
+                # Check if this is the last page
+                current_page = meta.get('current_page', page)
+                last_page = meta.get('last_page', 1)
+
+                if current_page >= last_page:
+                    self._write(f'  Reached last page ({last_page}) for {seller.name}')
+                    completed = True
                     break
-            
-            self.stdout.write(f'Synced {seller_orders} orders for {seller.name}')
-            total_orders += seller_orders
-            
-            # Update progress for completed seller
-            progress['processed_sellers'] += 1
-            self._save_progress(progress, progress_file)
-        
-        # Mark as complete
-        progress['is_complete'] = True
-        self._save_progress(progress, progress_file)
-        
-        self.stdout.write(
-            self.style.SUCCESS(f'Successfully synced {total_orders} orders for {len(sellers)} sellers')
-        )
-    
-    def _save_progress(self, progress, filename):
-        """Save progress information to a file."""
+
+                if page_behind_watermark(orders, watermark):
+                    self._write(f'  Page {page} is behind the watermark for {seller.name}, stopping')
+                    completed = True
+                    break
+
+                page += 1
+
+            except requests.RequestException as e:
+                self._write(f'  API request failed: {str(e)}', self.style.ERROR)
+                if hasattr(e, 'response') and e.response is not None:
+                    self._write(f'  Response status: {e.response.status_code}')
+                    self._write(f'  Response text: {e.response.text[:200]}')
+                break
+            except Exception as e:
+                self._write(f'  Error processing data: {str(e)}', self.style.ERROR)
+                break
+
+        yield {'seller': seller, 'end': True, 'pages': pages, 'completed': completed}
+
+    def _write_batch(self, batch):
+        """Write stage: store a transformed page or close out a seller."""
+        run = self.seller_runs[batch['seller'].code]
+        if batch.get('end'):
+            run['pages_expected'] = batch['pages']
+            run['completed'] = batch['completed']
+        else:
+            self._store_page(batch, run)
+
+        if run['pages_expected'] is not None and run['pages_stored'] >= run['pages_expected']:
+            self._finish_seller(run)
+
+    def _store_page(self, batch, run):
+        """Write one transformed page in a single bulk upsert."""
+        seller, page = batch['seller'], batch['page']
+        self._write(f'  Processing {batch["fetched"]} orders from page {page}')
+        checkpoint = self.checkpoints[seller.code]
+
         try:
-            with open(filename, 'w') as f:
-                json.dump(progress, f)
+            # The checkpoint commits with the page, so a crash either keeps
+            # both or neither and a resumed run never skips or re-counts it
+            with transaction.atomic():
+                created, updated, unchanged = bulk_upsert_orders(batch['rows'])
+                if batch['meta'] is not None:
+                    checkpoint.total_pages = batch['meta'].get('last_page', 1)
+                    checkpoint.total_orders = batch['meta'].get('total', 0)
+                    checkpoint.save(update_fields=['total_pages', 'total_orders', 'updated_at'])
+                checkpoint.mark_page(page)
         except Exception as e:
-            self.stdout.write(self.style.WARNING(f'Error saving progress: {str(e)}'))
\ No newline at end of file
+            self._write(f'    Error saving page {page}: {str(e)}', self.style.ERROR)
+            created = updated = unchanged = 0
+            run['write_failed'] = True
+
+        newest_seen = batch['newest_seen']
+        if newest_seen and (run['newest_seen'] is None or newest_seen > run['newest_seen']):
+            run['newest_seen'] = newest_seen
+        run['pages_stored'] += 1
+        run['orders'] += created + updated + unchanged
+        run['unchanged'] += unchanged
+        self._orders_written(created + updated + unchanged, unchanged)
+
+    def _finish_seller(self, run):
+        """Advance the watermark after a clean pass and report the seller."""
+        seller = run['seller']
+        run['finished'] = True
+        clean = (run['completed'] and not run['write_failed']
+                 and run['pages_stored'] == run['pages_expected'])
+        if clean:
+            advance_watermark(order_watermark_key(seller.code), run['newest_seen'])
+            checkpoint = self.checkpoints[seller.code]
+            checkpoint.is_complete = True
+            checkpoint.save(update_fields=['is_complete', 'updated_at'])
+
+        self._write(f'Synced {run["orders"]} orders for {seller.name} ({run["unchanged"]} unchanged)')
+        self._seller_finished(seller)
+
+    def _pipeline_error(self, stage, item, error):
+        """Log a failure the stages did not handle; its seller ends incomplete."""
+        seller = item['seller'] if isinstance(item, dict) else item
+        self._write(f'  {stage.capitalize()} failed for {seller.name}: {str(error)}', self.style.ERROR)
+        run = self.seller_runs.get(seller.code)
+        if run:
+            run['write_failed'] = True
+
+    def _fan_out_pages(self, seller, pages):
+        """Fetch ``pages`` concurrently and yield each batch as it arrives.
+
+        At most ``page_workers`` requests are in flight. A page whose fetch
+        fails is put back in the queue up to PAGE_FETCH_ATTEMPTS times.
+        Returns ``(complete, yielded)``: whether every page was fetched and how
+        many batches went to the writer.
+        """
+        pending = deque(pages)
+        attempts = {}
+        complete = True
+        yielded = 0
+        self._write(f'  Fetching {len(pending)} remaining pages with {self.page_workers} workers')
+
+        with ThreadPoolExecutor(max_workers=self.page_workers) as pool:
+            in_flight = {}
+            while pending or in_flight:
+                while pending and len(in_flight) < self.page_workers:
+                    page = pending.popleft()
+                    in_flight[pool.submit(self._fetch_page_orders, seller, page)] = page
+
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    page = in_flight.pop(future)
+                    try:
+                        orders = future.result()
+                    except Exception as e:
+                        attempts[page] = attempts.get(page, 0) + 1
+                        if attempts[page] < PAGE_FETCH_ATTEMPTS:
+                            self._write(f'  Page {page} failed ({str(e)}), retrying', self.style.WARNING)
+                            pending.append(page)
+                        else:
+                            self._write(f'  Giving up on page {page}: {str(e)}', self.style.ERROR)
+                            complete = False
+                        continue
+
+                    self._update_progress(current_page=page)
+                    if orders:
+                        yielded += 1
+                        yield {'seller': seller, 'page': page, 'orders': orders, 'meta': None}
+
+        return complete, yielded
+
+    def _load_checkpoints(self, sellers, resume):
+        """Return a SyncCheckpoint per seller code, fresh unless resuming."""
+        codes = [seller.code for seller in sellers if seller.code]
+        existing = SyncCheckpoint.objects.filter(job=CHECKPOINT_JOB, seller_code__in=codes)
+        if resume:
+            checkpoints = {c.seller_code: c for c in existing}
+            resumed = sum(1 for c in checkpoints.values() if c.last_page or c.is_complete)
+            self.stdout.write(f'Resuming: {resumed} sellers have committed pages')
+        else:
+            existing.delete()
+            checkpoints = {}
+
+        missing = [SyncCheckpoint(job=CHECKPOINT_JOB, seller_code=code)
+                   for code in codes if code not in checkpoints]
+        SyncCheckpoint.objects.bulk_create(missing)
+        if missing:
+            checkpoints.update({
+                c.seller_code: c for c in SyncCheckpoint.objects.filter(
+                    job=CHECKPOINT_JOB, seller_code__in=[m.seller_code for m in missing])
+            })
+        return checkpoints
+
+    def _fetch_page(self, seller, page):
+        """GET one page of a seller's orders (paced by the client's limiter)."""
+        return self.client.get(f'/tenants/sellers/{seller.code}/orders',
+                               params={'page': page, 'per_page': self.per_page})
+
+    def _fetch_page_orders(self, seller, page):
+        """Fetch a page and return its orders, raising on HTTP errors."""
+        response = self._fetch_page(seller, page)
+        response.raise_for_status()
+        return response.json().get('data', [])
+
+    def _write(self, msg, style=None):
+        with self._lock:
+            self.stdout.write(style(msg) if style else msg)
+
+    def _seller_started(self, seller):
+        with self._lock:
+            self.active_sellers.append(seller.name)
+            self.progress['current_seller'] = ', '.join(self.active_sellers)
+            self.progress['current_page'] = 0
+            self._save_progress()
+
+    def _seller_finished(self, seller):
+        with self._lock:
+            if seller.name in self.active_sellers:
+                self.active_sellers.remove(seller.name)
+            self.progress['current_seller'] = ', '.join(self.active_sellers)
+            self.progress['processed_sellers'] += 1
+            self._save_progress()
+
+    def _orders_written(self, count, unchanged):
+        with self._lock:
+            self.progress['processed_orders'] += count
+            self.progress['unchanged_orders'] += unchanged
+            if self.progress['total_orders'] > 0:
+                self.progress['percentage'] = round(
+                    (self.progress['processed_orders'] / self.progress['total_orders']) * 100, 1)
+            self._save_progress()
+
+    def _update_progress(self, **changes):
+        with self._lock:
+            self.progress.update(changes)
+            self._save_progress()
+
+    def _save_progress(self):
+        """Hand the counters to the reporter (caller holds the lock).
+
+        The reporter rate-limits the writes and only writes from the
+        pipeline's writer thread; changes made on fetch threads go out
+        with its next update.
+        """
+        self.reporter.update(**self.progress)
@@ -1,188 +1,218 @@
 from django.core.management.base import BaseCommand
 from django.utils import timezone
-from core.models import Seller, VendorBill, SyncStatus, SyncLog
-from decouple import config
-from datetime import datetime
+from core.models import VendorBill, SyncStatus, SyncLog
+from core.utils.dashboard_cache import bumps_data_version, record_changes
+from core.utils.dates import parse_omniful_datetime
+from core.utils.leases import exclusive
+from core.utils.omniful_client import get_client
+from core.utils.seller_catalog import get_catalog
+from core.utils.sync_log import SyncLogWriter
+from core.utils.sync_utils import payload_hash
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+import logging
 import requests
 import traceback
 
 
-class Command(BaseCommand):
-    help = 'Sync vendor bills from Omniful API for sellers returned by API'
+# Bill statuses after which Omniful no longer changes a bill's totals
+TERMINAL_BILL_STATUSES = {'finalised', 'paid'}
+
 
-    API_DATE_FORMAT = "%b %d, %Y %I:%M:%S %p"
+class Command(BaseCommand):
+    help = 'Sync vendor bills from Omniful API for sellers known locally'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=8,
+            help='Bill detail requests in flight at once (default: 8)',
+        )
 
+    @exclusive('sync_bills')
+    @bumps_data_version
     def handle(self, *args, **options):
-        log_lines = []
         stdout = options.get('stdout', self.stdout)
 
-        def log(msg):
-            log_lines.append(msg)
-            stdout.write(msg + '\n')
-            stdout.flush()
-
-        def parse_date_str(date_str):
-            if not date_str or date_str.strip() == "":
-                return None
-            try:
-                dt_obj = datetime.strptime(date_str, self.API_DATE_FORMAT)
-                return timezone.make_aware(dt_obj)
-            except ValueError:
-                log(f"⚠️ Could not parse date '{date_str}'")
-                return None
-
-        token = config('OMNIFUL_ACCESS_TOKEN', default='')
-        if not token:
-            log('❌ OMNIFUL_ACCESS_TOKEN not configured.')
-            return
-
-        headers = {'Authorization': f'Bearer {token}'}
-
-        total_created = total_updated = total_synced = 0
-
-        # Step 1: Fetch all sellers from API
-        sellers = []
-        page = 1
-        while True:
-            url = f'https://prodapi.omniful.com/sales-channel/public/v1/tenants/sellers?page={page}&per_page=100'
-            try:
-                log(f"🌐 Fetching sellers from page {page}")
-                response = requests.get(url, headers=headers, timeout=30)
-                response.raise_for_status()
-                data = response.json()
-
-                seller_data_list = data.get('data', [])
-                meta = data.get('meta', {})
-                current_page = meta.get('current_page', page)
-                last_page = meta.get('last_page', page)
-
-                if not seller_data_list:
-                    break
-
-                for s in seller_data_list:
-                    if not s.get('name'):
-                        continue
-                    try:
-                        seller = Seller.objects.get(name=s['name'])
-                        sellers.append(seller)
-                    except Seller.DoesNotExist:
-                        log(f"❌ Seller '{s['name']}' not found in DB. Skipping.")
-                        continue
-
-                if current_page >= last_page:
-                    break
-                page += 1
-
-            except requests.RequestException as e:
-                log(f"❌ Failed to fetch sellers: {str(e)}")
+        with SyncLogWriter('vendor_bills', stdout) as log:
+            def parse_date_str(date_str):
+                if not date_str or date_str.strip() == "":
+                    return None
+                parsed = parse_omniful_datetime(date_str)
+                if parsed is None:
+                    log(f"⚠️ Could not parse date '{date_str}'", logging.WARNING)
+                return parsed
+
+            client = get_client()
+            if not client.has_token:
+                log('❌ OMNIFUL_ACCESS_TOKEN not configured.', logging.ERROR)
+                log.finish('❌ OMNIFUL_ACCESS_TOKEN not configured.', SyncLog.FAILED)
                 return
 
-        # Step 2: Sync bills for each seller
-        total_synced = 0
-        for seller in sellers:
-            page = 1
-            while True:
-                bills_url = f'https://prodapi.omniful.com/sales-channel/public/v1/tenants/bills?page={page}&per_page=100'
-                try:
-                    log(f"🌐 Fetching bills page {page} for seller {seller.name}")
-                    response = requests.get(
-                        bills_url, headers=headers, timeout=30)
-                    response.raise_for_status()
-                    data = response.json()
-
-                    bills = data.get('data', [])
-                    meta = data.get('meta', {})
-                    current_page = meta.get('current_page', page)
-                    last_page = meta.get('last_page', 1)
-
-                    if not bills:
-                        log("✅ No bills found")
-                        break
+            total_created = total_updated = total_unchanged = total_synced = 0
 
-                    for bill_data in bills:
-                        seller_data = bill_data.get('seller', {})
-                        if seller_data.get('name') != seller.name:
-                            continue
-
-                        bill_name = bill_data.get('name')
-                        if not bill_name:
-                            continue
-
-                        detail_url = f"https://prodapi.omniful.com/sales-channel/public/v1/tenants/bills/{bill_name}"
-                        detail_response = requests.get(
-                            detail_url, headers=headers, timeout=20)
-                        if detail_response.status_code != 200:
-                            log(
-                                f"❌ Failed to fetch details for bill {bill_name}")
-                            continue
-
-                        bill_detail = detail_response.json().get('data', {})
-
-                        bill, created = VendorBill.objects.update_or_create(
-                            name=bill_name,
-                            defaults={
-                                'seller': seller,
-                                'hubs': bill_data.get('hubs', []),
-                                'status': bill_data.get('status', ''),
-                                'pdf': bill_data.get('pdf', ''),
-                                'contract_name': bill_data.get('contract_name', ''),
-                                'period_start_date': parse_date_str(bill_data.get('period_start_date')),
-                                'period_end_date': parse_date_str(bill_data.get('period_end_date')),
-                                'due_date': parse_date_str(bill_data.get('due_date')),
-                                'created_at_api': parse_date_str(bill_data.get('created_at')),
-                                'currency': bill_data.get('currency', 'SAR'),
-                                'grand_total': bill_detail.get('grand_total', 0),
-                                'discount': bill_data.get('discount', 0),
-                                'grand_total_after_discount': bill_data.get('grand_total_after_discount', 0),
-                                'finalised_on': parse_date_str(bill_data.get('finalised_on')),
-                                'finalised_by': bill_data.get('finalised_by', ''),
-                                'remark': bill_data.get('remark', ''),
-                                'fees': bill_data.get('fees', []),
-                                'hub_bills': bill_data.get('hub_bills', []),
-                                'created_at_local': timezone.now(),
-                                'updated_at_local': timezone.now(),
-                            }
-                        )
-
-                        if created:
-                            total_created += 1
-                            log(f'🧾 Created Bill: {bill.name}')
-                        else:
-                            total_updated += 1
-                            log(f'🔁 Updated Bill: {bill.name}')
-
-                        total_synced += 1
-
-                    if current_page >= last_page:
-                        break
-                    page += 1
+            # Step 1: Index sellers by guid and name with a single query, so
+            # each bill is routed to its seller without a lookup per bill
+            catalog = get_catalog(client, log=log)
+            unknown_sellers = set()
 
+            def fetch_detail(bill_name, existing):
+                """GET a bill's detail, conditionally when we hold validators."""
+                headers = {}
+                if existing and existing.detail_etag:
+                    headers['If-None-Match'] = existing.detail_etag
+                if existing and existing.detail_last_modified:
+                    headers['If-Modified-Since'] = existing.detail_last_modified
+                try:
+                    return client.get(f'/tenants/bills/{bill_name}', timeout=20, headers=headers)
                 except requests.RequestException as e:
-                    log(f"❌ API request failed: {str(e)}")
-                    break
-                except Exception as e:
-                    log(f"🔥 Unexpected error: {str(e)}")
-                    log(traceback.format_exc())
-                    break
-
-        log(f"\n✅ Successfully synced {total_synced} bills")
-
-        # Save sync timestamp
-        SyncStatus.objects.update_or_create(
-            key='vendor_bills',
-            defaults={'last_synced_at': timezone.now()}
-        )
+                    log(f"❌ Bill {bill_name} detail request failed: {str(e)}", logging.ERROR)
+                    return None
 
-        summary = (
-            f"\n✅ Sync Complete!\n"
-            f"Created: {total_created}\n"
-            f"Updated: {total_updated}\n"
-            f"Total Synced: {total_synced}"
-        )
-        log(summary)
+            # Step 2: Page through the tenant-wide bill listing once
+            with ThreadPoolExecutor(max_workers=max(1, options['workers'])) as pool:
+                page = 1
+                while True:
+                    try:
+                        log(f"🌐 Fetching bills page {page}")
+                        data = client.get_json(
+                            '/tenants/bills', params={'page': page, 'per_page': 100})
+
+                        bills = data.get('data', [])
+                        meta = data.get('meta', {})
+                        current_page = meta.get('current_page', page)
+                        last_page = meta.get('last_page', 1)
+
+                        if not bills:
+                            log("✅ No bills found")
+                            break
+
+                        stored = {
+                            bill.name: bill for bill in VendorBill.objects.filter(
+                                name__in=[b.get('name') for b in bills])
+                            .only('name', 'status', 'grand_total', 'payload_hash',
+                                  'detail_etag', 'detail_last_modified')
+                        }
+
+                        pending = []
+                        for bill_data in bills:
+                            seller_data = bill_data.get('seller') or {}
+                            seller = catalog.get(guid=seller_data.get('guid'), name=seller_data.get('name'))
+                            if seller is None:
+                                seller_name = seller_data.get('name') or seller_data.get('guid')
+                                if seller_name not in unknown_sellers:
+                                    unknown_sellers.add(seller_name)
+                                    log(f"❌ Seller '{seller_name}' not found in DB. Skipping its bills.", logging.ERROR)
+                                continue
+
+                            bill_name = bill_data.get('name')
+                            if not bill_name:
+                                continue
+
+                            # A terminal bill whose listing is unchanged can't have a
+                            # new grand total, so its detail call is skipped entirely
+                            bill_hash = payload_hash(bill_data)
+                            existing = stored.get(bill_name)
+                            if (existing and existing.payload_hash == bill_hash
+                                    and bill_data.get('status') in TERMINAL_BILL_STATUSES):
+                                total_unchanged += 1
+                                total_synced += 1
+                                continue
+
+                            pending.append((bill_data, seller, bill_hash, existing))
+
+                        # Details download in the pool while this thread writes
+                        # the ones that have already arrived, in listing order
+                        details = pool.map(lambda item: fetch_detail(item[0]['name'], item[3]), pending)
+                        for (bill_data, seller, bill_hash, existing), response in zip(pending, details):
+                            bill_name = bill_data['name']
+                            if response is not None and response.status_code == 304 and existing:
+                                grand_total = existing.grand_total
+                                etag = existing.detail_etag
+                                last_modified = existing.detail_last_modified
+                            elif response is not None and response.status_code == 200:
+                                bill_detail = response.json().get('data', {})
+                                grand_total = Decimal(str(bill_detail.get('grand_total') or 0))
+                                etag = response.headers.get('ETag', '')
+                                last_modified = response.headers.get('Last-Modified', '')
+                            else:
+                                log(f"❌ Failed to fetch details for bill {bill_name}", logging.ERROR)
+                                continue
+
+                            if (existing and existing.payload_hash == bill_hash
+                                    and existing.grand_total == grand_total):
+                                total_unchanged += 1
+                                total_synced += 1
+                                continue
+
+                            bill, created = VendorBill.objects.update_or_create(
+                                name=bill_name,
+                                defaults={
+                                    'seller': seller,
+                                    'hubs': bill_data.get('hubs', []),
+                                    'status': bill_data.get('status', ''),
+                                    'pdf': bill_data.get('pdf', ''),
+                                    'contract_name': bill_data.get('contract_name', ''),
+                                    'period_start_date': parse_date_str(bill_data.get('period_start_date')),
+                                    'period_end_date': parse_date_str(bill_data.get('period_end_date')),
+                                    'due_date': parse_date_str(bill_data.get('due_date')),
+                                    'created_at_api': parse_date_str(bill_data.get('created_at')),
+                                    'currency': bill_data.get('currency', 'SAR'),
+                                    'grand_total': grand_total,
+                                    'discount': bill_data.get('discount', 0),
+                                    'grand_total_after_discount': bill_data.get('grand_total_after_discount', 0),
+                                    'finalised_on': parse_date_str(bill_data.get('finalised_on')),
+                                    'finalised_by': bill_data.get('finalised_by', ''),
+                                    'remark': bill_data.get('remark', ''),
+                                    'fees': bill_data.get('fees', []),
+                                    'hub_bills': bill_data.get('hub_bills', []),
+                                    'payload_hash': bill_hash,
+                                    'detail_etag': etag,
+                                    'detail_last_modified': last_modified,
+                                    'created_at_local': timezone.now(),
+                                    'updated_at_local': timezone.now(),
+                                }
+                            )
+
+                            record_changes()
+                            if created:
+                                total_created += 1
+                                log(f'🧾 Created Bill: {bill.name}', logging.DEBUG)
+                            else:
+                                total_updated += 1
+                                log(f'🔁 Updated Bill: {bill.name}', logging.DEBUG)
+
+                            total_synced += 1
+
+                        if current_page >= last_page:
+                            break
+                        page += 1
+
+                    except requests.RequestException as e:
+                        log(f"❌ API request failed: {str(e)}", logging.ERROR)
+                        break
+                    except Exception as e:
+                        log(f"🔥 Unexpected error: {str(e)}", logging.ERROR)
+                        log(traceback.format_exc(), logging.ERROR)
+                        break
 
-        # Save logs to DB
-        SyncLog.objects.update_or_create(
-            key='vendor_bills',
-            defaults={'content': '\n'.join(log_lines)}
-        )
+            log(f"\n✅ Successfully synced {total_synced} bills")
+
+            # Save sync timestamp
+            SyncStatus.objects.update_or_create(
+                key='vendor_bills',
+                defaults={'last_synced_at': timezone.now()}
+            )
+
+            summary = (
+                f"\n✅ Sync Complete!\n"
+                f"Created: {total_created}\n"
+                f"Updated: {total_updated}\n"
+                f"Unchanged: {total_unchanged}\n"
+                f"Total Synced: {total_synced}"
+            )
+            log(summary)
+
+            # Store the summary; the lines were saved in chunks as we went
+            log.finish(summary)
@@ -1,8 +1,18 @@
 from django.core.management.base import BaseCommand
 from django.utils import timezone
-from core.models import Seller, Order, SyncStatus, SyncLog
-from decouple import config
-from datetime import datetime
+from core.models import SyncStatus, SyncLog
+from core.utils.dashboard_cache import bumps_data_version
+from core.utils.leases import ORDER_SYNC_LEASE, exclusive
+from core.utils.omniful_client import get_client
+from core.utils.order_ingest import bulk_upsert_orders, transform_order_page
+from core.utils.pipeline import IngestionPipeline
+from core.utils.scheduling import due_sellers, force_sync, mark_synced, plan_schedules
+from core.utils.seller_catalog import get_catalog
+from core.utils.sync_log import SyncLogWriter
+from core.utils.sync_utils import (
+    advance_watermark, get_watermark, order_watermark_key, page_behind_watermark,
+)
+import logging
 import requests
 import traceback
 
@@ -10,194 +20,171 @@ import traceback
 class Command(BaseCommand):
     help = 'Sync orders from Omniful API for all sellers'
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Re-scan every order page instead of stopping at the per-seller watermark',
+        )
+        parser.add_argument(
+            '--scheduled',
+            action='store_true',
+            help='Only sync the sellers that are due by their order velocity schedule',
+        )
+        parser.add_argument(
+            '--force',
+            nargs='+',
+            metavar='SELLER_CODE',
+            help='Make these sellers due now, then run the scheduled sync',
+        )
+
+    @exclusive(ORDER_SYNC_LEASE)
+    @bumps_data_version
     def handle(self, *args, **options):
-        log_lines = []
+        full_scan = options.get('full', False)
         stdout = options.get('stdout', self.stdout)
 
-        def log(msg):
-            log_lines.append(msg)
-            stdout.write(msg + "\n")
-            stdout.flush()
-
-        token = config('OMNIFUL_ACCESS_TOKEN', default='')
-        if not token:
-            log("❌ OMNIFUL_ACCESS_TOKEN not set in .env file")
-            return
-
-        headers = {
-            'Authorization': f'Bearer {token}',
-            'Content-Type': 'application/json'
-        }
-
-        # Step 1: Fetch all sellers
-        sellers = []
-        page = 1
-        while True:
-            url = f'https://prodapi.omniful.com/sales-channel/public/v1/tenants/sellers?page={page}&per_page=100'
-            try:
-                log(f"🌐 Fetching sellers from page {page}")
-                response = requests.get(url, headers=headers, timeout=30)
-                response.raise_for_status()
-                data = response.json()
-
-                seller_data_list = data.get('data', [])
-                meta = data.get('meta', {})
-                current_page = meta.get('current_page', page)
-                last_page = meta.get('last_page', page)
-
-                if not seller_data_list:
-                    log("✅ No more sellers found.")
-                    break
-
-                for s in seller_data_list:
-                    if not s.get('code') or not s.get('name'):
-                        continue
-                    seller, _ = Seller.objects.get_or_create(
-                        code=s['code'], defaults={'name': s['name']})
-                    sellers.append(seller)
-
-                if current_page >= last_page:
-                    break
-                page += 1
-
-            except requests.RequestException as e:
-                log(f"❌ Failed to fetch sellers: {str(e)}")
+        with SyncLogWriter('orders', stdout) as log:
+            client = get_client()
+            if not client.has_token:
+                log("❌ OMNIFUL_ACCESS_TOKEN not set in .env file", logging.ERROR)
+                log.finish("❌ OMNIFUL_ACCESS_TOKEN not set", SyncLog.FAILED)
                 return
 
-        # Step 2: Fetch orders for each seller
-        total_created = total_updated = total_synced = 0
-
-        for seller in sellers:
-            if not seller.code:
-                log(f"⚠️ Skipping seller with missing code: {seller.name}")
-                continue
-
-            page = 1
-            log(f"📦 Syncing orders for seller: {seller.name} ({seller.code})")
-
-            while True:
-                orders_url = f'https://prodapi.omniful.com/sales-channel/public/v1/tenants/sellers/{seller.code}/orders?page={page}&per_page=100'
-                try:
-                    response = requests.get(
-                        orders_url, headers=headers, timeout=30)
-                    response.raise_for_status()
-                    data = response.json()
-
-                    orders = data.get('data', [])
-                    meta = data.get('meta', {})
-                    current_page = meta.get('current_page', page)
-                    last_page = meta.get('last_page', 1)
-
-                    if not orders:
-                        log(f"✅ No orders for {seller.name} on page {page}")
+            # Step 1: Sellers come from the catalog, which only re-fetches
+            # /tenants/sellers once SELLER_CATALOG_TTL has passed
+            catalog = get_catalog(client, log=log)
+            sellers = list(catalog)
+
+            if options.get('force'):
+                for code in options['force']:
+                    seller = catalog.get(code=code)
+                    if seller is None:
+                        log(f"⚠️ Unknown seller code {code}, not forcing it", logging.WARNING)
+                    else:
+                        force_sync(seller)
+            if options.get('scheduled') or options.get('force'):
+                # Busy sellers come due often, dormant ones rarely
+                plan_schedules()
+                sellers = due_sellers()
+                log(f"🗓️ {len(sellers)} of {len(catalog.active())} active sellers are due")
+
+            # Step 2: Fetch orders for each seller. Pages flow through the
+            # ingestion pipeline so the next page downloads while this one is
+            # written; with one fetcher and one transformer they stay in order.
+            totals = {'created': 0, 'updated': 0, 'unchanged': 0}
+            newest_seen = {}
+            started_at = {}
+            # Sellers with a page that was fetched but never stored
+            write_failed = set()
+
+            def fetch_seller(seller):
+                if not seller.code:
+                    log(f"⚠️ Skipping seller with missing code: {seller.name}", logging.WARNING)
+                    return
+
+                page = 1
+                started_at[seller.code] = timezone.now()
+                watermark = None if full_scan else get_watermark(order_watermark_key(seller.code))
+                completed = False
+                log(f"📦 Syncing orders for seller: {seller.name} ({seller.code})")
+                if watermark:
+                    log(f"⏩ Incremental sync from watermark {watermark.isoformat()}")
+
+                while True:
+                    try:
+                        data = client.get_json(
+                            f'/tenants/sellers/{seller.code}/orders',
+                            params={'page': page, 'per_page': 100})
+
+                        orders = data.get('data', [])
+                        meta = data.get('meta', {})
+                        current_page = meta.get('current_page', page)
+                        last_page = meta.get('last_page', 1)
+
+                        if not orders:
+                            log(f"✅ No orders for {seller.name} on page {page}")
+                            completed = True
+                            break
+
+                        yield {'seller': seller, 'page': page, 'orders': orders}
+
+                        if current_page >= last_page:
+                            completed = True
+                            break
+                        if page_behind_watermark(orders, watermark):
+                            log(f"⏹️ Page {page} is behind the watermark, stopping")
+                            completed = True
+                            break
+                        page += 1
+
+                    except requests.RequestException as e:
+                        log(f"❌ Failed to fetch orders for {seller.name}: {str(e)}", logging.ERROR)
                         break
-
-                    for order_data in orders:
-                        omniful_id = order_data.get('id')
-                        order_id = order_data.get('order_id')
-
-                        if not order_id or not omniful_id:
-                            continue
-
-                        try:
-                            order_created_at = datetime.fromisoformat(
-                                order_data.get('order_created_at', '').replace('Z', '+00:00'))
-                        except:
-                            order_created_at = timezone.now()
-
-                        shipment = order_data.get('shipment', {})
-                        delivery_status = shipment.get('delivery_status', '')
-                        try:
-                            delivery_date = datetime.fromisoformat(shipment.get('order_delivered_at', '').replace(
-                                'Z', '+00:00')) if shipment.get('order_delivered_at') else None
-                        except:
-                            delivery_date = None
-
-                        customer = order_data.get('customer', {})
-                        billing = order_data.get('billing_address', {})
-                        shipping = order_data.get('shipping_address', {})
-
-                        order, created = Order.objects.update_or_create(
-                            omniful_id=omniful_id,
-                            defaults={
-                                'order_id': order_id,
-                                'order_alias': order_data.get('order_alias', ''),
-                                'seller': seller,
-                                'seller_code': order_data.get('seller_code', ''),
-                                'store_name': order_data.get('store_name', ''),
-                                'status_code': order_data.get('status_code', ''),
-                                'source': order_data.get('source', ''),
-                                'order_type': order_data.get('type', 'B2C'),
-                                'delivery_type': order_data.get('delivery_type', ''),
-                                'order_created_at': order_created_at,
-                                'created_at_api': order_created_at,
-                                'delivery_date': delivery_date,
-                                'payment_mode': order_data.get('payment_mode', ''),
-                                'payment_method': order_data.get('payment_method', ''),
-                                'total': order_data.get('total', 0),
-                                'billing_address': billing,
-                                'shipping_address': shipping,
-                                'shipping_city': shipping.get('city', ''),
-                                'shipping_region': shipping.get('state', ''),
-                                'shipping_country': shipping.get('country', ''),
-                                'customer': customer,
-                                'customer_first_name': customer.get('first_name', ''),
-                                'customer_last_name': customer.get('last_name', ''),
-                                'customer_email': customer.get('email', ''),
-                                'customer_phone': customer.get('phone', ''),
-                                'shipment': shipment,
-                                'delivery_status': delivery_status,
-                                'tracking_url': shipment.get('tracking_url', ''),
-                                'shipment_type': order_data.get('shipment_type', ''),
-                                'require_shipping': order_data.get('require_shipping', True),
-                                'cancel_order_after_seconds': order_data.get('cancel_order_after_seconds', 0),
-                                'expected_delivery_epoch': order_data.get('expected_delivery_epoch', 0),
-                                'invoice': order_data.get('invoice', {}),
-                                'raw_data': order_data,
-                            }
-                        )
-
-                        if created:
-                            total_created += 1
-                            log(
-                                f'🆕 Created Order: {order.order_id} (Omniful ID: {order.omniful_id})')
-                        else:
-                            total_updated += 1
-                            log(
-                                f'♻️ Updated Order: {order.order_id} (Omniful ID: {order.omniful_id})')
-
-                        total_synced += 1
-
-                    if current_page >= last_page:
+                    except Exception as e:
+                        log(f"🔥 Error syncing order: {str(e)}", logging.ERROR)
+                        log(traceback.format_exc(), logging.ERROR)
                         break
-                    page += 1
 
-                except requests.RequestException as e:
-                    log(f"❌ Failed to fetch orders for {seller.name}: {str(e)}")
-                    break
-                except Exception as e:
-                    log(f"🔥 Error syncing order: {str(e)}")
-                    log(traceback.format_exc())
-                    break
-
-        log(f"\n✅ Orders sync completed. Total orders synced: {total_synced}")
-
-        # Save sync status timestamp
-        SyncStatus.objects.update_or_create(
-            key='orders',
-            defaults={'last_synced_at': timezone.now()}
-        )
+                yield {'seller': seller, 'end': True, 'completed': completed}
 
-        summary = (
-            f"\n✅ Sync Complete!\n"
-            f"Created: {total_created}\n"
-            f"Updated: {total_updated}\n"
-            f"Total Synced: {total_synced}"
-        )
-        log(summary)
+            def write(batch):
+                seller = batch['seller']
+                if batch.get('end'):
+                    # Only move the watermark after a clean pass, otherwise orders on
+                    # the pages we never reached or failed to store would be skipped
+                    # next time.
+                    if batch['completed'] and seller.code not in write_failed:
+                        advance_watermark(order_watermark_key(seller.code), newest_seen.get(seller.code))
+                        mark_synced(seller, started_at[seller.code])
+                    return
 
-        # Save logs to DB
-        SyncLog.objects.update_or_create(
-            key='orders',
-            defaults={'content': '\n'.join(log_lines)}
-        )
+                try:
+                    created, updated, unchanged = bulk_upsert_orders(batch['rows'])
+                except Exception as e:
+                    write_failed.add(seller.code)
+                    log(f"🔥 Error saving page {batch['page']} for {seller.name}: {str(e)}", logging.ERROR)
+                    return
+
+                seen = batch['newest_seen']
+                if seen and (seller.code not in newest_seen or seen > newest_seen[seller.code]):
+                    newest_seen[seller.code] = seen
+
+                totals['created'] += created
+                totals['updated'] += updated
+                totals['unchanged'] += unchanged
+                log(f"💾 Page {batch['page']}: {created} created, {updated} updated, {unchanged} unchanged")
+
+            def pipeline_error(stage, item, error):
+                log(f"🔥 Error syncing orders ({stage}): {str(error)}", logging.ERROR)
+                # A page lost in the transform never reaches write()
+                if isinstance(item, dict) and 'seller' in item:
+                    write_failed.add(item['seller'].code)
+
+            pipeline = IngestionPipeline(on_error=pipeline_error)
+            pipeline.run(sellers, fetch_seller, transform_order_page, write)
+
+            total_created = totals['created']
+            total_updated = totals['updated']
+            total_unchanged = totals['unchanged']
+            total_synced = total_created + total_updated + total_unchanged
+
+            log(f"\n✅ Orders sync completed. Total orders synced: {total_synced}")
+
+            # Save sync status timestamp
+            SyncStatus.objects.update_or_create(
+                key='orders',
+                defaults={'last_synced_at': timezone.now()}
+            )
+
+            summary = (
+                f"\n✅ Sync Complete!\n"
+                f"Created: {total_created}\n"
+                f"Updated: {total_updated}\n"
+                f"Unchanged: {total_unchanged}\n"
+                f"Total Synced: {total_synced}"
+            )
+            log(summary)
+
+            # Store the summary; the lines were saved in chunks as we went
+            log.finish(summary)
@@ -2,9 +2,9 @@
 Test command to check Omniful API connectivity and response format.
 """
 
-import requests
 from django.core.management.base import BaseCommand
 from django.conf import settings
+from core.utils.omniful_client import get_client
 
 class Command(BaseCommand):
     help = 'Test Omniful API connectivity'
@@ -66,8 +66,8 @@ class Command(BaseCommand):
             # Test Order endpoint
         self.stdout.write('\nTesting Order endpoint...')
         try:
-            url = 'https://prodapi.omniful.com//sales-channel/public/v1/tenants/sellers/KE-270/orders?page=1&per_page=20'
-            response = requests.get(url, headers=headers, timeout=10)
+            response = get_client().get(
+                '/tenants/sellers/KE-270/orders?page=1&per_page=20', timeout=10)
             self.stdout.write(f'Status Code: {response.status_code}')
 
             if response.status_code == 200:
@@ -2,9 +2,9 @@
 Test different authentication methods with Omniful API.
 """
 
-import requests
 from django.core.management.base import BaseCommand
 from django.conf import settings
+from core.utils.omniful_client import OmnifulClient
 
 
 class Command(BaseCommand):
@@ -38,12 +38,17 @@ class Command(BaseCommand):
             }
         ]
         
-        url = 'https://prodapi.omniful.com/sales-channel/public/v1/tenants/sellers?page=1&per_page=1'
+        path = '/tenants/sellers?page=1&per_page=1'
+        
+        # A bare client (no default auth header, no retries) so each case
+        # sends exactly the headers under test
+        client = OmnifulClient(token='', max_retries=0)
+        client.session.headers.pop('Authorization', None)
         
         for test in test_cases:
             self.stdout.write(f'\nTesting: {test["name"]}')
             try:
-                response = requests.get(url, headers=test['headers'], timeout=10)
+                response = client.get(path, headers=test['headers'], timeout=10)
                 self.stdout.write(f'Status: {response.status_code}')
                 if response.status_code == 200:
                     self.stdout.write('SUCCESS!')
@@ -2,12 +2,11 @@
 Management command to update bill dates from Omniful API.
 """
 
-import requests
-from datetime import datetime
 from django.core.management.base import BaseCommand
-from django.utils import timezone
 from core.models import VendorBill
-from decouple import config
+from core.utils.dashboard_cache import bumps_data_version, record_changes
+from core.utils.dates import parse_omniful_datetime
+from core.utils.omniful_client import get_client
 
 
 class Command(BaseCommand):
@@ -21,17 +20,14 @@ class Command(BaseCommand):
             help='Limit number of bills to update (default: 10)',
         )
     
+    @bumps_data_version
     def handle(self, *args, **options):
-        token = config('OMNIFUL_ACCESS_TOKEN', default='')
+        client = get_client()
         
-        if not token:
+        if not client.has_token:
             self.stdout.write(self.style.ERROR('OMNIFUL_ACCESS_TOKEN not configured'))
             return
         
-        headers = {
-            'Authorization': f'Bearer {token}'
-        }
-        
         limit = options['limit']
         bills = VendorBill.objects.all()[:limit]
         
@@ -43,11 +39,7 @@ class Command(BaseCommand):
         for bill in bills:
             try:
                 self.stdout.write(f'Updating {bill.name}...')
-                url = f'https://prodapi.omniful.com/sales-channel/public/v1/tenants/bills/{bill.name}'
-                
-                response = requests.get(url, headers=headers, timeout=30)
-                response.raise_for_status()
-                data = response.json()
+                data = client.get_json(f'/tenants/bills/{bill.name}')
                 
                 bill_data = data.get('data', {})
                 
@@ -55,10 +47,13 @@ class Command(BaseCommand):
                 created_at_str = bill_data.get('created_at')
                 if created_at_str:
                     try:
-                        created_at = datetime.strptime(created_at_str, '%B %d, %Y %I:%M %p')
-                        bill.created_at = timezone.make_aware(created_at)
-                        bill.save(update_fields=['created_at'])
-                        self.stdout.write(f'  Updated created_at: {bill.created_at}')
+                        created_at = parse_omniful_datetime(created_at_str)
+                        if created_at is None:
+                            raise ValueError(f'Unrecognised date {created_at_str!r}')
+                        bill.created_at_api = created_at
+                        bill.save(update_fields=['created_at_api'])
+                        record_changes()
+                        self.stdout.write(f'  Updated created_at: {bill.created_at_api}')
                         success_count += 1
                     except Exception as e:
                         self.stdout.write(self.style.ERROR(f'  Error parsing date: {str(e)}'))
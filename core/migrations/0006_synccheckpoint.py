@@ -0,0 +1,31 @@
+# Generated by Django 4.2.13 on 2026-10-18 15:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_alter_synclog_options_remove_synclog_completed_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('job', models.CharField(max_length=100)),
+                ('seller_code', models.CharField(max_length=100)),
+                ('last_page', models.IntegerField(default=0)),
+                ('done_pages', models.JSONField(blank=True, default=list)),
+                ('total_pages', models.IntegerField(default=0)),
+                ('total_orders', models.IntegerField(default=0)),
+                ('is_complete', models.BooleanField(default=False)),
+                ('started_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'unique_together': {('job', 'seller_code')},
+            },
+        ),
+    ]
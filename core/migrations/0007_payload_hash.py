@@ -0,0 +1,28 @@
+# Generated by Django 4.2.13 on 2026-10-18 15:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_synccheckpoint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='payload_hash',
+            field=models.CharField(blank=True, default='', max_length=32),
+        ),
+        migrations.AddField(
+            model_name='seller',
+            name='payload_hash',
+            field=models.CharField(blank=True, default='', max_length=32),
+        ),
+        migrations.AddField(
+            model_name='vendorbill',
+            name='payload_hash',
+            field=models.CharField(blank=True, default='', max_length=32),
+        ),
+    ]
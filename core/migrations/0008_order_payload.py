@@ -0,0 +1,104 @@
+# Generated by Django 4.2.13 on 2026-10-18 15:15
+
+from django.db import migrations, models
+import django.db.models.deletion
+import json
+import zlib
+
+
+# Orders read and payloads written per round trip during the backfill
+CHUNK_SIZE = 1000
+
+
+def pack(payload):
+    return zlib.compress(json.dumps(payload, separators=(',', ':')).encode('utf-8'))
+
+
+def move_payloads(apps, schema_editor):
+    """Compress Order.raw_data into OrderPayload, CHUNK_SIZE orders at a time."""
+    Order = apps.get_model('core', 'Order')
+    OrderPayload = apps.get_model('core', 'OrderPayload')
+    last_pk = 0
+    while True:
+        chunk = list(
+            Order.objects.filter(pk__gt=last_pk).order_by('pk')
+            .values_list('pk', 'raw_data')[:CHUNK_SIZE]
+        )
+        if not chunk:
+            break
+        OrderPayload.objects.bulk_create(
+            [OrderPayload(order_id=pk, data=pack(raw)) for pk, raw in chunk if raw],
+            ignore_conflicts=True,
+        )
+        last_pk = chunk[-1][0]
+
+
+def restore_payloads(apps, schema_editor):
+    """Refill raw_data and the JSON detail columns from OrderPayload."""
+    Order = apps.get_model('core', 'Order')
+    OrderPayload = apps.get_model('core', 'OrderPayload')
+    last_pk = 0
+    while True:
+        chunk = list(
+            OrderPayload.objects.filter(pk__gt=last_pk).order_by('pk')
+            .values_list('pk', 'data')[:CHUNK_SIZE]
+        )
+        if not chunk:
+            break
+        orders = []
+        for pk, data in chunk:
+            raw = json.loads(zlib.decompress(bytes(data)))
+            orders.append(Order(
+                pk=pk,
+                raw_data=raw,
+                billing_address=raw.get('billing_address') or {},
+                shipping_address=raw.get('shipping_address') or {},
+                customer=raw.get('customer') or {},
+                shipment=raw.get('shipment') or {},
+                invoice=raw.get('invoice') or {},
+            ))
+        Order.objects.bulk_update(orders, ['raw_data', 'billing_address', 'shipping_address',
+                                           'customer', 'shipment', 'invoice'])
+        last_pk = chunk[-1][0]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_payload_hash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderPayload',
+            fields=[
+                ('order', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='payload', serialize=False, to='core.order')),
+                ('data', models.BinaryField()),
+            ],
+        ),
+        migrations.RunPython(move_payloads, restore_payloads),
+        migrations.RemoveField(
+            model_name='order',
+            name='billing_address',
+        ),
+        migrations.RemoveField(
+            model_name='order',
+            name='customer',
+        ),
+        migrations.RemoveField(
+            model_name='order',
+            name='invoice',
+        ),
+        migrations.RemoveField(
+            model_name='order',
+            name='raw_data',
+        ),
+        migrations.RemoveField(
+            model_name='order',
+            name='shipment',
+        ),
+        migrations.RemoveField(
+            model_name='order',
+            name='shipping_address',
+        ),
+    ]
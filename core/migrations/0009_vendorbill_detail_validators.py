@@ -0,0 +1,23 @@
+# Generated by Django 4.2.13 on 2026-10-18 15:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_order_payload'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vendorbill',
+            name='detail_etag',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+        migrations.AddField(
+            model_name='vendorbill',
+            name='detail_last_modified',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+    ]
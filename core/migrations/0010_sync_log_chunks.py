@@ -0,0 +1,64 @@
+# Generated by Django 4.2.13 on 2026-10-18 15:40
+
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+def fill_run_ids(apps, schema_editor):
+    SyncLog = apps.get_model('core', 'SyncLog')
+    for log in SyncLog.objects.filter(run_id__isnull=True).only('pk'):
+        log.run_id = uuid.uuid4()
+        log.save(update_fields=['run_id'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_vendorbill_detail_validators'),
+    ]
+
+    operations = [
+        # Existing logs need distinct run ids before the column turns unique
+        migrations.AddField(
+            model_name='synclog',
+            name='run_id',
+            field=models.UUIDField(editable=False, null=True),
+        ),
+        migrations.RunPython(fill_run_ids, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='synclog',
+            name='run_id',
+            field=models.UUIDField(default=uuid.uuid4, editable=False, unique=True),
+        ),
+        migrations.AddField(
+            model_name='synclog',
+            name='status',
+            field=models.CharField(choices=[('running', 'Running'), ('success', 'Success'), ('failed', 'Failed')], default='success', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='synclog',
+            name='line_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='synclog',
+            name='finished_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='SyncLogChunk',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('seq', models.IntegerField()),
+                ('max_level', models.SmallIntegerField(default=20)),
+                ('lines', models.JSONField(default=list)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('log', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='chunks', to='core.synclog')),
+            ],
+            options={
+                'ordering': ['seq'],
+                'unique_together': {('log', 'seq')},
+            },
+        ),
+    ]
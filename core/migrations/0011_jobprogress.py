@@ -0,0 +1,31 @@
+# Generated by Django 4.2.13 on 2026-10-18 17:05
+
+from django.db import migrations, models
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_sync_log_chunks'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JobProgress',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('run_id', models.UUIDField(default=uuid.uuid4, editable=False, unique=True)),
+                ('job', models.CharField(max_length=100)),
+                ('scope', models.CharField(blank=True, default='', max_length=100)),
+                ('data', models.JSONField(blank=True, default=dict)),
+                ('is_complete', models.BooleanField(default=False)),
+                ('started_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['-started_at'],
+                'indexes': [models.Index(fields=['job', '-started_at'], name='core_jobpro_job_6fbcef_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 4.2.13 on 2026-10-18 17:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncLease',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=100, unique=True)),
+                ('holder', models.CharField(blank=True, default='', max_length=255)),
+                ('acquired_at', models.DateTimeField(blank=True, null=True)),
+                ('expires_at', models.DateTimeField(blank=True, null=True)),
+                ('rerun_requested', models.BooleanField(default=False)),
+            ],
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.13 on 2026-10-18 18:10
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_synclease'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SellerSyncSchedule',
+            fields=[
+                ('seller', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='sync_schedule', serialize=False, to='core.seller')),
+                ('orders_per_hour', models.FloatField(default=0)),
+                ('interval_minutes', models.IntegerField(default=0)),
+                ('next_sync_at', models.DateTimeField(blank=True, db_index=True, null=True)),
+                ('last_synced_at', models.DateTimeField(blank=True, null=True)),
+                ('force', models.BooleanField(default=False)),
+            ],
+        ),
+    ]
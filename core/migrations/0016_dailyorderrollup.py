@@ -0,0 +1,39 @@
+# Generated by Django 4.2.13 on 2026-10-18 19:32
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_orderevent'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyOrderRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('order_type', models.CharField(max_length=10)),
+                ('status_code', models.CharField(max_length=50)),
+                ('payment_mode', models.CharField(max_length=50)),
+                ('delay_category', models.CharField(max_length=20)),
+                ('shipping_city', models.CharField(max_length=100)),
+                ('orders', models.IntegerField(default=0)),
+                ('delayed_orders', models.IntegerField(default=0)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('delivered_orders', models.IntegerField(default=0)),
+                ('days_to_deliver', models.IntegerField(default=0)),
+                ('seller', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='order_rollups', to='core.seller')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['seller', 'day'], name='core_dailyo_seller__560c7e_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='dailyorderrollup',
+            constraint=models.UniqueConstraint(fields=('day', 'seller', 'order_type', 'status_code', 'payment_mode', 'delay_category', 'shipping_city'), name='unique_daily_order_rollup'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 4.2.13 on 2026-10-18 20:05
+
+from django.db import migrations, models
+from django.db.models.functions import Lower, Trim
+
+
+def fill_status_clean(apps, schema_editor):
+    Order = apps.get_model('core', 'Order')
+    Order.objects.update(status_clean=Lower(Trim('status_code')))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_dailyorderrollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='status_clean',
+            field=models.CharField(blank=True, default='', max_length=50),
+        ),
+        migrations.RunPython(fill_status_clean, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['seller', 'order_created_at'], name='order_seller_created'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['status_code', 'order_created_at'], name='order_status_created'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['order_created_at'], name='order_created'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(condition=models.Q(('status_clean', 'delivered'), _negated=True), fields=['order_created_at'], name='order_undelivered_created'),
+        ),
+    ]
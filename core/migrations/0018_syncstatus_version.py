@@ -0,0 +1,18 @@
+# Generated by Django 4.2.13 on 2026-10-18 20:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_order_dashboard_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='syncstatus',
+            name='version',
+            field=models.IntegerField(default=0),
+        ),
+    ]
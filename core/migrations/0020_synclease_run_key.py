@@ -0,0 +1,18 @@
+# Generated by Django 4.2.13 on 2026-10-18 21:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0019_job_heartbeat_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='synclease',
+            name='run_key',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+    ]
@@ -1,9 +1,11 @@
 from django.db import models
 from django.utils import timezone
 from django.contrib.auth.models import User
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 import json
+import uuid
+import zlib
 
 
 class TimeStampedModel(models.Model):
@@ -69,6 +71,9 @@ class Seller(models.Model):
     created_at_api = models.DateTimeField(null=True, blank=True)
     updated_at_api = models.DateTimeField(null=True, blank=True)
 
+    # Hash of the last API payload written, used to skip no-op updates
+    payload_hash = models.CharField(max_length=32, blank=True, default='')
+
     created_at_local = models.DateTimeField(auto_now_add=True)
     updated_at_local = models.DateTimeField(auto_now=True)
 
@@ -128,6 +133,13 @@ class VendorBill(models.Model):
     hub_bills = models.JSONField(
         default=list, blank=True, null=True)  # Added null=True
 
+    # Hash of the last listing payload written, used to skip no-op updates
+    payload_hash = models.CharField(max_length=32, blank=True, default='')
+    # Validators of the last bill detail response, sent back on the next
+    # sync as If-None-Match / If-Modified-Since
+    detail_etag = models.CharField(max_length=255, blank=True, default='')
+    detail_last_modified = models.CharField(max_length=64, blank=True, default='')
+
     # New timestamp fields (from API and local)
     created_at_api = models.DateTimeField(
         null=True, blank=True)  # Timestamp from Omniful API
@@ -175,6 +187,8 @@ class Order(models.Model):
     seller_code = models.CharField(max_length=50, blank=True, null=True)
     store_name = models.CharField(max_length=255)
     status_code = models.CharField(max_length=50, choices=ORDER_STATUS_CHOICES)
+    # status_code trimmed and lowercased, for indexable status predicates
+    status_clean = models.CharField(max_length=50, blank=True, default='')
     source = models.CharField(max_length=100, blank=True, null=True)
     order_type = models.CharField(max_length=10, choices=ORDER_TYPE_CHOICES)
     delivery_type = models.CharField(max_length=50, blank=True)
@@ -192,21 +206,17 @@ class Order(models.Model):
     total = models.DecimalField(max_digits=15, decimal_places=2, default=0)
 
     # Address info
-    billing_address = models.JSONField(default=dict, blank=True, null=True)
-    shipping_address = models.JSONField(default=dict, blank=True, null=True)
     shipping_city = models.CharField(max_length=100, blank=True)
     shipping_region = models.CharField(max_length=100, blank=True)
     shipping_country = models.CharField(max_length=100, blank=True)
 
     # Customer info
-    customer = models.JSONField(default=dict, blank=True, null=True)
     customer_first_name = models.CharField(max_length=100)
     customer_last_name = models.CharField(max_length=100)
     customer_email = models.EmailField(blank=True, null=True)
     customer_phone = models.CharField(max_length=50, blank=True, null=True)
 
     # Shipment info
-    shipment = models.JSONField(default=dict, blank=True, null=True)
     delivery_status = models.CharField(max_length=50, blank=True)
     tracking_url = models.URLField(blank=True, null=True)
     shipment_type = models.CharField(max_length=50, blank=True, null=True)
@@ -214,25 +224,58 @@ class Order(models.Model):
     cancel_order_after_seconds = models.IntegerField(default=0)
     expected_delivery_epoch = models.BigIntegerField(default=0)
 
-    # Invoice details
-    invoice = models.JSONField(default=dict, blank=True, null=True)
-
     # Calculated fields
     days_to_deliver = models.IntegerField(null=True, blank=True)
     is_delayed = models.BooleanField(default=False)
     delay_category = models.CharField(
         max_length=20, blank=True)  # 'green', 'yellow', 'red'
 
-    # Raw data
-    raw_data = models.JSONField(default=dict)
+    # Hash of the raw payload (stored in OrderPayload), used to skip no-op updates
+    payload_hash = models.CharField(max_length=32, blank=True, default='')
 
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['seller', 'order_created_at'], name='order_seller_created'),
+            models.Index(fields=['status_code', 'order_created_at'], name='order_status_created'),
+            models.Index(fields=['order_created_at'], name='order_created'),
+            # Dashboards list undelivered orders by age; delivered ones are
+            # most of the table and stay out of this index
+            models.Index(fields=['order_created_at'], condition=~models.Q(status_clean='delivered'),
+                         name='order_undelivered_created'),
+        ]
+
     def __str__(self):
         return f"{self.order_id} - {self.seller.name}"
 
+    @staticmethod
+    def normalize_status(status_code):
+        return (status_code or '').strip().lower()
+
+    @property
+    def raw_data(self):
+        """Original Omniful payload, loaded from OrderPayload on first access.
+
+        Addresses, customer, shipment and invoice details live only here.
+        """
+        try:
+            return self.payload.raw_data
+        except OrderPayload.DoesNotExist:
+            return {}
+
     def save(self, *args, **kwargs):
+        self.status_clean = self.normalize_status(self.status_code)
+        self.apply_delivery_metrics()
+        super().save(*args, **kwargs)
+
+    def apply_delivery_metrics(self):
+        """Fill days_to_deliver, delay_category and is_delayed.
+
+        Called from save() and by the bulk ingestion path, which bypasses
+        save() entirely.
+        """
         # Calculate delivery metrics
         if self.delivery_date and self.order_created_at:
             delta = self.delivery_date - self.order_created_at
@@ -252,21 +295,312 @@ class Order(models.Model):
             if delta.days > 2:
                 self.is_delayed = True
 
-        super().save(*args, **kwargs)
+
+class OrderPayload(models.Model):
+    """zlib-compressed Omniful payload of an Order.
+
+    Kept in its own table so the hot ``core_order`` rows stay small; only
+    the order detail page and the admin read it.
+    """
+    order = models.OneToOneField(
+        Order, on_delete=models.CASCADE, primary_key=True, related_name='payload')
+    data = models.BinaryField()
+
+    def __str__(self):
+        return f"Payload of order {self.order_id}"
+
+    @staticmethod
+    def pack(payload):
+        """Compress a payload dict for the ``data`` column."""
+        return zlib.compress(json.dumps(payload, separators=(',', ':')).encode('utf-8'))
+
+    @property
+    def raw_data(self):
+        return json.loads(zlib.decompress(bytes(self.data)))
+
+
+class DailyOrderRollup(models.Model):
+    """Order counts and sums per Asia/Riyadh day and dashboard dimension.
+
+    Maintained by core.utils.rollups: the ingestion paths recompute the
+    seller days a batch touched, deletes recompute the deleted orders' days
+    and rebuild_order_rollups recomputes arbitrary ranges.
+    """
+    day = models.DateField()
+    seller = models.ForeignKey(
+        Seller, on_delete=models.CASCADE, related_name='order_rollups')
+    order_type = models.CharField(max_length=10)
+    status_code = models.CharField(max_length=50)
+    payment_mode = models.CharField(max_length=50)
+    delay_category = models.CharField(max_length=20)
+    shipping_city = models.CharField(max_length=100)
+
+    orders = models.IntegerField(default=0)
+    delayed_orders = models.IntegerField(default=0)
+    total = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+    # days_to_deliver is only set on delivered orders; average it over
+    # ``delivered_orders``
+    delivered_orders = models.IntegerField(default=0)
+    days_to_deliver = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['day', 'seller', 'order_type', 'status_code', 'payment_mode',
+                        'delay_category', 'shipping_city'],
+                name='unique_daily_order_rollup'),
+        ]
+        indexes = [models.Index(fields=['seller', 'day'])]
+
+    def __str__(self):
+        return f"{self.seller_id} {self.day}: {self.orders} orders"
+
+
+@receiver(post_delete, sender=Order)
+def drop_deleted_order_from_rollup(sender, instance, **kwargs):
+    """Recompute a deleted order's daily rollup once the delete commits.
+
+    Saves don't touch rollups: the ingestion paths refresh the days they
+    write in bulk, and rebuild_order_rollups repairs orders edited by hand.
+    """
+    from core.utils.rollups import refresh_on_commit, rollup_day
+    refresh_on_commit([(instance.seller_id, rollup_day(instance.order_created_at))])
+
+
+class OrderEvent(models.Model):
+    """Order event received by the Omniful webhook, waiting to be applied.
+
+    Events are stored as received and applied in batches by
+    drain_order_events; ``event_id`` makes redeliveries no-ops.
+    """
+    CREATED = 'order.created'
+    UPDATED = 'order.updated'
+    EVENT_TYPES = [CREATED, UPDATED]
+
+    event_id = models.CharField(max_length=255, unique=True)
+    event_type = models.CharField(max_length=50)
+    seller_code = models.CharField(max_length=100, blank=True, default='')
+    omniful_id = models.CharField(max_length=100, blank=True, default='')
+    payload = models.JSONField(default=dict)
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+    attempts = models.IntegerField(default=0)
+    error = models.TextField(blank=True, default='')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['id'], condition=models.Q(processed_at__isnull=True),
+                         name='order_event_pending'),
+        ]
+
+    def __str__(self):
+        return f"{self.event_type} {self.event_id}"
 
 
 class SyncLog(models.Model):
+    """One run of a sync command.
+
+    ``content`` holds the run summary only; the full log is written to
+    SyncLogChunk rows while the run progresses.
+    """
+    RUNNING = 'running'
+    SUCCESS = 'success'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (RUNNING, 'Running'),
+        (SUCCESS, 'Success'),
+        (FAILED, 'Failed'),
+    ]
+
+    run_id = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
     key = models.CharField(max_length=50)  # e.g. 'sellers'
     content = models.TextField(null=True, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=SUCCESS)
+    line_count = models.IntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
 
     class Meta:
         ordering = ['-created_at']
 
+    def __str__(self):
+        return f"{self.key} run {self.run_id} ({self.status})"
+
+
+class SyncLogChunk(models.Model):
+    """A bounded batch of log lines of one SyncLog run.
+
+    ``lines`` is a list of ``[level, message]`` pairs using the stdlib
+    logging levels; ``max_level`` lets level filters skip whole chunks.
+    """
+    log = models.ForeignKey(SyncLog, on_delete=models.CASCADE, related_name='chunks')
+    seq = models.IntegerField()
+    max_level = models.SmallIntegerField(default=20)
+    lines = models.JSONField(default=list)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['seq']
+        unique_together = ('log', 'seq')
+
+
+class JobProgress(models.Model):
+    """Progress of one run of a long-running job, e.g. a full order sync.
+
+    ``data`` holds the job's counters as shown on its progress page. Runs
+    are independent rows, so several (say, one per seller) can report at
+    once; ``scope`` tells them apart.
+    """
+    run_id = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    job = models.CharField(max_length=100)  # e.g. 'sync_all_orders'
+    scope = models.CharField(max_length=100, blank=True, default='')  # e.g. a seller code
+    data = models.JSONField(default=dict, blank=True)
+    is_complete = models.BooleanField(default=False)
+    started_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-started_at']
+        indexes = [models.Index(fields=['job', '-started_at'])]
+
+    def __str__(self):
+        scope = f":{self.scope}" if self.scope else ''
+        return f"{self.job}{scope} run {self.run_id}"
+
+
+class Job(models.Model):
+    """A management command queued by the web tier for the run_jobs worker.
+
+    ``dedup_key`` identifies the command and its arguments; at most one
+    identical job can be waiting at a time.
+    """
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (SUCCEEDED, 'Succeeded'),
+        (FAILED, 'Failed'),
+    ]
+
+    job_type = models.CharField(max_length=100)  # management command name
+    args = models.JSONField(default=list, blank=True)
+    options = models.JSONField(default=dict, blank=True)
+    dedup_key = models.CharField(max_length=64)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=QUEUED)
+    result = models.TextField(blank=True, default='')  # tail of the command output
+    error = models.TextField(blank=True, default='')
+    worker = models.CharField(max_length=255, blank=True, default='')
+    requested_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    # Renewed by the worker while the job runs, see jobs.fail_stale_jobs()
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [models.Index(fields=['status', 'created_at'])]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['dedup_key'], condition=models.Q(status='queued'),
+                name='unique_queued_job'),
+        ]
+
+    def __str__(self):
+        return f"{self.job_type} #{self.pk} ({self.status})"
+
+    @property
+    def is_finished(self):
+        return self.status in (self.SUCCEEDED, self.FAILED)
+
+
+class SyncLease(models.Model):
+    """Lease that lets one process at a time run a sync.
+
+    The holder renews ``expires_at`` while it works; a lease that is not
+    renewed in time may be taken over. ``rerun_requested`` collects the
+    requests that arrived during a run into a single follow-up run; only
+    requests with the holder's ``run_key`` (command and options) can be
+    collected, since the follow-up repeats the holder's run.
+    """
+    key = models.CharField(max_length=100, unique=True)  # e.g. 'sync_orders'
+    holder = models.CharField(max_length=255, blank=True, default='')
+    run_key = models.CharField(max_length=64, blank=True, default='')
+    acquired_at = models.DateTimeField(null=True, blank=True)
+    expires_at = models.DateTimeField(null=True, blank=True)
+    rerun_requested = models.BooleanField(default=False)
+
+    def __str__(self):
+        return f"{self.key}: {self.holder or 'free'}"
+
+
+class SellerSyncSchedule(models.Model):
+    """When the scheduled order sync next polls a seller.
+
+    ``interval_minutes`` follows the seller's recent order rate; ``force``
+    makes the seller due on the next scheduled run whatever its interval.
+    """
+    seller = models.OneToOneField(
+        Seller, on_delete=models.CASCADE, primary_key=True, related_name='sync_schedule')
+    orders_per_hour = models.FloatField(default=0)
+    interval_minutes = models.IntegerField(default=0)
+    next_sync_at = models.DateTimeField(null=True, blank=True, db_index=True)
+    last_synced_at = models.DateTimeField(null=True, blank=True)
+    force = models.BooleanField(default=False)
+
+    def __str__(self):
+        return f"{self.seller_id}: every {self.interval_minutes} min"
+
 
 class SyncStatus(models.Model):
     key = models.CharField(max_length=100, unique=True)
     last_synced_at = models.DateTimeField(null=True, blank=True)
+    # Bumped on each change; used by the dashboard_data row
+    version = models.IntegerField(default=0)
 
     def __str__(self):
         return f"{self.key}: {self.last_synced_at}"
+
+
+class SyncCheckpoint(models.Model):
+    """Durable per-seller cursor of a resumable order sync.
+
+    ``last_page`` is the highest page committed with no gaps before it;
+    pages committed out of order by the fan-out path wait in
+    ``done_pages`` until the gap closes.
+    """
+    job = models.CharField(max_length=100)  # e.g. 'sync_all_orders'
+    seller_code = models.CharField(max_length=100)
+    last_page = models.IntegerField(default=0)
+    done_pages = models.JSONField(default=list, blank=True)
+    total_pages = models.IntegerField(default=0)
+    total_orders = models.IntegerField(default=0)
+    is_complete = models.BooleanField(default=False)
+    started_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('job', 'seller_code')
+
+    def __str__(self):
+        return f"{self.job}:{self.seller_code} page {self.last_page}/{self.total_pages}"
+
+    def is_page_done(self, page):
+        return page <= self.last_page or page in self.done_pages
+
+    def remaining_pages(self):
+        return [p for p in range(self.last_page + 1, self.total_pages + 1)
+                if p not in self.done_pages]
+
+    def mark_page(self, page):
+        """Record ``page`` as committed; call inside the page's transaction."""
+        done = set(self.done_pages)
+        done.add(page)
+        while self.last_page + 1 in done:
+            self.last_page += 1
+            done.discard(self.last_page)
+        self.done_pages = sorted(p for p in done if p > self.last_page)
+        self.save(update_fields=['last_page', 'done_pages', 'updated_at'])
@@ -1,3 +1,1213 @@
-from django.test import TestCase
+import io
+import json
+import re
+import time
+import threading
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+import requests
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection, connections
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from core.management.commands.benchmark_date_parsing import (
+    LEGACY, SAMPLES, legacy_strptime, legacy_sync_all_orders,
+)
+from core.management.commands.sync_all_orders import PAGE_FETCH_ATTEMPTS
+from core.models import (
+    DailyOrderRollup, Job, JobProgress, Order, OrderEvent, OrderPayload, Seller, SellerSyncSchedule, SyncCheckpoint, SyncLease,
+    SyncLog, SyncStatus, VendorBill,
+)
+from core.utils import dashboard_cache
+from core.utils import jobs, scheduling
+from core.utils.dates import RIYADH, parse_omniful_datetime
+from core.utils.kpis import order_kpis
+from core.utils.live_updates import progress_events
+from core.utils.leases import Lease, exclusive, run_key
+from core.utils.omniful_client import CircuitBreaker, CircuitOpenError, OmnifulClient
+from core.utils.order_events import drain_events, sign
+from core.utils.order_ingest import build_order_fields, bulk_upsert_orders
+from core.utils.progress import ORDERS_SYNC_DEFAULTS, ProgressReporter
+from core.utils.rate_limit import AdaptiveRateLimiter, parse_retry_after
+from core.utils.seller_catalog import get_catalog
+from core.utils.sync_utils import advance_watermark, get_watermark, order_watermark_key
+
+
+def make_order(seller, n, **fields):
+    values = {
+        'order_id': f'{seller.code}-{n}',
+        'omniful_id': f'{seller.code}-omniful-{n}',
+        'seller': seller,
+        'store_name': 'Store',
+        'status_code': 'processing',
+        'order_type': 'B2C',
+        'order_created_at': timezone.now() - timedelta(days=1),
+        'payment_mode': 'Prepaid',
+        'customer_first_name': 'First',
+        'customer_last_name': 'Last',
+    }
+    values.update(fields)
+    return Order.objects.create(**values)
+
+
+def order_payload(seller, n, **fields):
+    """An Omniful order as the API returns it."""
+    payload = {
+        'id': f'{seller.code}-omniful-{n}',
+        'order_id': f'{seller.code}-{n}',
+        'status_code': 'new_order',
+        'type': 'B2C',
+        'payment_mode': 'Prepaid',
+        'order_created_at': '2026-10-01T10:00:00Z',
+        'updated_at': '2026-10-01T10:00:00Z',
+    }
+    payload.update(fields)
+    return payload
+
+
+class FakeClient:
+    """Serves ``pages`` of orders for every seller."""
+
+    has_token = True
+
+    def __init__(self, pages):
+        self.pages = pages
+        self.requested = []
+        self.limiters = {}
+
+    def limiter(self, family):
+        return self.limiters.setdefault(family, AdaptiveRateLimiter(10))
+
+    def get_json(self, path, params=None, timeout=None):
+        page = params['page']
+        self.requested.append(page)
+        return {'data': self.pages[page - 1],
+                'meta': {'current_page': page, 'last_page': len(self.pages),
+                         'total': sum(len(orders) for orders in self.pages)}}
+
+    def get(self, path, params=None, timeout=None, headers=None):
+        data = self.get_json(path, params)
+        return mock.Mock(status_code=200, text='', json=mock.Mock(return_value=data))
+
+
+class FakeClock:
+    """Stands in for time.monotonic and time.sleep; sleeping advances it."""
+
+    def __init__(self):
+        self.now = 100.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class RateLimiterTests(TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        for name in ('monotonic', 'sleep'):
+            patcher = mock.patch(f'core.utils.rate_limit.time.{name}', getattr(self.clock, name))
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_additive_increase_up_to_the_ceiling(self):
+        limiter = AdaptiveRateLimiter(4, increase=0.5)
+        self.assertEqual(limiter.rate, 2.0)
+        for _ in range(3):
+            limiter.on_success()
+        self.assertEqual(limiter.rate, 3.5)
+        for _ in range(3):
+            limiter.on_success()
+        self.assertEqual(limiter.rate, 4.0)
+
+    def test_multiplicative_decrease_down_to_the_floor(self):
+        limiter = AdaptiveRateLimiter(8, floor=1)
+        limiter.on_throttle()
+        self.assertEqual(limiter.rate, 2.0)
+        limiter.on_throttle()
+        limiter.on_throttle()
+        self.assertEqual(limiter.rate, 1.0)
+
+    def test_acquire_waits_out_retry_after(self):
+        limiter = AdaptiveRateLimiter(4)
+        limiter.on_throttle(retry_after=5)
+        limiter.acquire()
+        self.assertEqual(self.clock.sleeps[0], 5)
+        self.assertGreaterEqual(self.clock.now, 105)
+
+    def test_parse_retry_after(self):
+        self.assertEqual(parse_retry_after('3'), 3.0)
+        self.assertEqual(parse_retry_after('-1'), 0.0)
+        self.assertIsNone(parse_retry_after(''))
+        self.assertIsNone(parse_retry_after('soon'))
+        later = timezone.now() + timedelta(seconds=60)
+        self.assertAlmostEqual(parse_retry_after(later.strftime('%a, %d %b %Y %H:%M:%S GMT')), 60, delta=2)
+
+    def test_capped_restores_the_limits(self):
+        limiter = AdaptiveRateLimiter(10, floor=2)
+        with limiter.capped(1):
+            self.assertEqual((limiter.ceiling, limiter.floor, limiter.rate), (1.0, 1.0, 1.0))
+        self.assertEqual((limiter.ceiling, limiter.floor, limiter.capacity), (10.0, 2.0, 10.0))
+        for _ in range(40):
+            limiter.on_success()
+        self.assertEqual(limiter.rate, 10.0)
+
+
+def api_response(status_code, **headers):
+    return mock.Mock(status_code=status_code, headers=headers)
+
+
+@override_settings(OMNIFUL_CIRCUIT_THRESHOLD=3, OMNIFUL_CIRCUIT_RESET=30,
+                   OMNIFUL_RATE_LIMITS={'default': 1000})
+class OmnifulClientTests(TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        for name in ('monotonic', 'sleep'):
+            patcher = mock.patch(f'core.utils.omniful_client.time.{name}', getattr(self.clock, name))
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        # Full jitter draws from [0, ceiling]; take the ceiling
+        patcher = mock.patch('core.utils.omniful_client.random.uniform', side_effect=lambda low, high: high)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = OmnifulClient(base_url='https://api.test', token='t', max_retries=3,
+                                    backoff_base=1, backoff_max=3)
+        self.client.session.get = mock.Mock()
+
+    def responses(self, *results):
+        self.client.session.get.side_effect = list(results)
+
+    def test_retries_transient_errors_with_backoff(self):
+        self.responses(api_response(502), requests.ConnectionError('reset'), api_response(200))
+        response = self.client.get('/orders')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.session.get.call_count, 3)
+        self.assertEqual(self.clock.sleeps, [1, 2])
+
+    def test_gives_up_after_max_retries(self):
+        self.responses(*[api_response(500) for _ in range(2)], api_response(504), api_response(503))
+        # The threshold would open the circuit on the third failure
+        self.client.breaker('api.test').failure_threshold = 10
+        response = self.client.get('/orders')
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(self.client.session.get.call_count, 4)
+        # Backoff doubles up to backoff_max
+        self.assertEqual(self.clock.sleeps, [1, 2, 3])
+
+    def test_client_errors_are_not_retried(self):
+        self.responses(api_response(404))
+        self.assertEqual(self.client.get('/orders').status_code, 404)
+        self.assertEqual(self.client.session.get.call_count, 1)
+
+    def test_connection_error_raised_after_max_retries(self):
+        self.client.breaker('api.test').failure_threshold = 10
+        self.responses(*[requests.Timeout('slow') for _ in range(4)])
+        with self.assertRaises(requests.Timeout):
+            self.client.get('/orders')
+        self.assertEqual(self.client.session.get.call_count, 4)
+
+    def test_throttle_waits_for_retry_after(self):
+        self.responses(api_response(429, **{'Retry-After': '7'}), api_response(200))
+        limiter = self.client.limiter('orders')
+        rate = limiter.rate
+        self.assertEqual(self.client.get('/orders').status_code, 200)
+        self.assertEqual(self.clock.sleeps[0], 7)
+        self.assertEqual(limiter.rate, min(limiter.ceiling, rate / 2 + limiter.increase))
+
+    def test_failures_open_the_circuit(self):
+        self.responses(*[api_response(503) for _ in range(3)])
+        with self.assertRaises(CircuitOpenError):
+            self.client.get('/orders')
+        self.assertEqual(self.client.session.get.call_count, 3)
+
+        # Later requests fail fast until the reset timeout has passed
+        with self.assertRaises(CircuitOpenError):
+            self.client.get('/orders')
+        self.assertEqual(self.client.session.get.call_count, 3)
+
+        self.clock.now += 30
+        self.responses(api_response(200))
+        self.assertEqual(self.client.get('/orders').status_code, 200)
+        self.assertEqual(self.client.session.get.call_count, 4)
+
+
+class CircuitBreakerTests(TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        patcher = mock.patch('core.utils.omniful_client.time.monotonic', self.clock.monotonic)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30)
+
+    def test_opens_after_consecutive_failures(self):
+        self.breaker.record_failure()
+        self.breaker.record_success()
+        self.breaker.record_failure()
+        self.breaker.before_request('api.test')
+        self.breaker.record_failure()
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.before_request('api.test')
+
+    def test_half_open_lets_one_probe_through(self):
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        self.clock.now += 30
+        self.breaker.before_request('api.test')
+        # Only the probe goes out while it is in flight
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.before_request('api.test')
+
+        # A failed probe opens the circuit for another reset_timeout
+        self.breaker.record_failure()
+        self.clock.now += 29
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.before_request('api.test')
+
+        # A successful probe closes it
+        self.clock.now += 1
+        self.breaker.before_request('api.test')
+        self.breaker.record_success()
+        self.breaker.before_request('api.test')
+        self.breaker.before_request('api.test')
+
+
+@override_settings(TIME_ZONE='Asia/Riyadh')
+class DateParsingTests(TestCase):
+    def assertParsesLike(self, legacy, values):
+        for value in values:
+            with self.subTest(value=value):
+                parsed = parse_omniful_datetime(value)
+                self.assertEqual(parsed, legacy(value))
+                self.assertEqual(parsed.tzinfo, RIYADH)
+
+    def test_benchmark_samples_match_the_legacy_parsers(self):
+        for name, values in SAMPLES.items():
+            with self.subTest(format=name):
+                self.assertParsesLike(LEGACY[name], sorted(set(values))[:50])
+
+    def test_iso_fractions_and_offsets(self):
+        # The legacy parser only knew UTC; each value is one instant either way
+        self.assertParsesLike(legacy_sync_all_orders, [
+            '2024-11-01T08:15:30Z', '2024-11-01T08:15:30.1Z', '2024-11-01T08:15:30.123456Z',
+            '2024-11-01T08:15:30.12+00:00', '2024-11-01T23:59:59.999Z',
+        ])
+        self.assertEqual(parse_omniful_datetime('2024-11-01T11:15:30+03:00'),
+                         parse_omniful_datetime('2024-11-01T08:15:30Z'))
+
+    def test_naive_values_are_riyadh_time(self):
+        self.assertParsesLike(legacy_strptime('%Y-%m-%dT%H:%M:%S'), ['2024-11-01T08:15:30'])
+        self.assertParsesLike(legacy_strptime('%b %d, %Y %I:%M:%S %p'),
+                              ['Nov 01, 2024 12:05:00 AM', 'Nov 01, 2024 12:05:00 PM'])
+        self.assertParsesLike(legacy_strptime('%B %d, %Y %I:%M %p'), ['September 30, 2024 11:59 PM'])
+
+    def test_empty_and_unparseable_values(self):
+        for value in (None, '', '   ', 'not a date', 'Nov 01, 2024 13:00 PM', 20241101):
+            with self.subTest(value=value):
+                self.assertIsNone(parse_omniful_datetime(value))
+
+
+class OrderKPITests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller = Seller.objects.create(guid='s1', name='Seller 1', code='S1')
+        other = Seller.objects.create(guid='s2', name='Seller 2', code='S2')
+        now = timezone.now()
+        make_order(cls.seller, 1, order_type='B2B', payment_mode='Cash On Delivery')
+        make_order(cls.seller, 2, status_code='new_order', order_created_at=now - timedelta(days=3))
+        make_order(cls.seller, 3, status_code='new_order')
+        make_order(cls.seller, 4, status_code='shipped', order_created_at=now - timedelta(days=15))
+        make_order(cls.seller, 5, status_code='delivered', order_created_at=now - timedelta(days=15),
+                   delivery_date=now - timedelta(days=10))
+        make_order(other, 1, order_type='B2B')
+        # Flags as the sync would have computed them
+        Order.objects.filter(order_id='S1-2').update(is_delayed=True, delay_category='red')
+        Order.objects.filter(order_id='S1-4').update(is_delayed=True, delay_category='yellow')
+        Order.objects.filter(order_id='S1-5').update(days_to_deliver=5, delay_category='green')
+        Order.objects.filter(order_id='S1-1').update(days_to_deliver=2, delay_category='green')
+
+    def test_single_pass(self):
+        orders = Order.objects.filter(seller=self.seller)
+        with self.assertNumQueries(1):
+            order_kpis(orders, breakdowns=False)
+        with self.assertNumQueries(2):
+            kpis = order_kpis(orders)
+
+        self.assertEqual(kpis.total_orders, orders.count())
+        self.assertEqual(kpis.b2b_orders, orders.filter(order_type='B2B').count())
+        self.assertEqual(kpis.b2c_orders, orders.filter(order_type='B2C').count())
+        self.assertEqual(kpis.delayed_orders, 2)
+        self.assertEqual((kpis.green_orders, kpis.yellow_orders, kpis.red_orders), (2, 1, 1))
+        self.assertEqual(kpis.new_orders_delayed, 1)
+        self.assertEqual(kpis.stale_orders, 1)
+        self.assertEqual(kpis.avg_delivery_time, 3.5)
+        self.assertEqual(kpis.on_time_rate, 60.0)
+        self.assertEqual(
+            {row['status_code']: row['count'] for row in kpis.status_counts},
+            {'delivered': 1, 'new_order': 2, 'processing': 1, 'shipped': 1})
+        self.assertEqual(
+            {row['payment_mode']: row['count'] for row in kpis.payment_counts},
+            {'Cash On Delivery': 1, 'Prepaid': 4})
+
+    def test_empty(self):
+        kpis = order_kpis(Order.objects.filter(seller__code='missing'))
+        self.assertEqual(kpis.total_orders, 0)
+        self.assertEqual(kpis.on_time_rate, 0)
+        self.assertEqual(kpis.avg_delivery_time, 0)
+        self.assertEqual(kpis.as_dict()['status_counts'], [])
+
+    @override_settings(ALLOWED_HOSTS=['*'], DASHBOARD_CACHE_TTL=0,
+                       STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+    def test_dashboards_use_engine(self):
+        user = get_user_model().objects.create_user('staff', password='pw')
+        self.client.force_login(user)
+
+        response = self.client.get(reverse('core:seller_orders', args=['S1']))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['total_orders'], 5)
+        self.assertEqual(response.context['on_time_rate'], 60.0)
+
+        response = self.client.get(reverse('core:orders_dashboard'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['total_orders'], 6)
+        self.assertEqual(response.context['red_orders_count'], 1)
+
+
+@override_settings(ALLOWED_HOSTS=['*'], DASHBOARD_CACHE_TTL=0,
+                   STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+class OrderIndexTests(TestCase):
+    """Filtered dashboard queries must be served by indexes, not table scans."""
+
+    SELLERS = 12
+    ORDERS_PER_SELLER = 1500
+
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        statuses = ['delivered'] * 8 + ['new_order', 'shipped']
+        for i in range(cls.SELLERS):
+            seller = Seller.objects.create(guid=f'g{i}', name=f'Seller {i}', code=f'S{i}')
+            Order.objects.bulk_create([
+                Order(order_id=f'S{i}-{n}', omniful_id=f'S{i}-omniful-{n}', seller=seller,
+                      store_name='Store', status_code=statuses[n % len(statuses)],
+                      status_clean=statuses[n % len(statuses)],
+                      order_type='B2B' if n % 4 == 0 else 'B2C',
+                      order_created_at=now - timedelta(hours=6 * n),
+                      payment_mode='Prepaid' if n % 2 else 'Cash On Delivery',
+                      shipping_city=f'City {n % 20}',
+                      customer_first_name='First', customer_last_name='Last')
+                for n in range(cls.ORDERS_PER_SELLER)
+            ], batch_size=1000)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        cls.user = get_user_model().objects.create_user('staff', password='pw')
+
+    def order_queries(self, url):
+        self.client.force_login(self.user)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return [q['sql'] for q in queries.captured_queries if '"core_order"' in q['sql']]
+
+    def explain(self, sql):
+        if connection.vendor == 'postgresql':
+            prefix, scan = 'EXPLAIN ', r'Seq Scan on core_order\b'
+        else:
+            prefix, scan = 'EXPLAIN QUERY PLAN ', r'\bSCAN core_order\b(?! USING)'
+        with connection.cursor() as cursor:
+            cursor.execute(prefix + sql)
+            plan = '\n'.join(' '.join(str(col) for col in row) for row in cursor.fetchall())
+        return plan, re.search(scan, plan)
+
+    def assert_indexed(self, url):
+        queries = self.order_queries(url)
+        self.assertTrue(queries)
+        for sql in queries:
+            plan, scan = self.explain(sql)
+            self.assertIsNone(scan, f'Table scan of core_order:\n{sql}\n{plan}')
+
+    def date_range(self, days):
+        today = timezone.localdate()
+        return (f'date_from={today - timedelta(days=days):%Y-%m-%d}'
+                f'&date_to={today:%Y-%m-%d}')
+
+    def test_seller_dashboard_date_range(self):
+        url = reverse('core:seller_orders', args=['S3'])
+        self.assert_indexed(f'{url}?{self.date_range(30)}')
+        self.assert_indexed(url)
+
+    def test_orders_dashboard_filters(self):
+        url = reverse('core:orders_dashboard')
+        self.assert_indexed(f'{url}?seller=S5&{self.date_range(90)}')
+        self.assert_indexed(f'{url}?status=new_order&{self.date_range(30)}')
+
+
+@override_settings(DASHBOARD_CACHE_TTL=300)
+class DashboardCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.calls = 0
+
+        def compute(params):
+            self.calls += 1
+            return {'calls': self.calls, **params}
+
+        dashboard_cache.register('test', warm=False)(compute)
+        self.addCleanup(dashboard_cache.DASHBOARDS.pop, 'test')
+
+    def test_cached_until_version_bump(self):
+        self.assertEqual(dashboard_cache.cached_dashboard('test', {'a': '1', 'b': ''}),
+                         {'calls': 1, 'a': '1'})
+        # Only the data version is read
+        with self.assertNumQueries(1):
+            data = dashboard_cache.cached_dashboard('test', {'b': None, 'a': ' 1 '})
+        self.assertEqual(data['calls'], 1)
+
+        dashboard_cache.bump_data_version()
+        # The old copy is served while it is recomputed in the background
+        self.assertEqual(dashboard_cache.cached_dashboard('test', {'a': '1'})['calls'], 1)
+        for thread in threading.enumerate():
+            if thread.name == 'revalidate-test':
+                thread.join()
+        self.assertEqual(dashboard_cache.cached_dashboard('test', {'a': '1'})['calls'], 2)
+        self.assertEqual(self.calls, 2)
+
+    def test_bumped_only_by_runs_that_changed_rows(self):
+        @dashboard_cache.bumps_data_version
+        def handle(changes):
+            dashboard_cache.record_changes(changes)
+
+        version = dashboard_cache.data_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            handle(0)
+        self.assertEqual(dashboard_cache.data_version(), version)
+        with self.captureOnCommitCallbacks(execute=True):
+            handle(3)
+        self.assertEqual(dashboard_cache.data_version(), version + 1)
+        # Outside a decorated command nothing is recorded
+        dashboard_cache.record_changes(5)
+        with self.captureOnCommitCallbacks(execute=True):
+            handle(0)
+        self.assertEqual(dashboard_cache.data_version(), version + 1)
+
+    def test_single_flight(self):
+        version = dashboard_cache.data_version()
+        fresh_key, _, lock_key = dashboard_cache._keys('test', {}, version)
+        # Another request is computing the same dashboard
+        cache.add(lock_key, 'other', 30)
+        threading.Timer(0.2, cache.set, (fresh_key, {'calls': 'other'})).start()
+        self.assertEqual(dashboard_cache.cached_dashboard('test', {}), {'calls': 'other'})
+        self.assertEqual(self.calls, 0)
+
+
+class OrderIngestTests(TestCase):
+    def setUp(self):
+        self.seller = Seller.objects.create(guid='s1', name='Seller 1', code='S1')
+
+    def rows(self, *payloads):
+        return [build_order_fields(payload, self.seller) for payload in payloads]
+
+    def test_counts(self):
+        self.assertEqual(bulk_upsert_orders(self.rows(order_payload(self.seller, 1),
+                                                      order_payload(self.seller, 2))), (2, 0, 0))
+        self.assertEqual(bulk_upsert_orders(self.rows(order_payload(self.seller, 1, status_code='shipped'),
+                                                      order_payload(self.seller, 2),
+                                                      order_payload(self.seller, 3))), (1, 1, 1))
+
+    def test_conflicting_order_is_not_counted(self):
+        bulk_upsert_orders(self.rows(order_payload(self.seller, 1)))
+        # Same order_id under a new omniful_id
+        clash = order_payload(self.seller, 1, id='S1-omniful-other')
+        with self.assertLogs('core.utils.order_ingest', 'WARNING') as logs:
+            counts = bulk_upsert_orders(self.rows(clash, order_payload(self.seller, 2)))
+        self.assertEqual(counts, (1, 0, 0))
+        self.assertIn('S1-omniful-other', logs.output[0])
+        self.assertEqual(set(Order.objects.values_list('omniful_id', flat=True)),
+                         {'S1-omniful-1', 'S1-omniful-2'})
+
+    def test_delivery_date_fallback(self):
+        delivered = order_payload(self.seller, 1, shipment={'order_delivered_at': '2026-10-05T10:00:00Z',
+                                                            'delivery_timestamp': '2026-10-04T10:00:00Z'})
+        legacy = order_payload(self.seller, 2, shipment={'delivery_timestamp': '2026-10-04T10:00:00Z'})
+        first, second = self.rows(delivered, legacy)
+        self.assertEqual(first['delivery_date'].day, 5)
+        self.assertEqual(second['delivery_date'].day, 4)
+
+
+class OrderPayloadTests(TestCase):
+    def setUp(self):
+        self.seller = Seller.objects.create(guid='s1', name='Seller 1', code='S1')
+
+    def upsert(self, *payloads):
+        return bulk_upsert_orders([build_order_fields(payload, self.seller) for payload in payloads])
+
+    def test_raw_data_reads_through_the_payload(self):
+        payload = order_payload(self.seller, 1, shipping_address={'city': 'Riyadh'})
+        self.upsert(payload)
+        order = Order.objects.get()
+        self.assertEqual(order.raw_data, payload)
+        self.assertEqual(order.raw_data['shipping_address'], {'city': 'Riyadh'})
+        self.assertEqual(make_order(self.seller, 2).raw_data, {})
+
+    def test_changed_payload_is_rewritten(self):
+        self.upsert(order_payload(self.seller, 1))
+        self.assertEqual(self.upsert(order_payload(self.seller, 1, status_code='shipped')), (0, 1, 0))
+        self.assertEqual(OrderPayload.objects.count(), 1)
+        self.assertEqual(OrderPayload.objects.get().raw_data['status_code'], 'shipped')
+
+        # An identical payload writes neither the order nor its payload
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.upsert(order_payload(self.seller, 1, status_code='shipped')), (0, 0, 1))
+        self.assertFalse(any('core_orderpayload' in query['sql'] for query in queries))
+
+
+class OrderPayloadMigrationTests(TransactionTestCase):
+    before = [('core', '0007_payload_hash')]
+    after = [('core', '0008_order_payload')]
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def test_payloads_round_trip(self):
+        apps = self.migrate(self.before)
+        seller = apps.get_model('core', 'Seller').objects.create(guid='s1', name='Seller 1', code='S1')
+        raw = {'id': 'o1', 'shipping_address': {'city': 'Riyadh'}, 'customer': {'name': 'A'}}
+        apps.get_model('core', 'Order').objects.create(
+            seller=seller, omniful_id='o1', order_id='S1-1', raw_data=raw,
+            shipping_address=raw['shipping_address'], customer=raw['customer'],
+            order_created_at=timezone.now())
+
+        apps = self.migrate(self.after)
+        payload = apps.get_model('core', 'OrderPayload').objects.get()
+        self.assertEqual(OrderPayload(data=payload.data).raw_data, raw)
+
+        apps = self.migrate(self.before)
+        order = apps.get_model('core', 'Order').objects.get()
+        self.assertEqual(order.raw_data, raw)
+        self.assertEqual(order.shipping_address, {'city': 'Riyadh'})
+        self.assertEqual(order.customer, {'name': 'A'})
+        self.assertEqual(order.shipment, {})
+
+
+class OrderRollupTests(TestCase):
+    def setUp(self):
+        self.seller = Seller.objects.create(guid='s1', name='Seller 1', code='S1')
+
+    def upsert(self, *payloads):
+        return bulk_upsert_orders([build_order_fields(payload, self.seller) for payload in payloads])
+
+    def buckets(self):
+        return list(DailyOrderRollup.objects.order_by('day').values_list('day', 'orders'))
+
+    def test_ingest_moving_an_order_refreshes_both_days(self):
+        self.upsert(order_payload(self.seller, 1), order_payload(self.seller, 2))
+        self.assertEqual(self.buckets(), [(date(2026, 10, 1), 2)])
+
+        self.upsert(order_payload(self.seller, 1, order_created_at='2026-09-29T10:00:00Z'))
+        self.assertEqual(self.buckets(), [(date(2026, 9, 29), 1), (date(2026, 10, 1), 1)])
+
+    def test_delete_refreshes_its_day_on_commit(self):
+        self.upsert(order_payload(self.seller, 1), order_payload(self.seller, 2),
+                    order_payload(self.seller, 3, order_created_at='2026-09-29T10:00:00Z'))
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            Order.objects.exclude(omniful_id='S1-omniful-3').delete()
+        self.assertEqual(len(callbacks), 2)
+        self.assertEqual(self.buckets(), [(date(2026, 9, 29), 1)])
+
+    def test_save_leaves_rollups_alone(self):
+        self.upsert(order_payload(self.seller, 1))
+        order = Order.objects.get()
+        with CaptureQueriesContext(connection) as queries:
+            order.save()
+        self.assertEqual(len(queries), 1)
+
+
+class SyncOrdersWatermarkTests(TransactionTestCase):
+    def setUp(self):
+        self.seller = Seller.objects.create(guid='s1', name='Seller 1', code='S1')
+        self.key = order_watermark_key('S1')
+        self.watermark = timezone.now() - timedelta(days=30)
+        advance_watermark(self.key, self.watermark)
+        pages = [[order_payload(self.seller, page * 10 + n, updated_at='2026-10-10T10:00:00Z')
+                  for n in range(3)] for page in range(2)]
+        self.client_patch = mock.patch('core.management.commands.sync_orders.get_client',
+                                       return_value=FakeClient(pages))
+        self.catalog_patch = mock.patch('core.management.commands.sync_orders.get_catalog',
+                                        return_value=[self.seller])
+        self.client_patch.start()
+        self.catalog_patch.start()
+        self.addCleanup(mock.patch.stopall)
+
+    def test_clean_pass_advances_watermark(self):
+        call_command('sync_orders', stdout=io.StringIO())
+        self.assertEqual(Order.objects.count(), 6)
+        self.assertGreater(get_watermark(self.key), self.watermark)
+        self.assertIsNotNone(SellerSyncSchedule.objects.get(seller=self.seller).last_synced_at)
+
+    def test_failed_page_keeps_watermark(self):
+        def fail_second_page(rows):
+            if rows[0]['order_id'] == 'S1-10':
+                raise RuntimeError('database is locked')
+            return bulk_upsert_orders(rows)
+
+        with mock.patch('core.management.commands.sync_orders.bulk_upsert_orders',
+                        side_effect=fail_second_page):
+            call_command('sync_orders', stdout=io.StringIO())
+
+        self.assertEqual(Order.objects.count(), 3)
+        self.assertEqual(get_watermark(self.key), self.watermark)
+        self.assertFalse(SellerSyncSchedule.objects.filter(
+            seller=self.seller, last_synced_at__isnull=False).exists())
+
+    def test_crash_finishes_the_log(self):
+        self.catalog_patch.stop()
+        with mock.patch('core.management.commands.sync_orders.get_catalog',
+                        side_effect=RuntimeError('catalog unavailable')):
+            with self.assertRaises(RuntimeError):
+                call_command('sync_orders', stdout=io.StringIO())
+        run = SyncLog.objects.get(key='orders')
+        self.assertEqual(run.status, SyncLog.FAILED)
+        self.assertIsNotNone(run.finished_at)
+        self.assertIn('catalog unavailable', run.content)
+
+
+@override_settings(JOB_CONCURRENCY={'sync_orders': 1, 'refresh_bill': 2}, JOB_HEARTBEAT_TTL=300)
+class JobQueueTests(TestCase):
+    def test_enqueue_deduplicates_waiting_jobs(self):
+        job, created = jobs.enqueue('refresh_bill', 'B1')
+        self.assertTrue(created)
+        self.assertEqual(jobs.enqueue('refresh_bill', 'B1', run_id='other'), (job, False))
+        self.assertTrue(jobs.enqueue('refresh_bill', 'B2')[1])
+        with self.assertRaises(ValueError):
+            jobs.enqueue('migrate')
+
+        # Once it runs, the same job can be queued again
+        jobs.claim_next('worker')
+        self.assertTrue(jobs.enqueue('refresh_bill', 'B1')[1])
+
+    def test_claims_oldest_within_limits(self):
+        first, _ = jobs.enqueue('sync_orders')
+        second, _ = jobs.enqueue('sync_orders', full=True)
+        bills = [jobs.enqueue('refresh_bill', name)[0] for name in ('B1', 'B2', 'B3')]
+
+        claimed = [jobs.claim_next('worker') for _ in range(4)]
+        self.assertEqual(claimed, [first, bills[0], bills[1], None])
+        self.assertEqual(Job.objects.get(pk=first.pk).status, Job.RUNNING)
+        self.assertEqual(Job.objects.get(pk=second.pk).status, Job.QUEUED)
+        self.assertIsNone(jobs.claim_next('worker', ['refresh_bill']))
+
+        # Finishing a job frees its slot
+        with mock.patch('core.utils.jobs.call_command'):
+            jobs.run_job(claimed[0])
+        self.assertEqual(Job.objects.get(pk=first.pk).status, Job.SUCCEEDED)
+        self.assertEqual(jobs.claim_next('worker', ['sync_orders']), second)
+
+    def test_failed_job_keeps_its_traceback(self):
+        job, _ = jobs.enqueue('sync_orders')
+        job = jobs.claim_next('worker')
+        with mock.patch('core.utils.jobs.call_command', side_effect=RuntimeError('boom')):
+            jobs.run_job(job)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertIn('RuntimeError: boom', job.error)
+        self.assertIsNotNone(job.finished_at)
+
+    def test_result_keeps_the_output_tail(self):
+        job, _ = jobs.enqueue('sync_orders')
+        job = jobs.claim_next('worker')
+
+        def chatty(*args, stdout=None, **options):
+            for n in range(5000):
+                stdout.write(f'line {n}\n')
+
+        with mock.patch('core.utils.jobs.call_command', side_effect=chatty):
+            jobs.run_job(job)
+        job.refresh_from_db()
+        self.assertEqual(len(job.result), jobs.RESULT_CHARS)
+        self.assertTrue(job.result.endswith('line 4999\n'))
+
+    def test_stale_running_job_frees_its_slot(self):
+        stale, _ = jobs.enqueue('sync_orders')
+        self.assertEqual(jobs.claim_next('dead-worker'), stale)
+        queued, _ = jobs.enqueue('sync_orders', full=True)
+        self.assertIsNone(jobs.claim_next('worker'))
+
+        # A live worker keeps its job
+        jobs.heartbeat('dead-worker')
+        self.assertIsNone(jobs.claim_next('worker'))
+
+        Job.objects.filter(pk=stale.pk).update(heartbeat_at=timezone.now() - timedelta(seconds=301))
+        self.assertEqual(jobs.claim_next('worker'), queued)
+        stale.refresh_from_db()
+        self.assertEqual(stale.status, Job.FAILED)
+        self.assertIsNotNone(stale.finished_at)
+        self.assertIn('heartbeat', stale.error)
+
+
+
+@override_settings(JOB_CONCURRENCY={'refresh_bill': 2})
+class JobClaimConcurrencyTests(TransactionTestCase):
+    def test_limit_holds_for_concurrent_claims(self):
+        for n in range(8):
+            jobs.enqueue('refresh_bill', f'B{n}')
+        start = threading.Barrier(8)
+        claimed = []
+
+        def claim(worker):
+            start.wait()
+            try:
+                while True:
+                    try:
+                        job = jobs.claim_next(worker)
+                        break
+                    except OperationalError:
+                        # SQLite refuses a second writer instead of waiting
+                        time.sleep(0.01)
+                if job:
+                    claimed.append(job.pk)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=claim, args=(f'worker-{n}',)) for n in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        # A thread may lose its claimed row to a locked read in the in-memory
+        # test database, so the rows are the source of truth
+        running = Job.objects.filter(status=Job.RUNNING)
+        self.assertEqual(running.count(), 2)
+        self.assertLessEqual(set(claimed), set(running.values_list('pk', flat=True)))
+        self.assertEqual(len(set(running.values_list('worker', flat=True))), 2)
+
+class LeasedCommand(BaseCommand):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.runs = []
+        self.during_run = None
+
+    @exclusive('test_sync')
+    def handle(self, *args, **options):
+        self.runs.append(options)
+        if self.during_run:
+            self.during_run()
+            self.during_run = None
+
+
+class LeaseTests(TestCase):
+    def setUp(self):
+        self.command = LeasedCommand(stdout=io.StringIO())
+
+    def held(self, **options):
+        lease = Lease('test_sync', run_key=run_key(self.command, (), options))
+        self.assertTrue(lease.acquire())
+        return lease
+
+    def test_identical_request_coalesces(self):
+        holder = self.held(full=False)
+        self.assertIsNone(self.command.handle(full=False))
+        self.assertEqual(self.command.runs, [])
+        self.assertTrue(holder.take_rerun())
+        # The holder keeps the lease for its follow-up run
+        self.assertFalse(Lease('test_sync').acquire())
+
+    def test_different_options_wait_for_the_lease(self):
+        holder = self.held(full=False)
+        with mock.patch('core.utils.leases.time.sleep',
+                        side_effect=lambda seconds: holder.release()) as sleep:
+            self.command.handle(full=True)
+        self.assertEqual(sleep.call_count, 1)
+        self.assertEqual(self.command.runs, [{'full': True}])
+        self.assertFalse(SyncLease.objects.get(key='test_sync').rerun_requested)
+
+    @override_settings(SYNC_LEASE_WAIT=0)
+    def test_different_options_skip_after_the_wait(self):
+        holder = self.held(full=False)
+        with self.assertLogs('core.utils.leases', 'WARNING') as logs:
+            self.assertIsNone(self.command.handle(full=True))
+        self.assertEqual(self.command.runs, [])
+        self.assertIn('skipping this run', logs.output[-1])
+        self.assertFalse(holder.take_rerun())
+
+    def test_expired_lease_is_taken_over(self):
+        holder = self.held(full=False)
+        SyncLease.objects.filter(key='test_sync').update(
+            expires_at=timezone.now() - timedelta(seconds=1))
+        self.command.handle(full=True)
+        self.assertEqual(len(self.command.runs), 1)
+        self.assertFalse(holder.renew())
+        self.assertTrue(holder.lost)
+
+    def test_request_during_run_runs_once_more(self):
+        def request():
+            for _ in range(3):
+                Lease('test_sync', run_key=run_key(self.command, (), {'full': False})).request_rerun()
+
+        self.command.during_run = request
+        self.command.handle(full=False)
+        self.assertEqual(self.command.runs, [{'full': False}] * 2)
+        self.assertEqual(SyncLease.objects.get(key='test_sync').holder, '')
+
+
+@override_settings(OMNIFUL_WEBHOOK_SECRET='secret', OMNIFUL_WEBHOOK_TOLERANCE=300)
+class OrderWebhookTests(TestCase):
+    def setUp(self):
+        self.seller = Seller.objects.create(guid='s1', name='Seller 1', code='S1')
+
+    def event(self, event_id, status, updated_at, n=1):
+        return {'id': event_id, 'event': 'order.updated', 'seller_code': 'S1',
+                'data': order_payload(self.seller, n, status_code=status, updated_at=updated_at)}
+
+    def post(self, events, timestamp=None, secret='secret'):
+        body = json.dumps(events).encode('utf-8')
+        timestamp = str(timestamp or int(time.time()))
+        return self.client.post(
+            reverse('core:order_webhook'), body, content_type='application/json',
+            HTTP_X_OMNIFUL_TIMESTAMP=timestamp,
+            HTTP_X_OMNIFUL_SIGNATURE=sign(secret, timestamp, body))
+
+    def test_signature_checked(self):
+        events = [self.event('evt-1', 'new_order', '2026-10-01T10:00:00Z')]
+        self.assertEqual(self.post(events, secret='wrong').status_code, 401)
+        self.assertEqual(self.post(events, timestamp=int(time.time()) - 301).status_code, 401)
+        self.assertFalse(OrderEvent.objects.exists())
+
+        response = self.post(events)
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.json(), {'accepted': 1, 'duplicates': 0})
+        self.assertTrue(Job.objects.filter(job_type='drain_order_events', status=Job.QUEUED).exists())
+        # Redelivery
+        self.assertEqual(self.post(events).json(), {'accepted': 0, 'duplicates': 1})
+
+    def test_invalid_body(self):
+        response = self.post([{'id': 'evt-1', 'event': 'order.exploded', 'data': {}}])
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(OrderEvent.objects.exists())
+
+    def test_latest_activity_wins(self):
+        self.post([self.event('evt-2', 'shipped', '2026-10-02T10:00:00Z'),
+                   self.event('evt-1', 'new_order', '2026-10-01T10:00:00Z'),
+                   self.event('evt-3', 'new_order', '2026-10-01T10:00:00Z', n=2)])
+        self.assertEqual(drain_events(), (3, 0))
+        self.assertEqual(Order.objects.get(order_id='S1-1').status_code, 'shipped')
+        self.assertEqual(Order.objects.count(), 2)
+        self.assertFalse(OrderEvent.objects.filter(processed_at__isnull=True).exists())
+
+    def test_late_event_does_not_roll_back(self):
+        self.post([self.event('evt-2', 'delivered', '2026-10-03T10:00:00Z')])
+        drain_events()
+        self.post([self.event('evt-1', 'shipped', '2026-10-02T10:00:00Z')])
+        self.assertEqual(drain_events(), (1, 0))
+        self.assertEqual(Order.objects.get(order_id='S1-1').status_code, 'delivered')
+
+    def test_unknown_seller_fails(self):
+        event = self.event('evt-1', 'new_order', '2026-10-01T10:00:00Z')
+        event['seller_code'] = 'S9'
+        event['data']['seller_code'] = 'S9'
+        self.post([event])
+        self.assertEqual(drain_events(), (0, 1))
+        stored = OrderEvent.objects.get()
+        self.assertEqual((stored.attempts, stored.error), (1, 'Unknown seller'))
+
+
+class SyncSellersTests(TestCase):
+    def sync(self, get_json):
+        client = mock.Mock(has_token=True, get_json=mock.Mock(side_effect=get_json))
+        stdout = io.StringIO()
+        with mock.patch('core.management.commands.sync_sellers.get_client', return_value=client):
+            call_command('sync_sellers', stdout=stdout)
+        return stdout.getvalue()
+
+    def test_failed_refresh_is_not_fresh(self):
+        def get_json(path, params=None):
+            if params['page'] == 2:
+                raise requests.ConnectionError('connection reset')
+            return {'data': [{'guid': 'g1', 'name': 'Seller 1', 'code': 'S1'}],
+                    'meta': {'current_page': 1, 'last_page': 2}}
+
+        output = self.sync(get_json)
+        self.assertIn('Request error: connection reset', output)
+        self.assertTrue(Seller.objects.filter(code='S1').exists())
+        self.assertFalse(SyncStatus.objects.filter(key='sellers').exists())
+        self.assertEqual(SyncLog.objects.get(key='sellers').status, SyncLog.FAILED)
+
+        self.sync(lambda path, params=None: {'data': [], 'meta': {}})
+        self.assertTrue(SyncStatus.objects.filter(key='sellers').exists())
+
+    def test_catalog_ttl(self):
+        client = mock.Mock(get_json=mock.Mock(return_value={'data': [], 'meta': {}}))
+        get_catalog(client)
+        self.assertEqual(client.get_json.call_count, 1)
+        # Fresh for SELLER_CATALOG_TTL after the refresh
+        get_catalog(client)
+        self.assertEqual(client.get_json.call_count, 1)
+        SyncStatus.objects.filter(key='sellers').update(last_synced_at=timezone.now() - timedelta(days=1))
+        get_catalog(client)
+        self.assertEqual(client.get_json.call_count, 2)
+
+
+class BillsClient:
+    """Serves one page of ``bills`` and their details from ``details``.
+
+    ``details`` maps a bill name to ``(status_code, grand_total, headers)``.
+    """
+
+    has_token = True
+
+    def __init__(self, bills, details):
+        self.bills = bills
+        self.details = details
+        self.detail_requests = []
+
+    def get_json(self, path, params=None, timeout=None):
+        return {'data': self.bills, 'meta': {'current_page': 1, 'last_page': 1}}
+
+    def get(self, path, params=None, timeout=None, headers=None):
+        name = path.rsplit('/', 1)[1]
+        self.detail_requests.append((name, dict(headers or {})))
+        status_code, grand_total, response_headers = self.details[name]
+        return mock.Mock(status_code=status_code, headers=response_headers,
+                         json=mock.Mock(return_value={'data': {'grand_total': grand_total}}))
+
+
+class SyncBillsTests(TestCase):
+    def setUp(self):
+        self.seller = Seller.objects.create(guid='s1', name='Seller 1', code='S1')
+        catalog = mock.Mock(get=mock.Mock(return_value=self.seller))
+        patcher = mock.patch('core.management.commands.sync_bills.get_catalog', return_value=catalog)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def bill(self, name='B1', **fields):
+        return {'name': name, 'status': 'draft', 'seller': {'guid': 's1'}, 'remark': '', **fields}
+
+    def sync(self, client):
+        with mock.patch('core.management.commands.sync_bills.get_client', return_value=client):
+            call_command('sync_bills', stdout=io.StringIO())
+
+    def test_not_modified_detail_keeps_the_stored_total(self):
+        validators = {'ETag': '"v1"', 'Last-Modified': 'Thu, 01 Oct 2026 10:00:00 GMT'}
+        first = BillsClient([self.bill()], {'B1': (200, '100.50', validators)})
+        self.sync(first)
+        self.assertEqual(first.detail_requests, [('B1', {})])
+
+        second = BillsClient([self.bill(remark='Checked')], {'B1': (304, None, {})})
+        self.sync(second)
+        self.assertEqual(second.detail_requests, [('B1', {
+            'If-None-Match': '"v1"', 'If-Modified-Since': 'Thu, 01 Oct 2026 10:00:00 GMT'})])
+        bill = VendorBill.objects.get(name='B1')
+        self.assertEqual(bill.remark, 'Checked')
+        self.assertEqual(bill.grand_total, Decimal('100.50'))
+        self.assertEqual(bill.detail_etag, '"v1"')
+
+    def test_unchanged_finalised_bill_skips_the_detail_call(self):
+        finalised = self.bill(status='finalised')
+        self.sync(BillsClient([finalised], {'B1': (200, '80', {'ETag': '"v1"'})}))
+
+        client = BillsClient([finalised], {})
+        self.sync(client)
+        self.assertEqual(client.detail_requests, [])
+        self.assertIn('Unchanged: 1', SyncLog.objects.filter(key='vendor_bills').first().content)
+
+        # A draft bill is always checked, conditionally
+        client = BillsClient([self.bill(status='draft')], {'B1': (304, None, {})})
+        self.sync(client)
+        self.assertEqual(client.detail_requests, [('B1', {'If-None-Match': '"v1"'})])
+
+
+class SyncCheckpointTests(TransactionTestCase):
+    def setUp(self):
+        self.seller = Seller.objects.create(guid='s1', name='Seller 1', code='S1')
+        pages = [[order_payload(self.seller, page * 10 + n) for n in range(2)] for page in range(3)]
+        self.client = FakeClient(pages)
+        patcher = mock.patch('core.management.commands.sync_all_orders.get_client',
+                             return_value=self.client)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def sync(self, **options):
+        call_command('sync_all_orders', seller_code='S1', stdout=io.StringIO(), **options)
+        return SyncCheckpoint.objects.get(job='sync_all_orders', seller_code='S1')
+
+    def test_resume_continues_after_the_last_committed_page(self):
+        def fail_second_page(rows):
+            if rows[0]['order_id'] == 'S1-10':
+                raise RuntimeError('database is locked')
+            return bulk_upsert_orders(rows)
+
+        with mock.patch('core.management.commands.sync_all_orders.bulk_upsert_orders',
+                        side_effect=fail_second_page):
+            checkpoint = self.sync()
+        self.assertEqual((checkpoint.last_page, checkpoint.total_pages), (1, 3))
+        self.assertFalse(checkpoint.is_complete)
+        # Page 3 may have been fetched, and committed out of order, before
+        # the failure stopped the seller
+        self.assertIn(checkpoint.done_pages, ([], [3]))
+        self.assertEqual(Order.objects.count(), 2 * (1 + len(checkpoint.done_pages)))
+        self.assertIsNone(get_watermark(order_watermark_key('S1')))
+
+        self.client.requested = []
+        remaining = checkpoint.remaining_pages()
+        checkpoint = self.sync(resume=True)
+        self.assertEqual(self.client.requested, remaining)
+        self.assertEqual(checkpoint.last_page, 3)
+        self.assertTrue(checkpoint.is_complete)
+        self.assertEqual(Order.objects.count(), 6)
+        self.assertIsNotNone(get_watermark(order_watermark_key('S1')))
+
+        # A completed seller is skipped by another resume
+        self.client.requested = []
+        self.sync(resume=True)
+        self.assertEqual(self.client.requested, [])
+
+    def fail_page(self, page, times):
+        """Make the first ``times`` fetches of ``page`` fail with a 502."""
+        get = self.client.get
+        failures = []
+
+        def flaky_get(path, params=None, **kwargs):
+            if params['page'] == page and len(failures) < times:
+                failures.append(page)
+                self.client.requested.append(page)
+                raise requests.HTTPError('502 Server Error')
+            return get(path, params, **kwargs)
+
+        patcher = mock.patch.object(self.client, 'get', side_effect=flaky_get)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_fanned_out_page_is_retried(self):
+        self.fail_page(2, times=PAGE_FETCH_ATTEMPTS - 1)
+        checkpoint = self.sync(page_workers=2)
+        self.assertEqual(self.client.requested.count(2), PAGE_FETCH_ATTEMPTS)
+        self.assertTrue(checkpoint.is_complete)
+        self.assertEqual(Order.objects.count(), 6)
+        self.assertIsNotNone(get_watermark(order_watermark_key('S1')))
+
+    def test_fanned_out_page_given_up_leaves_the_seller_incomplete(self):
+        self.fail_page(2, times=PAGE_FETCH_ATTEMPTS)
+        watermark = timezone.now() - timedelta(days=30)
+        advance_watermark(order_watermark_key('S1'), watermark)
+        out = io.StringIO()
+        call_command('sync_all_orders', seller_code='S1', page_workers=2, full=True, stdout=out)
+        checkpoint = SyncCheckpoint.objects.get(job='sync_all_orders', seller_code='S1')
+        self.assertEqual(self.client.requested.count(2), PAGE_FETCH_ATTEMPTS)
+        self.assertIn('Giving up on page 2', out.getvalue())
+        self.assertFalse(checkpoint.is_complete)
+        self.assertEqual(checkpoint.remaining_pages(), [2])
+        self.assertEqual(Order.objects.count(), 4)
+        self.assertEqual(get_watermark(order_watermark_key('S1')), watermark)
+
+    def test_max_rps_only_lasts_for_the_run(self):
+        limiter = self.client.limiter('orders')
+        seen = []
+
+        def write_page(rows):
+            seen.append(limiter.ceiling)
+            return bulk_upsert_orders(rows)
+
+        with mock.patch('core.management.commands.sync_all_orders.bulk_upsert_orders',
+                        side_effect=write_page):
+            self.sync(max_rps=2)
+        self.assertEqual(set(seen), {2.0})
+        self.assertEqual(limiter.ceiling, 10.0)
+
+    def test_fresh_run_starts_over(self):
+        SyncCheckpoint.objects.create(job='sync_all_orders', seller_code='S1', last_page=2,
+                                      total_pages=3, is_complete=False)
+        checkpoint = self.sync()
+        self.assertEqual(self.client.requested, [1, 2, 3])
+        self.assertTrue(checkpoint.is_complete)
+
+
+class ProgressReporterTests(TestCase):
+    def test_exception_finishes_the_run(self):
+        with self.assertRaises(RuntimeError):
+            with ProgressReporter('sync_all_orders', data=ORDERS_SYNC_DEFAULTS) as reporter:
+                reporter.update(processed_orders=3)
+                raise RuntimeError('token expired')
+        row = JobProgress.objects.get(pk=reporter.row.pk)
+        self.assertTrue(row.is_complete)
+        self.assertEqual(row.data['error'], 'token expired')
+        self.assertEqual(row.data['processed_orders'], 3)
+
+    def test_finished_run_keeps_its_result(self):
+        with ProgressReporter('sync_all_orders', data=ORDERS_SYNC_DEFAULTS) as reporter:
+            reporter.finish(percentage=100)
+        row = JobProgress.objects.get(pk=reporter.row.pk)
+        self.assertTrue(row.is_complete)
+        self.assertNotIn('error', row.data)
+
+    @override_settings(LIVE_STREAM_SECONDS=25)
+    def test_stream_ends_after_the_cap(self):
+        clock = [0.0]
+        with mock.patch('core.utils.live_updates.time.monotonic', side_effect=lambda: clock[0]):
+            events = list(progress_events(lambda: {'percentage': 10},
+                                          sleep=lambda s: clock.__setitem__(0, clock[0] + s)))
+        self.assertEqual(clock[0], 25.0)
+        self.assertNotIn('event: done', ''.join(events))
+
+
+@override_settings(ORDER_SYNC_TARGET_ORDERS=50, ORDER_SYNC_VELOCITY_HOURS=10, ORDER_SYNC_MIN_INTERVAL=5,
+                   ORDER_SYNC_MAX_INTERVAL=1440, ORDER_SYNC_REQUEST_BUDGET=600)
+class SyncSchedulingTests(TestCase):
+    def test_velocity_interval(self):
+        self.assertEqual(scheduling.velocity_interval(0), 1440)
+        self.assertEqual(scheduling.velocity_interval(10), 300)
+        self.assertEqual(scheduling.velocity_interval(6000), 5)
+        self.assertEqual(scheduling.velocity_interval(0.01), 1440)
+
+    def test_fit_budget(self):
+        intervals = {'a': 5, 'b': 5}
+        self.assertEqual(scheduling.fit_budget(intervals, {'a': 0, 'b': 0}), intervals)
+        with override_settings(ORDER_SYNC_REQUEST_BUDGET=10):
+            # 24 polls an hour into 10 requests
+            self.assertEqual(scheduling.fit_budget(intervals, {'a': 0, 'b': 0}), {'a': 12, 'b': 12})
+            # Pages of new orders take 2 of them
+            self.assertEqual(scheduling.fit_budget(intervals, {'a': 100, 'b': 100}), {'a': 15, 'b': 15})
+            # Even a budget eaten by pages leaves one poll an hour
+            self.assertEqual(scheduling.fit_budget({'a': 30}, {'a': 1000}), {'a': 60})
+            # Stretched intervals stay within the maximum
+            self.assertEqual(scheduling.fit_budget({'a': 5, 'b': 1440}, {'a': 0, 'b': 0}),
+                             {'a': 7, 'b': 1440})
+
+    def test_plan_and_due(self):
+        now = timezone.now()
+        busy = Seller.objects.create(guid='s1', name='Busy', code='S1')
+        quiet = Seller.objects.create(guid='s2', name='Quiet', code='S2')
+        Seller.objects.create(guid='s3', name='Inactive', code='S3', is_active=False)
+        for n in range(50):
+            make_order(busy, n, order_created_at=now - timedelta(hours=1))
+        make_order(quiet, 1, order_created_at=now - timedelta(hours=20))
+
+        scheduling.plan_schedules(now)
+        self.assertEqual(
+            dict(SellerSyncSchedule.objects.values_list('seller__code', 'interval_minutes')),
+            {'S1': 600, 'S2': 1440})
+        # Never synced, so both are due
+        self.assertEqual(set(scheduling.due_sellers(now)), {busy, quiet})
+
+        scheduling.mark_synced(busy, now)
+        scheduling.mark_synced(quiet, now - timedelta(hours=25))
+        self.assertEqual(scheduling.due_sellers(now), [quiet])
+        self.assertEqual(scheduling.due_sellers(now + timedelta(minutes=600)), [quiet, busy])
+
+        scheduling.force_sync(busy)
+        self.assertEqual(scheduling.due_sellers(now), [busy, quiet])
@@ -37,8 +37,16 @@ urlpatterns = [
     path('api/orders-sync-progress/', views.get_orders_sync_progress,
          name='get_orders_sync_progress'),
     path('seller-orders/<str:code>/', views.seller_orders, name='seller_orders'),
+    path('seller-orders/<str:code>/sync/', views.force_seller_sync, name='force_seller_sync'),
     path('order-detail/<str:order_id>/',
          views.order_detail, name='order_detail'),
     path('customer-orders/', views.customer_orders, name='customer_orders'),
+    path('sync-logs/<uuid:run_id>/', views.sync_log_lines, name='sync_log_lines'),
+    path('poll-sync-log/<str:key>/', views.poll_sync_log, name='poll_sync_log'),
+    path('jobs/<int:job_id>/', views.job_status, name='job_status'),
+    path('webhooks/omniful/orders/', views.order_webhook, name='order_webhook'),
+    path('events/progress/<str:job>/', views.sync_progress_events,
+         name='sync_progress_events'),
+    path('events/logs/<str:key>/', views.sync_log_events, name='sync_log_events'),
 
 ]
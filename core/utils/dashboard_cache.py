@@ -0,0 +1,194 @@
+"""
+Cache of dashboard data, invalidated by a data version bumped by syncs.
+
+Dashboard numbers only change when a sync writes, so each dashboard's
+computed data is cached under its view name, its normalized filters and
+the current data version. Sync commands decorated with
+``bumps_data_version`` bump the version (a row in SyncStatus) once their
+writes are committed, which retires every cached dashboard at once. Runs
+that changed no rows, like most scheduled syncs, leave it alone; the
+write paths report their changes with ``record_changes()``.
+
+A dashboard whose entry is missing for the current version is served
+from its last computed copy, of any version, while one request
+recomputes it in a background thread (stale-while-revalidate). Identical
+requests with no copy at all wait for a single computation instead of
+all running it (single-flight). Entries also expire after
+DASHBOARD_CACHE_TTL seconds, since "delayed" counts age with the clock.
+
+The locks and copies live in the Django cache, so they are shared across
+processes only with a shared backend (Redis, Memcached, database); the
+default local-memory cache gives each process its own.
+"""
+
+import functools
+import hashlib
+import json
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from core.models import SyncStatus
+
+
+DATA_VERSION_KEY = 'dashboard_data'
+
+# Seconds a request waits for another request computing the same dashboard
+# before computing it itself
+SINGLE_FLIGHT_WAIT = 30
+SINGLE_FLIGHT_POLL = 0.1
+
+# Dashboard name -> function(params) returning its data, see ``register()``
+DASHBOARDS = {}
+# Dashboards computed by warm_dashboards()
+WARM_DASHBOARDS = set()
+
+# Decorated commands running in this thread, see ``bumps_data_version``
+_running = threading.local()
+
+
+def data_version():
+    return (SyncStatus.objects.filter(key=DATA_VERSION_KEY)
+            .values_list('version', flat=True).first()) or 0
+
+
+def bump_data_version():
+    """Retire every cached dashboard; warm the default ones if configured."""
+    bumped = SyncStatus.objects.filter(key=DATA_VERSION_KEY).update(
+        version=F('version') + 1, last_synced_at=timezone.now())
+    if not bumped:
+        SyncStatus.objects.update_or_create(
+            key=DATA_VERSION_KEY, defaults={'version': 1, 'last_synced_at': timezone.now()})
+    if settings.DASHBOARD_CACHE_WARM:
+        warm_dashboards()
+
+
+def record_changes(count=1):
+    """Note ``count`` rows changed by the decorated command running in this thread."""
+    if getattr(_running, 'depth', 0):
+        _running.changes += count
+
+
+def bumps_data_version(handle):
+    """Decorate a command's ``handle`` to bump the data version after it writes.
+
+    The version is bumped when the run recorded changed rows, whether it
+    finishes or fails, since a failed sync may still have committed some
+    of its pages. Commands run by another decorated command
+    (refresh_all_bills) leave the bump to it.
+    """
+    @functools.wraps(handle)
+    def wrapper(*args, **options):
+        if not getattr(_running, 'depth', 0):
+            _running.depth = 0
+            _running.changes = 0
+        _running.depth += 1
+        try:
+            return handle(*args, **options)
+        finally:
+            _running.depth -= 1
+            if not _running.depth and _running.changes:
+                transaction.on_commit(bump_data_version)
+    return wrapper
+
+
+def register(name, warm=True):
+    """Register ``function(params)`` as the data of dashboard ``name``.
+
+    ``params`` is a dict of filter strings and the function returns a
+    picklable dict, so querysets must be evaluated (``list()``) inside.
+    With ``warm`` the unfiltered dashboard is computed after each bump
+    when DASHBOARD_CACHE_WARM is on.
+    """
+    def decorator(function):
+        DASHBOARDS[name] = function
+        if warm:
+            WARM_DASHBOARDS.add(name)
+        return function
+    return decorator
+
+
+def normalize_params(params):
+    """Filter values by name, without blanks; the same filters give the same dict."""
+    return {name: str(value).strip() for name, value in sorted(params.items())
+            if value is not None and str(value).strip()}
+
+
+def _keys(name, params, version):
+    digest = hashlib.sha1(json.dumps(params, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+    base = f'dashboard:{name}:{digest}'
+    return f'{base}:v{version}', f'{base}:latest', f'{base}:lock'
+
+
+def _compute(name, params, version):
+    fresh_key, latest_key, _ = _keys(name, params, version)
+    data = DASHBOARDS[name](params)
+    cache.set(fresh_key, data, settings.DASHBOARD_CACHE_TTL)
+    cache.set(latest_key, data, settings.DASHBOARD_CACHE_STALE_TTL)
+    return data
+
+
+def _release(lock_key, token):
+    # The lock may have expired and been taken by another request meanwhile
+    if cache.get(lock_key) == token:
+        cache.delete(lock_key)
+
+
+def _revalidate(name, params, version, lock_key, token):
+    try:
+        _compute(name, params, version)
+    finally:
+        _release(lock_key, token)
+        connections.close_all()
+
+
+def cached_dashboard(name, params):
+    """Data of dashboard ``name`` for the filter ``params``, from cache if possible."""
+    params = normalize_params(params)
+    if not settings.DASHBOARD_CACHE_TTL:
+        return DASHBOARDS[name](params)
+
+    version = data_version()
+    fresh_key, latest_key, lock_key = _keys(name, params, version)
+    data = cache.get(fresh_key)
+    if data is not None:
+        return data
+
+    token = uuid.uuid4().hex
+    locked = cache.add(lock_key, token, SINGLE_FLIGHT_WAIT)
+    stale = cache.get(latest_key)
+    if stale is not None:
+        if locked:
+            threading.Thread(target=_revalidate, args=(name, params, version, lock_key, token),
+                             name=f'revalidate-{name}', daemon=True).start()
+        return stale
+
+    if not locked:
+        # Someone else is computing it; take their result when it lands
+        deadline = time.monotonic() + SINGLE_FLIGHT_WAIT
+        while time.monotonic() < deadline:
+            time.sleep(SINGLE_FLIGHT_POLL)
+            data = cache.get(fresh_key)
+            if data is not None:
+                return data
+        return _compute(name, params, version)
+
+    try:
+        return _compute(name, params, version)
+    finally:
+        _release(lock_key, token)
+
+
+def warm_dashboards():
+    """Compute the unfiltered dashboards for the current data version."""
+    import core.views  # noqa: F401 -- registers the dashboards
+
+    version = data_version()
+    for name in sorted(WARM_DASHBOARDS):
+        _compute(name, {}, version)
@@ -0,0 +1,100 @@
+"""
+Parsing for every timestamp format the Omniful API returns.
+
+The API mixes ISO 8601 (orders, sellers) with several English month-name
+layouts (bills)::
+
+    2024-11-01T08:15:30.12Z          orders / sellers
+    Nov 01, 2024 08:15:30 AM         bill listing
+    November 01, 2024 08:15 AM       bill detail created_at
+    November 01, 2024                bill detail period dates
+
+``parse_omniful_datetime`` picks the layout from the string's shape, parses
+it without strptime on the hot path, and returns an aware datetime in
+Asia/Riyadh. Results are memoized because bill period dates repeat heavily.
+"""
+
+from datetime import datetime
+from functools import lru_cache
+from zoneinfo import ZoneInfo
+
+from dateutil import parser as dateutil_parser
+
+
+RIYADH = ZoneInfo('Asia/Riyadh')
+
+MONTHS = {
+    name: number
+    for number, names in enumerate([
+        ('jan', 'january'), ('feb', 'february'), ('mar', 'march'),
+        ('apr', 'april'), ('may',), ('jun', 'june'), ('jul', 'july'),
+        ('aug', 'august'), ('sep', 'sept', 'september'),
+        ('oct', 'october'), ('nov', 'november'), ('dec', 'december'),
+    ], start=1)
+    for name in names
+}
+
+
+def parse_omniful_datetime(value):
+    """Parse any Omniful timestamp into an aware Asia/Riyadh datetime.
+
+    Returns None for empty or unrecognised values instead of raising.
+    """
+    if not value or not isinstance(value, str):
+        return None
+    return _parse_cached(value.strip())
+
+
+def cache_info():
+    """Hit/miss statistics of the parse cache."""
+    return _parse_cached.cache_info()
+
+
+@lru_cache(maxsize=8192)
+def _parse_cached(value):
+    if not value:
+        return None
+    try:
+        if value[:4].isdigit() and value[4:5] == '-':
+            parsed = _parse_iso(value)
+        else:
+            parsed = _parse_month_name(value)
+    except (ValueError, KeyError, IndexError):
+        parsed = None
+
+    if parsed is None:
+        # Anything we don't have a fast path for yet
+        try:
+            parsed = dateutil_parser.parse(value)
+        except (ValueError, OverflowError):
+            return None
+
+    if parsed.tzinfo is None:
+        return parsed.replace(tzinfo=RIYADH)
+    return parsed.astimezone(RIYADH)
+
+
+def _parse_iso(value):
+    # fromisoformat accepts 'Z' and short fractions on Python 3.11+
+    return datetime.fromisoformat(value)
+
+
+def _parse_month_name(value):
+    """Parse 'Nov 01, 2024[ 08:15[:30] AM]' and the full month name variant."""
+    parts = value.replace(',', ' ').split()
+    month = MONTHS[parts[0].lower().rstrip('.')]
+    day = int(parts[1])
+    year = int(parts[2])
+    if len(parts) == 3:
+        return datetime(year, month, day)
+
+    clock = parts[3].split(':')
+    hour = int(clock[0])
+    minute = int(clock[1])
+    second = int(clock[2]) if len(clock) > 2 else 0
+    if len(parts) > 4:
+        meridiem = parts[4].upper()
+        if meridiem not in ('AM', 'PM') or not 1 <= hour <= 12:
+            raise ValueError(value)
+        hour = hour % 12 + (12 if meridiem == 'PM' else 0)
+    return datetime(year, month, day, hour, minute, second)
@@ -0,0 +1,172 @@
+"""
+Database-backed queue of management commands.
+
+Views ``enqueue()`` a command and return at once; the ``run_jobs`` worker
+claims queued jobs and runs them with ``call_command``. Only the commands
+listed in ``settings.JOB_CONCURRENCY`` can be queued, and each runs at
+most that many times at once across all workers. Workers renew a
+heartbeat on their running jobs; a job whose worker died without
+finishing it is failed once the heartbeat is JOB_HEARTBEAT_TTL old.
+"""
+
+import hashlib
+import json
+import os
+import socket
+import traceback
+from collections import deque
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from core.models import Job
+
+
+# Characters of command output kept on the job
+RESULT_CHARS = 10000
+
+# Options that only tell a run apart (e.g. which progress row it reports
+# on) and are left out of the deduplication key
+TRACKING_OPTIONS = {'run_id'}
+
+
+def concurrency_limit(job_type):
+    return settings.JOB_CONCURRENCY[job_type]
+
+
+def dedup_key(job_type, args, options):
+    """Hash of a command and the arguments that change what it does."""
+    options = {k: v for k, v in options.items() if k not in TRACKING_OPTIONS}
+    normalized = json.dumps([job_type, list(args), options], sort_keys=True, default=str)
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+
+def enqueue(job_type, *args, user=None, **options):
+    """Queue ``call_command(job_type, *args, **options)``.
+
+    Returns ``(job, created)``; when an identical job is already waiting
+    that job is returned instead of queueing a second one.
+    """
+    if job_type not in settings.JOB_CONCURRENCY:
+        raise ValueError(f'{job_type} is not a queueable job')
+
+    key = dedup_key(job_type, args, options)
+    pending = Job.objects.filter(dedup_key=key, status=Job.QUEUED).first()
+    if pending:
+        return pending, False
+    try:
+        with transaction.atomic():
+            job = Job.objects.create(
+                job_type=job_type, args=list(args), options=options,
+                dedup_key=key, requested_by=user)
+        return job, True
+    except IntegrityError:
+        # Another request queued the same job in between
+        return Job.objects.get(dedup_key=key, status=Job.QUEUED), False
+
+
+def worker_name():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def heartbeat(worker):
+    """Renew the heartbeat of the jobs ``worker`` is running."""
+    return (Job.objects.filter(status=Job.RUNNING, worker=worker)
+            .update(heartbeat_at=timezone.now()))
+
+
+def fail_stale_jobs(now=None):
+    """Fail running jobs whose worker stopped renewing their heartbeat.
+
+    Otherwise a worker killed mid-job would leave it running forever,
+    holding one of its type's slots. Returns the number of jobs failed.
+    """
+    now = now or timezone.now()
+    cutoff = now - timedelta(seconds=settings.JOB_HEARTBEAT_TTL)
+    return (Job.objects
+            .filter(status=Job.RUNNING)
+            .filter(Q(heartbeat_at__lt=cutoff) | Q(heartbeat_at__isnull=True, started_at__lt=cutoff))
+            .update(status=Job.FAILED, finished_at=now,
+                    error='The worker stopped sending heartbeats; it probably died mid-job.'))
+
+
+class OutputTail:
+    """Write-only stream keeping the last ``size`` characters written."""
+
+    def __init__(self, size=RESULT_CHARS):
+        self._chars = deque(maxlen=size)
+
+    def write(self, text):
+        self._chars.extend(text)
+
+    def flush(self):
+        pass
+
+    def getvalue(self):
+        return ''.join(self._chars)
+
+
+def _lock_job_type(job_type):
+    """Serialize claims of ``job_type`` until the current transaction ends.
+
+    SQLite runs one write at a time, so the conditional claim UPDATE is
+    atomic there. Under PostgreSQL's READ COMMITTED two claims of
+    different rows could both count the same running jobs, so they take
+    a per-type advisory lock first.
+    """
+    if connection.vendor != 'postgresql':
+        return
+    digest = hashlib.sha256(f'jobs:{job_type}'.encode('utf-8')).digest()
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT pg_advisory_xact_lock(%s)',
+                       [int.from_bytes(digest[:8], 'big', signed=True)])
+
+
+def claim_next(worker, job_types=None):
+    """Mark the oldest runnable queued job as running and return it, or None.
+
+    A job is runnable while fewer than its type's limit are running. Each
+    claim is a conditional UPDATE made under a per-type lock, so two
+    workers can't take the same job or push a type past its limit. Stale
+    running jobs are failed first so they don't hold a slot.
+    """
+    fail_stale_jobs()
+    queued = Job.objects.filter(status=Job.QUEUED).order_by('created_at')
+    if job_types:
+        queued = queued.filter(job_type__in=job_types)
+
+    running = (Job.objects.filter(status=Job.RUNNING, job_type=OuterRef('job_type'))
+               .values('job_type').annotate(n=Count('pk')).values('n'))
+    for job in queued.only('pk', 'job_type'):
+        with transaction.atomic():
+            _lock_job_type(job.job_type)
+            now = timezone.now()
+            claimed = (Job.objects
+                       .filter(pk=job.pk, status=Job.QUEUED)
+                       .alias(running=Coalesce(Subquery(running), 0))
+                       .filter(running__lt=concurrency_limit(job.job_type))
+                       .update(status=Job.RUNNING, worker=worker, started_at=now, heartbeat_at=now))
+        if claimed:
+            return Job.objects.get(pk=job.pk)
+    return None
+
+
+def run_job(job):
+    """Run a claimed job and record its outcome."""
+    # Long syncs print for hours; only the tail is kept
+    stdout = OutputTail()
+    try:
+        call_command(job.job_type, *job.args, stdout=stdout, stderr=stdout, **job.options)
+        job.status = Job.SUCCEEDED
+    except Exception:
+        job.status = Job.FAILED
+        job.error = traceback.format_exc()
+    job.result = stdout.getvalue()
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'result', 'error', 'finished_at'])
+    return job
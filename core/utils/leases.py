@@ -0,0 +1,187 @@
+"""
+Lease locks that keep overlapping runs of a sync from running at once.
+
+Cron, the job worker and people at a shell can all start the same sync.
+``exclusive(key)`` wraps a command's ``handle`` so only one run per key
+is active across processes and hosts. A run that finds the lease taken
+by the same command with the same options asks the holder for one
+follow-up run and exits, so any number of overlapping identical requests
+collapse into a single extra run. A request that would run differently
+(another command sharing the key, another seller, ``--full``) waits up
+to SYNC_LEASE_WAIT seconds for the lease and is skipped, with a warning,
+if it stays taken; a scheduled run then simply comes again later.
+"""
+
+import functools
+import logging
+import threading
+import time
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from core.models import SyncLease
+from core.utils.jobs import dedup_key, worker_name
+
+
+# Lease shared by every command that writes orders from the order API, so
+# sync_orders and sync_all_orders (for any seller) never write the same
+# seller's orders, watermarks or checkpoints at once
+ORDER_SYNC_LEASE = 'order_sync'
+
+# Seconds between attempts to take a lease held by a different request
+LEASE_WAIT_INTERVAL = 5
+
+logger = logging.getLogger(__name__)
+
+# Options every command has that don't change what a run does
+RUN_NEUTRAL_OPTIONS = {'verbosity', 'settings', 'pythonpath', 'traceback', 'no_color',
+                       'force_color', 'skip_checks', 'stdout', 'stderr'}
+
+
+def run_key(command, args, options):
+    """Hash of a command and the arguments that change what it does."""
+    name = type(command).__module__.rsplit('.', 1)[-1]
+    options = {k: v for k, v in options.items() if k not in RUN_NEUTRAL_OPTIONS}
+    return dedup_key(name, args, options)
+
+
+class Lease:
+    """One process's claim on the lease ``key`` for the run ``run_key``."""
+
+    def __init__(self, key, ttl=None, run_key=''):
+        self.key = key
+        self.run_key = run_key
+        self.ttl = timedelta(seconds=ttl or settings.SYNC_LEASE_TTL)
+        self.holder = f'{worker_name()}:{uuid.uuid4().hex[:8]}'
+        self.lost = False
+        self._stop = threading.Event()
+        self._heartbeat = None
+
+    def _mine(self):
+        return SyncLease.objects.filter(key=self.key, holder=self.holder)
+
+    def acquire(self):
+        """Take the lease if it is free or its holder stopped renewing it."""
+        try:
+            with transaction.atomic():
+                SyncLease.objects.get_or_create(key=self.key)
+        except IntegrityError:
+            pass  # created by a concurrent acquire
+        now = timezone.now()
+        taken = (SyncLease.objects
+                 .filter(key=self.key)
+                 .filter(Q(holder='') | Q(expires_at__lt=now))
+                 .update(holder=self.holder, run_key=self.run_key, acquired_at=now,
+                         expires_at=now + self.ttl, rerun_requested=False))
+        return bool(taken)
+
+    def request_rerun(self):
+        """Ask the active holder for a follow-up run.
+
+        Returns False if the lease was released in the meantime or the
+        holder runs with another ``run_key``, in which case the caller
+        should try to acquire it again.
+        """
+        return bool(SyncLease.objects
+                    .filter(key=self.key, run_key=self.run_key, expires_at__gte=timezone.now())
+                    .exclude(holder='')
+                    .update(rerun_requested=True))
+
+    def renew(self):
+        if not self._mine().update(expires_at=timezone.now() + self.ttl):
+            self.lost = True
+        return not self.lost
+
+    def start_heartbeat(self):
+        """Renew the lease from a background thread until ``release()``."""
+        def beat():
+            interval = self.ttl.total_seconds() / 3
+            while not self._stop.wait(interval):
+                if not self.renew():
+                    break
+            connections.close_all()
+
+        self._stop.clear()
+        self._heartbeat = threading.Thread(target=beat, name=f'lease-{self.key}', daemon=True)
+        self._heartbeat.start()
+
+    def stop_heartbeat(self):
+        self._stop.set()
+        if self._heartbeat is not None:
+            self._heartbeat.join()
+            self._heartbeat = None
+
+    def take_rerun(self):
+        """Clear a pending follow-up request, keeping the lease; True if there was one."""
+        return bool(self._mine().filter(rerun_requested=True).update(rerun_requested=False))
+
+    def release(self, force=False):
+        """Give the lease up unless a follow-up run was requested meanwhile."""
+        mine = self._mine() if force else self._mine().filter(rerun_requested=False)
+        return bool(mine.update(holder='', expires_at=timezone.now()))
+
+
+def _warn(command, message):
+    logger.warning(message)
+    command.stdout.write(command.style.WARNING(message))
+
+
+def exclusive(key, on_coalesced=None, on_skipped=None):
+    """Decorate a command's ``handle`` to run under the lease ``key``.
+
+    ``key`` may be a function of the command options, for commands whose
+    runs only overlap for the same options. ``on_coalesced(command,
+    options)`` is called when the run is folded into the active one and
+    ``on_skipped(command, options)`` when it gave up waiting for a run
+    with other options.
+    """
+    def decorator(handle):
+        @functools.wraps(handle)
+        def wrapper(command, *args, **options):
+            lease_key = key(options) if callable(key) else key
+            lease = Lease(lease_key, run_key=run_key(command, args, options))
+            deadline = time.monotonic() + settings.SYNC_LEASE_WAIT
+            waiting = False
+            while not lease.acquire():
+                if lease.request_rerun():
+                    _warn(command, f'{lease_key} is already running; it will run once more when it finishes')
+                    if on_coalesced:
+                        on_coalesced(command, options)
+                    return None
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    _warn(command, f'{lease_key} is still running with other options; skipping this run')
+                    if on_skipped:
+                        on_skipped(command, options)
+                    return None
+                if not waiting:
+                    _warn(command, f'{lease_key} is running with other options; waiting up to '
+                                   f'{settings.SYNC_LEASE_WAIT}s for it to finish')
+                    waiting = True
+                time.sleep(min(LEASE_WAIT_INTERVAL, remaining))
+
+            result = None
+            lease.start_heartbeat()
+            try:
+                while True:
+                    result = handle(command, *args, **options)
+                    if lease.lost:
+                        command.stdout.write(command.style.WARNING(
+                            f'Lost the {lease_key} lease while running; another run has taken over'))
+                        break
+                    if lease.take_rerun() or not lease.release():
+                        command.stdout.write(f'Running {lease_key} again for requests made during the run')
+                        continue
+                    break
+            finally:
+                lease.stop_heartbeat()
+                # No-op after a normal release; frees the lease if handle raised
+                lease.release(force=True)
+            return result
+        return wrapper
+    return decorator
@@ -0,0 +1,154 @@
+"""
+Live sync progress and logs for the browser.
+
+The same change feed backs two transports: Server-Sent Events, which push
+progress deltas and new log chunks as they appear, and JSON polling for
+clients that can't hold a stream open. Streams check their source once per
+CHECK_INTERVAL and concurrent streams in one process share those reads,
+so many open dashboards cost about as much as one.
+"""
+
+import json
+import logging
+import threading
+import time
+import uuid
+
+from django.conf import settings
+
+from core.models import SyncLog, SyncLogChunk
+
+
+# Seconds between server-side checks of a progress or log source
+CHECK_INTERVAL = 1.0
+# Idle streams send a comment this often so proxies keep them open
+HEARTBEAT_INTERVAL = 15.0
+# Reconnect delay suggested to EventSource (milliseconds)
+RETRY_MS = 3000
+
+
+def sse_event(data, event=None, event_id=None):
+    """Format one Server-Sent Event with a JSON payload."""
+    message = ''
+    if event_id is not None:
+        message += f'id: {event_id}\n'
+    if event:
+        message += f'event: {event}\n'
+    return message + f'data: {json.dumps(data, default=str)}\n\n'
+
+
+class SharedReader:
+    """Memoize ``read()`` for ``ttl`` seconds across threads."""
+
+    def __init__(self, read, ttl=CHECK_INTERVAL):
+        self.read = read
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._value = None
+        self._read_at = None
+
+    def __call__(self):
+        with self._lock:
+            now = time.monotonic()
+            if self._read_at is None or now - self._read_at >= self.ttl:
+                self._value = self.read()
+                self._read_at = now
+            return self._value
+
+
+def progress_delta(old, new):
+    """Keys of ``new`` whose values differ from ``old``."""
+    return {key: value for key, value in new.items() if old.get(key) != value}
+
+
+def progress_events(read, sleep=time.sleep):
+    """SSE stream of a progress dict: a snapshot, then deltas until complete."""
+    yield f'retry: {RETRY_MS}\n\n'
+    sent = {}
+    started = last_sent = time.monotonic()
+    while True:
+        current = read()
+        delta = progress_delta(sent, current)
+        if delta:
+            yield sse_event(delta, 'progress')
+            sent = dict(current)
+            last_sent = time.monotonic()
+        if current.get('is_complete'):
+            yield sse_event({}, 'done')
+            return
+
+        now = time.monotonic()
+        if now - started >= settings.LIVE_STREAM_SECONDS:
+            return
+        if now - last_sent >= HEARTBEAT_INTERVAL:
+            yield ': keep-alive\n\n'
+            last_sent = now
+        sleep(CHECK_INTERVAL)
+
+
+def log_updates(key, run_id=None, after_seq=0, min_level=logging.INFO, skip_run=None):
+    """New log lines of a sync run since chunk ``after_seq``.
+
+    Follows ``run_id`` if given, else the latest run of ``key``. Returns
+    None while there is no run yet or the latest run is ``skip_run`` (a
+    page that just started a sync waits out the previous run this way).
+    """
+    runs = SyncLog.objects.filter(key=key)
+    run = (runs.filter(run_id=run_id).first() if run_id else None) or runs.order_by('-created_at').first()
+    if run is None or str(run.run_id) == str(skip_run):
+        return None
+    if run_id and str(run.run_id) != str(run_id):
+        after_seq = 0
+
+    lines = []
+    seq = after_seq
+    chunks = SyncLogChunk.objects.filter(log=run, seq__gt=after_seq).order_by('seq')
+    for chunk_seq, max_level, chunk_lines in chunks.values_list('seq', 'max_level', 'lines'):
+        seq = chunk_seq
+        if max_level >= min_level:
+            lines.extend(msg for level, msg in chunk_lines if level >= min_level)
+
+    completed = run.status != SyncLog.RUNNING
+    return {
+        'run_id': str(run.run_id),
+        'status': run.status,
+        'seq': seq,
+        'lines': lines,
+        'completed': completed,
+        'summary': run.content if completed else None,
+    }
+
+
+def log_events(key, run_id=None, after_seq=0, min_level=logging.INFO, skip_run=None,
+               sleep=time.sleep):
+    """SSE stream of a sync run's log chunks, ending when the run finishes."""
+    yield f'retry: {RETRY_MS}\n\n'
+    started = last_sent = time.monotonic()
+    while True:
+        update = log_updates(key, run_id, after_seq, min_level, skip_run)
+        if update:
+            run_id, after_seq = update['run_id'], update['seq']
+            if update['lines']:
+                yield sse_event({'lines': update['lines']}, 'log', f"{run_id}:{after_seq}")
+                last_sent = time.monotonic()
+            if update['completed']:
+                yield sse_event({'status': update['status'], 'summary': update['summary']},
+                                'done', f"{run_id}:{after_seq}")
+                return
+
+        now = time.monotonic()
+        if now - started >= settings.LIVE_STREAM_SECONDS:
+            return
+        if now - last_sent >= HEARTBEAT_INTERVAL:
+            yield ': keep-alive\n\n'
+            last_sent = now
+        sleep(CHECK_INTERVAL)
+
+
+def parse_last_event_id(value):
+    """Split a ``run_id:seq`` Last-Event-ID into ``(run_id, seq)``."""
+    run_id, _, seq = (value or '').partition(':')
+    try:
+        return str(uuid.UUID(run_id)), int(seq)
+    except ValueError:
+        return None, 0
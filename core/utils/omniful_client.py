@@ -0,0 +1,186 @@
+"""
+Shared HTTP client for the Omniful public API.
+
+Every command and view goes through ``get_client()`` so that connections are
+pooled and kept alive, requests are paced by an adaptive per-family rate
+limiter, transient failures are retried with exponential backoff and jitter,
+and a host that keeps failing is short-circuited instead of being hammered.
+"""
+
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+from core.utils.rate_limit import (
+    THROTTLE_STATUSES, AdaptiveRateLimiter, endpoint_family, parse_retry_after,
+)
+
+
+# Responses worth retrying: throttling and transient upstream failures
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class CircuitOpenError(requests.ConnectionError):
+    """Raised without touching the network while a host's circuit is open."""
+
+
+class CircuitBreaker:
+    """Per-host circuit breaker.
+
+    After ``failure_threshold`` consecutive failures the circuit opens and
+    requests fail fast for ``reset_timeout`` seconds. The first request after
+    that is let through as a probe: success closes the circuit, failure opens
+    it again.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False
+
+    def before_request(self, host):
+        with self._lock:
+            if self._opened_at is None:
+                return
+            if time.monotonic() - self._opened_at < self.reset_timeout or self._probing:
+                raise CircuitOpenError(f'Circuit open for {host}, skipping request')
+            self._probing = True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._probing or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+            self._probing = False
+
+
+class OmnifulClient:
+    """Pooled, retrying client for the Omniful API.
+
+    Paths are relative to ``OMNIFUL_BASE_URL`` so a local stand-in server
+    can replace production by changing a single setting.
+    """
+
+    def __init__(self, base_url=None, token=None, timeout=None, max_retries=None,
+                 backoff_base=None, backoff_max=None, pool_size=None):
+        self.base_url = (base_url or settings.OMNIFUL_BASE_URL).rstrip('/')
+        self.token = settings.OMNIFUL_ACCESS_TOKEN if token is None else token
+        self.timeout = timeout or settings.OMNIFUL_TIMEOUT
+        self.max_retries = settings.OMNIFUL_MAX_RETRIES if max_retries is None else max_retries
+        self.backoff_base = settings.OMNIFUL_BACKOFF_BASE if backoff_base is None else backoff_base
+        self.backoff_max = settings.OMNIFUL_BACKOFF_MAX if backoff_max is None else backoff_max
+        pool_size = pool_size or settings.OMNIFUL_POOL_SIZE
+
+        self.session = requests.Session()
+        # Retries are handled here so they can feed the circuit breaker
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size,
+                              max_retries=0, pool_block=True)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update({
+            'Authorization': f'Bearer {self.token}',
+            'Connection': 'keep-alive',
+        })
+
+        self._breakers = {}
+        self._breakers_lock = threading.Lock()
+        self._limiters = {
+            family: AdaptiveRateLimiter(ceiling)
+            for family, ceiling in settings.OMNIFUL_RATE_LIMITS.items()
+        }
+
+    @property
+    def has_token(self):
+        return bool(self.token)
+
+    def url(self, path):
+        """Absolute URL for an API path such as ``/tenants/sellers``."""
+        return f"{self.base_url}/{path.lstrip('/')}"
+
+    def breaker(self, host):
+        with self._breakers_lock:
+            if host not in self._breakers:
+                self._breakers[host] = CircuitBreaker(
+                    settings.OMNIFUL_CIRCUIT_THRESHOLD, settings.OMNIFUL_CIRCUIT_RESET)
+            return self._breakers[host]
+
+    def limiter(self, family):
+        """Rate limiter for an endpoint family ('sellers', 'orders', 'bills')."""
+        return self._limiters.get(family) or self._limiters['default']
+
+    def backoff(self, attempt):
+        """Exponential backoff with full jitter for retry ``attempt`` (0-based)."""
+        ceiling = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        return random.uniform(0, ceiling)
+
+    def get(self, path, params=None, timeout=None, headers=None):
+        """GET ``path`` and return the final Response.
+
+        Connection errors and retryable statuses are retried up to
+        ``max_retries`` times. Callers still decide what a non-2xx means,
+        exactly as with ``requests.get``.
+        """
+        url = self.url(path)
+        host = urlsplit(url).netloc
+        breaker = self.breaker(host)
+        limiter = self.limiter(endpoint_family(path))
+        attempt = 0
+        while True:
+            breaker.before_request(host)
+            limiter.acquire()
+            delay = self.backoff(attempt)
+            try:
+                response = self.session.get(url, params=params, headers=headers,
+                                            timeout=timeout or self.timeout)
+            except (requests.ConnectionError, requests.Timeout):
+                breaker.record_failure()
+                if attempt >= self.max_retries:
+                    raise
+            else:
+                if response.status_code in THROTTLE_STATUSES:
+                    retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                    limiter.on_throttle(retry_after)
+                    delay = max(delay, retry_after or 0)
+                elif response.status_code < 400:
+                    limiter.on_success()
+                if response.status_code not in RETRY_STATUSES:
+                    breaker.record_success()
+                    return response
+                breaker.record_failure()
+                if attempt >= self.max_retries:
+                    return response
+            time.sleep(delay)
+            attempt += 1
+
+    def get_json(self, path, params=None, timeout=None):
+        """GET ``path``, raise for HTTP errors and return the decoded body."""
+        response = self.get(path, params=params, timeout=timeout)
+        response.raise_for_status()
+        return response.json()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """Process-wide OmnifulClient, shared so its connection pool is reused."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = OmnifulClient()
+        return _client
@@ -0,0 +1,162 @@
+"""
+Push ingestion of Omniful order events.
+
+The webhook verifies each request's signature, stores its events in the
+OrderEvent inbox and returns; ``drain_events()`` later applies them in
+batches with the same mapping and upsert as the polling syncs. Event ids
+make redeliveries no-ops, each batch keeps one event per order and an
+event older than the order's stored payload is skipped, so late
+deliveries never roll an order back.
+
+Requests carry ``X-Omniful-Timestamp`` (Unix seconds) and
+``X-Omniful-Signature: sha256=<hex>``, an HMAC-SHA256 with
+OMNIFUL_WEBHOOK_SECRET over ``"<timestamp>." + body``. The body is one
+event or a list of them::
+
+    {"id": "evt_1", "event": "order.updated", "seller_code": "S1", "data": {...order...}}
+"""
+
+import hashlib
+import hmac
+import time
+
+from django.conf import settings
+from django.utils import timezone
+
+from core.models import OrderEvent, OrderPayload
+from core.utils.order_ingest import build_order_fields, bulk_upsert_orders
+from core.utils.seller_catalog import SellerCatalog
+from core.utils.sync_utils import order_activity_at
+
+
+SIGNATURE_HEADER = 'X-Omniful-Signature'
+TIMESTAMP_HEADER = 'X-Omniful-Timestamp'
+
+# Events tried this many times are left for a person to look at
+MAX_ATTEMPTS = 5
+
+
+class InvalidEvent(ValueError):
+    """A webhook body that can't be stored."""
+
+
+def sign(secret, timestamp, body):
+    message = str(timestamp).encode('utf-8') + b'.' + body
+    return 'sha256=' + hmac.new(secret.encode('utf-8'), message, hashlib.sha256).hexdigest()
+
+
+def verify_signature(secret, timestamp, signature, body, now=None):
+    """Whether ``signature`` is valid for ``body`` and ``timestamp`` is recent."""
+    try:
+        age = abs((now or time.time()) - int(timestamp))
+    except (TypeError, ValueError):
+        return False
+    if age > settings.OMNIFUL_WEBHOOK_TOLERANCE:
+        return False
+    return hmac.compare_digest(sign(secret, timestamp, body), signature or '')
+
+
+def _seller_code(event):
+    data = event.get('data') or {}
+    seller = data.get('seller') if isinstance(data.get('seller'), dict) else {}
+    return event.get('seller_code') or data.get('seller_code') or seller.get('code') or ''
+
+
+def parse_events(payload):
+    """OrderEvent instances (unsaved) for a decoded webhook body.
+
+    Raises InvalidEvent if an event lacks an id, a known type or order data.
+    """
+    events = payload if isinstance(payload, list) else [payload]
+    parsed = []
+    for event in events:
+        if not isinstance(event, dict):
+            raise InvalidEvent('Events must be JSON objects')
+        event_id, event_type, data = event.get('id'), event.get('event'), event.get('data')
+        if not event_id or event_type not in OrderEvent.EVENT_TYPES or not isinstance(data, dict):
+            raise InvalidEvent(f'Invalid order event {event_id!r}')
+        parsed.append(OrderEvent(
+            event_id=str(event_id), event_type=event_type, seller_code=_seller_code(event),
+            omniful_id=str(data.get('id') or ''), payload=data))
+    return parsed
+
+
+def store_events(events):
+    """Append ``events`` to the inbox; returns how many were new."""
+    ids = [event.event_id for event in events]
+    known = set(OrderEvent.objects.filter(event_id__in=ids).values_list('event_id', flat=True))
+    OrderEvent.objects.bulk_create(events, ignore_conflicts=True)
+    return len(set(ids) - known)
+
+
+def pending_events():
+    return OrderEvent.objects.filter(processed_at__isnull=True, attempts__lt=MAX_ATTEMPTS)
+
+
+def _stored_activity(omniful_ids):
+    """Order activity of the stored payloads of ``omniful_ids``, by omniful_id."""
+    payloads = (OrderPayload.objects.filter(order__omniful_id__in=omniful_ids)
+                .values_list('order__omniful_id', 'data'))
+    return {omniful_id: order_activity_at(OrderPayload(data=data).raw_data)
+            for omniful_id, data in payloads}
+
+
+def drain_events(batch_size=500, log=None):
+    """Apply pending events in batches until the inbox is empty.
+
+    Events older than the stored order count as applied without writing.
+    Returns ``(applied, failed)`` event counts.
+    """
+    catalog = SellerCatalog.load()
+    applied = failed = 0
+    skip = set()  # events that failed during this drain
+    while True:
+        events = list(pending_events().exclude(pk__in=skip).order_by('id')[:batch_size])
+        if not events:
+            return applied, failed
+
+        # Per order, the event with the latest order activity wins; among
+        # equals the one received last
+        latest = {}
+        errors = {}
+        for event in events:
+            seller = catalog.get(code=event.seller_code) if event.seller_code else None
+            row = build_order_fields(event.payload, seller) if seller else None
+            if row is None:
+                errors[event.pk] = ('Unknown seller' if seller is None
+                                    else 'Order payload without id or order_id')
+                continue
+            activity = order_activity_at(event.payload)
+            current = latest.get(row['omniful_id'])
+            if current is None or not (activity and current[0] and activity < current[0]):
+                latest[row['omniful_id']] = (activity, row)
+
+        # Events that arrived after a newer one was already applied
+        stored = _stored_activity(list(latest))
+        stale = [omniful_id for omniful_id, (activity, _) in latest.items()
+                 if activity and stored.get(omniful_id) and activity < stored[omniful_id]]
+        for omniful_id in stale:
+            del latest[omniful_id]
+        if stale and log:
+            log(f'Skipped {len(stale)} events older than the stored orders')
+
+        done = [event.pk for event in events if event.pk not in errors]
+        if latest:
+            try:
+                created, updated, unchanged = bulk_upsert_orders([row for _, row in latest.values()])
+            except Exception as e:
+                errors.update({pk: str(e) for pk in done})
+                done = []
+            else:
+                if log:
+                    log(f'Applied {len(done)} events: {created} created, {updated} updated, '
+                        f'{unchanged} unchanged')
+
+        now = timezone.now()
+        OrderEvent.objects.filter(pk__in=done).update(processed_at=now, error='')
+        for pk, error in errors.items():
+            event = next(e for e in events if e.pk == pk)
+            OrderEvent.objects.filter(pk=pk).update(attempts=event.attempts + 1, error=error)
+        skip.update(errors)
+        applied += len(done)
+        failed += len(errors)
@@ -0,0 +1,215 @@
+"""
+Order ingestion helpers shared by the order sync commands.
+
+``build_order_fields`` maps one Omniful order payload to ``Order`` field
+values and ``bulk_upsert_orders`` writes a whole API page in one statement,
+with the compressed raw payloads going to ``OrderPayload`` alongside.
+``transform_order_page`` is the transform stage of the ingestion pipeline.
+Each written page also refreshes the daily rollups of the days it touched.
+"""
+
+import logging
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from core.models import Order, OrderPayload
+from core.utils.dashboard_cache import record_changes
+from core.utils.dates import parse_omniful_datetime
+from core.utils.rollups import refresh_rollups, rollup_day
+from core.utils.sync_utils import order_activity_at, payload_hash
+
+
+# Columns recomputed by Order.apply_delivery_metrics() or touched by auto_now,
+# which must be refreshed on conflict alongside the mapped payload fields.
+DERIVED_FIELDS = ['days_to_deliver', 'is_delayed', 'delay_category',
+                  'last_updated_at', 'updated_at']
+
+# Row key holding the compressed payload, written to OrderPayload not Order
+PAYLOAD_KEY = 'payload'
+
+logger = logging.getLogger(__name__)
+
+
+def build_order_fields(order_data, seller):
+    """Map an Omniful order payload to Order field values.
+
+    The row also carries the zlib-compressed payload under PAYLOAD_KEY.
+    Returns None for payloads missing either identifier.
+    """
+    omniful_id = order_data.get('id')
+    order_id = order_data.get('order_id')
+    if not order_id or not omniful_id:
+        return None
+
+    order_created_at = parse_omniful_datetime(
+        order_data.get('order_created_at')) or timezone.now()
+
+    shipment = order_data.get('shipment') or {}
+    customer = order_data.get('customer') or {}
+    shipping = order_data.get('shipping_address') or {}
+
+    # Order listings carry order_delivered_at; older payloads only have
+    # delivery_timestamp, which sync_all_orders has always read
+    delivery_date = parse_omniful_datetime(
+        shipment.get('order_delivered_at') or shipment.get('delivery_timestamp'))
+
+    return {
+        'omniful_id': omniful_id,
+        'order_id': order_id,
+        'order_alias': order_data.get('order_alias', ''),
+        'seller': seller,
+        'seller_code': order_data.get('seller_code', ''),
+        'store_name': order_data.get('store_name') or '',
+        'status_code': order_data.get('status_code') or '',
+        'status_clean': Order.normalize_status(order_data.get('status_code')),
+        'source': order_data.get('source', ''),
+        'order_type': order_data.get('type') or 'B2C',
+        'delivery_type': order_data.get('delivery_type') or '',
+        'order_created_at': order_created_at,
+        'created_at_api': order_created_at,
+        'delivery_date': delivery_date,
+        'payment_mode': order_data.get('payment_mode') or '',
+        'payment_method': order_data.get('payment_method') or '',
+        'total': order_data.get('total') or 0,
+        'shipping_city': shipping.get('city') or '',
+        'shipping_region': shipping.get('state') or shipping.get('region') or '',
+        'shipping_country': shipping.get('country') or '',
+        'customer_first_name': customer.get('first_name') or '',
+        'customer_last_name': customer.get('last_name') or '',
+        'customer_email': customer.get('email', ''),
+        'customer_phone': customer.get('phone', ''),
+        'delivery_status': shipment.get('delivery_status') or '',
+        'tracking_url': shipment.get('tracking_url', ''),
+        'shipment_type': order_data.get('shipment_type', ''),
+        'require_shipping': order_data.get('require_shipping', True),
+        'cancel_order_after_seconds': order_data.get('cancel_order_after_seconds') or 0,
+        'expected_delivery_epoch': order_data.get('expected_delivery_epoch') or 0,
+        'payload_hash': payload_hash(order_data),
+        PAYLOAD_KEY: OrderPayload.pack(order_data),
+    }
+
+
+def transform_order_page(batch):
+    """Replace a fetched page's raw ``orders`` with Order field dicts.
+
+    Also records ``newest_seen``, the latest order activity on the page, for
+    the seller's watermark. Batches without orders (end-of-seller markers)
+    pass through unchanged. Module-level so it can run in a process pool.
+    """
+    if 'orders' not in batch:
+        return batch
+
+    rows = []
+    newest_seen = None
+    for order_data in batch['orders']:
+        activity = order_activity_at(order_data)
+        if activity and (newest_seen is None or activity > newest_seen):
+            newest_seen = activity
+
+        row = build_order_fields(order_data, batch['seller'])
+        if row:
+            rows.append(row)
+
+    result = {key: value for key, value in batch.items() if key != 'orders'}
+    result.update(rows=rows, fetched=len(batch['orders']), newest_seen=newest_seen)
+    return result
+
+
+def bulk_upsert_orders(rows):
+    """Insert or update a page of orders in a single transaction.
+
+    ``rows`` are dicts produced by build_order_fields(). Orders whose
+    payload hash and derived delay flag match the stored row are not
+    written at all. Returns a ``(created, updated, unchanged)`` tuple;
+    orders skipped on a conflicting order_id count in none of them.
+    """
+    # A page can repeat an order when the listing shifts under us; the last
+    # copy wins, and PostgreSQL refuses to upsert the same key twice anyway.
+    by_id = {row['omniful_id']: row for row in rows if row}
+    if not by_id:
+        return 0, 0, 0
+
+    update_fields = [f for f in next(iter(by_id.values()))
+                     if f not in ('omniful_id', PAYLOAD_KEY)]
+    update_fields += DERIVED_FIELDS
+
+    with transaction.atomic():
+        existing = {}
+        stored_days = {}
+        for omniful_id, stored_hash, is_delayed, seller_id, created_at in (
+                Order.objects.filter(omniful_id__in=by_id.keys())
+                .values_list('omniful_id', 'payload_hash', 'is_delayed', 'seller_id',
+                             'order_created_at')):
+            existing[omniful_id] = (stored_hash, is_delayed)
+            stored_days[omniful_id] = (seller_id, rollup_day(created_at))
+
+        orders = []
+        unchanged = 0
+        for omniful_id, row in by_id.items():
+            order = Order(**{f: v for f, v in row.items() if f != PAYLOAD_KEY})
+            order.apply_delivery_metrics()
+            # is_delayed also depends on the clock, so an identical payload
+            # still needs a write once a new order ages past the threshold
+            if existing.get(omniful_id) == (order.payload_hash, order.is_delayed):
+                unchanged += 1
+                continue
+            orders.append(order)
+
+        if not orders:
+            return 0, 0, unchanged
+
+        try:
+            with transaction.atomic():
+                Order.objects.bulk_create(
+                    orders,
+                    update_conflicts=True,
+                    unique_fields=['omniful_id'],
+                    update_fields=update_fields,
+                )
+        except IntegrityError:
+            # Usually an order_id reused under a different omniful_id; fall
+            # back to row-by-row so one bad order doesn't sink the page.
+            orders = _upsert_individually(orders, update_fields)
+
+        _store_payloads({order.omniful_id: by_id[order.omniful_id][PAYLOAD_KEY]
+                         for order in orders})
+        record_changes(len(orders))
+
+        # Rollup buckets the orders leave and enter
+        touched = {stored_days[order.omniful_id] for order in orders
+                   if order.omniful_id in stored_days}
+        touched.update((order.seller_id, rollup_day(order.order_created_at)) for order in orders)
+        refresh_rollups(touched)
+
+    updated = sum(1 for order in orders if order.omniful_id in existing)
+    return len(orders) - updated, updated, unchanged
+
+
+def _store_payloads(payloads):
+    """Upsert compressed payloads keyed by omniful_id of already-written orders."""
+    # bulk_create(update_conflicts=True) doesn't hand back primary keys
+    pks = Order.objects.filter(omniful_id__in=payloads.keys()).values_list('omniful_id', 'pk')
+    OrderPayload.objects.bulk_create(
+        [OrderPayload(order_id=pk, data=payloads[omniful_id]) for omniful_id, pk in pks],
+        update_conflicts=True,
+        unique_fields=['order'],
+        update_fields=['data'],
+    )
+
+
+def _upsert_individually(orders, update_fields):
+    """Write ``orders`` one by one; returns the ones written, skipping conflicts."""
+    written = []
+    for order in orders:
+        defaults = {f: getattr(order, f) for f in update_fields
+                    if f not in DERIVED_FIELDS}
+        try:
+            with transaction.atomic():
+                Order.objects.update_or_create(
+                    omniful_id=order.omniful_id, defaults=defaults)
+        except IntegrityError as e:
+            logger.warning('Skipped order %s (omniful_id %s): %s',
+                           order.order_id, order.omniful_id, e)
+            continue
+        written.append(order)
+    return written
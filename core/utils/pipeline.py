@@ -0,0 +1,190 @@
+"""
+Three-stage ingestion pipeline: fetch -> transform -> write.
+
+Fetcher threads turn tasks (e.g. sellers) into items (e.g. API pages),
+transformer threads map items to rows, and the calling thread is the single
+writer. Stages are joined by bounded queues, so a slow database makes the
+fetchers wait instead of piling pages up in memory, while the network and
+the database are kept busy at the same time.
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.db import connections
+
+
+_DONE = object()
+
+
+class StageStats:
+    """Throughput counters for one pipeline stage."""
+
+    def __init__(self, name):
+        self.name = name
+        self.items = 0
+        self.busy = 0.0     # seconds spent doing the stage's own work
+        self.blocked = 0.0  # seconds spent waiting on a full downstream queue
+        self.errors = 0
+        self.started = None
+        self.finished = None
+        self._lock = threading.Lock()
+
+    def record(self, busy, blocked=0.0):
+        with self._lock:
+            self.items += 1
+            self.busy += busy
+            self.blocked += blocked
+
+    def record_error(self):
+        with self._lock:
+            self.errors += 1
+
+    @property
+    def elapsed(self):
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.monotonic()) - self.started
+
+    @property
+    def throughput(self):
+        return self.items / self.elapsed if self.elapsed else 0.0
+
+    def __str__(self):
+        return (f'{self.name}: {self.items} items in {self.elapsed:.1f}s '
+                f'({self.throughput:.1f}/s, busy {self.busy:.1f}s, '
+                f'blocked {self.blocked:.1f}s, {self.errors} errors)')
+
+
+class IngestionPipeline:
+    """Run fetch, transform and write stages concurrently.
+
+    ``fetch(task)`` is a generator yielding items, ``transform(item)``
+    returns the writer's input and ``write(result)`` runs in the calling
+    thread. With ``transform_processes`` the transform runs in a process
+    pool, so it must be a picklable module-level function.
+    """
+
+    def __init__(self, fetch_workers=1, transform_workers=1, queue_size=8,
+                 transform_processes=0, on_error=None):
+        self.fetch_workers = max(1, fetch_workers)
+        self.transform_workers = max(1, transform_workers, transform_processes)
+        self.queue_size = max(1, queue_size)
+        self.transform_processes = transform_processes
+        self.on_error = on_error
+        self.stats = {name: StageStats(name) for name in ('fetch', 'transform', 'write')}
+
+    def run(self, tasks, fetch, transform, write):
+        """Process every task and return the per-stage StageStats."""
+        tasks_q = queue.Queue()
+        for task in tasks:
+            tasks_q.put(task)
+        fetched = queue.Queue(maxsize=self.queue_size)
+        transformed = queue.Queue(maxsize=self.queue_size)
+
+        executor = None
+        if self.transform_processes:
+            executor = ProcessPoolExecutor(max_workers=self.transform_processes)
+            apply = lambda item: executor.submit(transform, item).result()
+        else:
+            apply = transform
+
+        for stats in self.stats.values():
+            stats.started = time.monotonic()
+
+        fetchers = [threading.Thread(target=self._fetch_worker, args=(tasks_q, fetched, fetch),
+                                     name=f'pipeline-fetch-{i}', daemon=True)
+                    for i in range(self.fetch_workers)]
+        transformers = [threading.Thread(target=self._transform_worker, args=(fetched, transformed, apply),
+                                         name=f'pipeline-transform-{i}', daemon=True)
+                        for i in range(self.transform_workers)]
+        for thread in fetchers + transformers:
+            thread.start()
+
+        def close_stages():
+            for thread in fetchers:
+                thread.join()
+            self.stats['fetch'].finished = time.monotonic()
+            for _ in transformers:
+                fetched.put(_DONE)
+            for thread in transformers:
+                thread.join()
+            self.stats['transform'].finished = time.monotonic()
+            transformed.put(_DONE)
+
+        closer = threading.Thread(target=close_stages, name='pipeline-closer', daemon=True)
+        closer.start()
+
+        try:
+            self._write_loop(transformed, write)
+        finally:
+            closer.join()
+            if executor:
+                executor.shutdown()
+            self.stats['write'].finished = time.monotonic()
+        return self.stats
+
+    def _fetch_worker(self, tasks_q, out_q, fetch):
+        stats = self.stats['fetch']
+        try:
+            while True:
+                try:
+                    task = tasks_q.get_nowait()
+                except queue.Empty:
+                    return
+                items = iter(fetch(task))
+                while True:
+                    start = time.monotonic()
+                    try:
+                        item = next(items)
+                    except StopIteration:
+                        break
+                    except Exception as e:
+                        stats.record_error()
+                        self._report('fetch', task, e)
+                        break
+                    produced = time.monotonic()
+                    out_q.put(item)
+                    stats.record(produced - start, time.monotonic() - produced)
+        finally:
+            # Fetchers may read the database (watermarks, checkpoints)
+            connections.close_all()
+
+    def _transform_worker(self, in_q, out_q, apply):
+        stats = self.stats['transform']
+        while True:
+            item = in_q.get()
+            if item is _DONE:
+                return
+            start = time.monotonic()
+            try:
+                result = apply(item)
+            except Exception as e:
+                stats.record_error()
+                self._report('transform', item, e)
+                continue
+            produced = time.monotonic()
+            out_q.put(result)
+            stats.record(produced - start, time.monotonic() - produced)
+
+    def _write_loop(self, in_q, write):
+        stats = self.stats['write']
+        while True:
+            result = in_q.get()
+            if result is _DONE:
+                return
+            start = time.monotonic()
+            try:
+                write(result)
+            except Exception as e:
+                # Keep draining so upstream stages never block on a full queue
+                stats.record_error()
+                self._report('write', result, e)
+                continue
+            stats.record(time.monotonic() - start)
+
+    def _report(self, stage, item, error):
+        if self.on_error:
+            self.on_error(stage, item, error)
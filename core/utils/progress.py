@@ -0,0 +1,127 @@
+"""
+Database-backed progress of long-running jobs.
+
+A job run reports through a ProgressReporter, which keeps the counters in
+memory and writes them to its JobProgress row in one UPDATE at most every
+PROGRESS_MIN_INTERVAL seconds. Pages read the row, so progress shows the
+same on every web node whichever host the job runs on.
+"""
+
+import threading
+import time
+
+from django.utils import timezone
+
+from core.models import JobProgress
+
+
+# Minimum seconds between two progress writes of one run
+PROGRESS_MIN_INTERVAL = 1.0
+
+# Counters shown before a job has reported anything
+ORDERS_SYNC_DEFAULTS = {
+    'total_sellers': 0,
+    'processed_sellers': 0,
+    'total_orders': 0,
+    'processed_orders': 0,
+    'unchanged_orders': 0,
+    'current_seller': '',
+    'current_page': 0,
+    'total_pages': 0,
+    'percentage': 0,
+}
+
+FIX_DATES_DEFAULTS = {
+    'total': 0,
+    'processed': 0,
+    'success': 0,
+    'errors': 0,
+    'percentage': 0,
+}
+
+
+def start_progress(job, scope='', data=None, run_id=None):
+    """Create the JobProgress row of a new run."""
+    row = JobProgress(job=job, scope=scope or '', data=data or {})
+    if run_id:
+        row.run_id = run_id
+    row.save()
+    return row
+
+
+class ProgressReporter:
+    """Rate-limited progress of one job run.
+
+    Any thread may ``update()``; like SyncLogWriter only the thread that
+    created the reporter writes, picking up other threads' changes on its
+    next update, so the job keeps a single database writer. Used as a
+    context manager, a run left unfinished by an exception is marked
+    complete with the error, so pages following it stop waiting.
+    """
+
+    def __init__(self, job, scope='', data=None, run_id=None, min_interval=PROGRESS_MIN_INTERVAL):
+        # A page that queued the job follows ``run_id`` before the row exists
+        row = JobProgress.objects.filter(run_id=run_id, job=job).first() if run_id else None
+        if row is None:
+            row = start_progress(job, scope, data, run_id)
+        self.row = row
+        self.data = {**(data or {}), **row.data}
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+        self._owner = threading.get_ident()
+        self._saved_at = None
+        self.finished = False
+        self.save()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None and not self.finished:
+            self.finish(error=str(exc) or exc_type.__name__)
+        return False
+
+    @property
+    def run_id(self):
+        return self.row.run_id
+
+    def update(self, **changes):
+        """Merge ``changes`` and write them if the last write is old enough."""
+        with self._lock:
+            self.data.update(changes)
+        if (threading.get_ident() == self._owner
+                and time.monotonic() - self._saved_at >= self.min_interval):
+            self.save()
+
+    def save(self, is_complete=False):
+        """Write the current counters now."""
+        with self._lock:
+            data = dict(self.data)
+        # A single UPDATE of the whole document, so readers never see a
+        # half-written state
+        JobProgress.objects.filter(pk=self.row.pk).update(
+            data=data, is_complete=is_complete, updated_at=timezone.now())
+        self._saved_at = time.monotonic()
+
+    def finish(self, **changes):
+        """Merge ``changes`` and mark the run complete."""
+        with self._lock:
+            self.data.update(changes)
+        self.save(is_complete=True)
+        self.finished = True
+
+
+def read_progress(job, defaults, run_id=None):
+    """Progress dict of run ``run_id`` of ``job``, or of its latest run.
+
+    A run that hasn't started yet (still queued) reads as ``defaults``.
+    """
+    runs = JobProgress.objects.filter(job=job)
+    row = runs.filter(run_id=run_id).first() if run_id else runs.first()
+    progress = dict(defaults)
+    if row is None:
+        progress.update(run_id=run_id, is_complete=False)
+        return progress
+    progress.update(row.data)
+    progress.update(run_id=str(row.run_id), scope=row.scope, is_complete=row.is_complete)
+    return progress
@@ -0,0 +1,120 @@
+"""
+Adaptive token-bucket rate limiting for the Omniful API.
+
+One limiter exists per endpoint family (sellers, orders, bills) and is shared
+by every thread of the process through the OmnifulClient. The rate creeps up
+while responses are healthy and is halved whenever the API throttles us
+(additive increase, multiplicative decrease), never exceeding the family's
+configured ceiling.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+
+from django.utils import timezone
+
+
+THROTTLE_STATUSES = {429, 503}
+
+
+def endpoint_family(path):
+    """Rate-limit family of an API path."""
+    path = path.split('?', 1)[0]
+    if '/orders' in path:
+        return 'orders'
+    if '/bills' in path:
+        return 'bills'
+    if '/sellers' in path:
+        return 'sellers'
+    return 'default'
+
+
+def parse_retry_after(value):
+    """Seconds to wait from a Retry-After header (delta or HTTP date)."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, (parsedate_to_datetime(value) - timezone.now()).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+class AdaptiveRateLimiter:
+    """Thread-safe token bucket whose refill rate adapts to the API."""
+
+    def __init__(self, ceiling, floor=0.5, increase=0.25, burst=None):
+        self.ceiling = float(ceiling)
+        self.floor = min(float(floor), self.ceiling)
+        self.increase = increase
+        # Start half way and earn the rest with healthy responses
+        self.rate = max(self.floor, self.ceiling / 2)
+        self.capacity = burst or max(1.0, self.ceiling)
+        self._tokens = 1.0
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self):
+        """Block until a request may be sent."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                wait = self._blocked_until - now
+                if wait <= 0:
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        return
+                    wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def on_success(self):
+        with self._lock:
+            self.rate = min(self.ceiling, self.rate + self.increase)
+
+    def on_throttle(self, retry_after=None):
+        """Halve the rate and honour the server's Retry-After, if any."""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.rate = max(self.floor, self.rate / 2)
+            self._tokens = 0.0
+            if retry_after:
+                self._blocked_until = max(self._blocked_until, now + retry_after)
+
+    def set_ceiling(self, ceiling):
+        with self._lock:
+            self.ceiling = float(ceiling)
+            self.floor = min(self.floor, self.ceiling)
+            self.rate = min(self.rate, self.ceiling)
+            self.capacity = max(1.0, self.ceiling)
+
+    @contextmanager
+    def capped(self, ceiling):
+        """Use ``ceiling`` (if given) until the block exits, then restore the limits.
+
+        The limiter is shared by the whole process, so a run's override must
+        not outlive the run.
+        """
+        if not ceiling:
+            yield self
+            return
+        with self._lock:
+            saved = self.ceiling, self.floor, self.capacity
+        self.set_ceiling(ceiling)
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self.ceiling, self.floor, self.capacity = saved
+                self.rate = min(self.rate, self.ceiling)
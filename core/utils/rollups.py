@@ -0,0 +1,162 @@
+"""
+Daily order rollups.
+
+DailyOrderRollup holds order counts and sums per Asia/Riyadh day, seller
+and dashboard dimension, so range dashboards read a few rows per day
+instead of every order. A bucket is always recomputed whole from the
+orders table, never adjusted by deltas, so recomputing is idempotent:
+``refresh_rollups()`` does it for the seller days an ingested batch
+touched and ``rebuild_rollups()`` for whole date ranges.
+
+Refreshes of one bucket are serialized (on PostgreSQL with a per-bucket
+advisory lock held to the end of the transaction), so a refresh always
+computes from the orders a concurrent writer committed before it and two
+writers, e.g. an order sync and the event drain, can't leave a stale copy.
+"""
+
+import hashlib
+import threading
+from datetime import datetime, time, timedelta
+from zoneinfo import ZoneInfo
+
+from django.db import connection, transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from core.models import DailyOrderRollup, Order
+
+
+ROLLUP_TZ = ZoneInfo('Asia/Riyadh')
+
+DIMENSIONS = ['order_type', 'status_code', 'payment_mode', 'delay_category', 'shipping_city']
+METRICS = ['orders', 'delayed_orders', 'total', 'delivered_orders', 'days_to_deliver']
+
+# Seller days recomputed per query by refresh_rollups()
+REFRESH_CHUNK = 200
+
+# Days recomputed per transaction by rebuild_rollups()
+REBUILD_WINDOW_DAYS = 31
+
+
+def rollup_day(moment):
+    """The Asia/Riyadh day an order created at ``moment`` is counted on."""
+    return timezone.localtime(moment, ROLLUP_TZ).date()
+
+
+def day_start(day):
+    return datetime.combine(day, time.min, tzinfo=ROLLUP_TZ)
+
+
+def _compute(orders):
+    """Unsaved rollup rows of the ``orders`` queryset."""
+    rows = (orders.order_by()
+            .annotate(day=TruncDate('order_created_at', tzinfo=ROLLUP_TZ))
+            .values('day', 'seller_id', *DIMENSIONS)
+            .annotate(n=Count('pk'),
+                      n_delayed=Count('pk', filter=Q(is_delayed=True)),
+                      total_sum=Sum('total'),
+                      n_delivered=Count('days_to_deliver'),
+                      days_sum=Sum('days_to_deliver')))
+    return [
+        DailyOrderRollup(
+            day=row['day'], seller_id=row['seller_id'],
+            **{dimension: row[dimension] or '' for dimension in DIMENSIONS},
+            orders=row['n'], delayed_orders=row['n_delayed'], total=row['total_sum'] or 0,
+            delivered_orders=row['n_delivered'], days_to_deliver=row['days_sum'] or 0)
+        for row in rows
+    ]
+
+
+def _lock_buckets(pairs):
+    """Lock the (seller_id, day) buckets ``pairs`` until the transaction ends.
+
+    SQLite runs one write transaction at a time, so only PostgreSQL needs
+    the locks. They are taken in key order so two refreshes can't deadlock.
+    """
+    if connection.vendor != 'postgresql':
+        return
+    keys = sorted({
+        int.from_bytes(hashlib.sha256(f'rollup:{seller_id}:{day}'.encode('utf-8')).digest()[:8],
+                       'big', signed=True)
+        for seller_id, day in pairs})
+    with connection.cursor() as cursor:
+        for key in keys:
+            cursor.execute('SELECT pg_advisory_xact_lock(%s)', [key])
+
+
+def _replace(stale, orders):
+    """Delete the ``stale`` rollups and write the ones computed from ``orders``."""
+    rollups = _compute(orders)
+    stale.delete()
+    DailyOrderRollup.objects.bulk_create(
+        rollups, batch_size=1000, update_conflicts=True,
+        unique_fields=['day', 'seller', *DIMENSIONS], update_fields=METRICS)
+    return len(rollups)
+
+
+def refresh_rollups(seller_days):
+    """Recompute the buckets of ``seller_days``, an iterable of (seller_id, day).
+
+    Returns the number of rollup rows written.
+    """
+    pairs = sorted(set(seller_days))
+    written = 0
+    for i in range(0, len(pairs), REFRESH_CHUNK):
+        chunk = pairs[i:i + REFRESH_CHUNK]
+        stale, orders = Q(), Q()
+        for seller_id, day in chunk:
+            start = day_start(day)
+            stale |= Q(seller_id=seller_id, day=day)
+            orders |= Q(seller_id=seller_id, order_created_at__gte=start,
+                        order_created_at__lt=start + timedelta(days=1))
+        with transaction.atomic():
+            _lock_buckets(chunk)
+            written += _replace(DailyOrderRollup.objects.filter(stale), Order.objects.filter(orders))
+    return written
+
+
+_pending = threading.local()
+
+
+def refresh_on_commit(seller_days):
+    """Recompute the buckets of ``seller_days`` after the current transaction.
+
+    The buckets of every call in one transaction are refreshed together by
+    the first callback to run; the rest find nothing left to do.
+    """
+    if not hasattr(_pending, 'seller_days'):
+        _pending.seller_days = set()
+    _pending.seller_days.update(seller_days)
+    transaction.on_commit(_refresh_pending)
+
+
+def _refresh_pending():
+    seller_days, _pending.seller_days = _pending.seller_days, set()
+    if seller_days:
+        refresh_rollups(seller_days)
+
+
+def rebuild_rollups(date_from, date_to, seller_ids=None, log=None):
+    """Recompute every bucket from ``date_from`` to ``date_to`` inclusive.
+
+    Runs one transaction per REBUILD_WINDOW_DAYS days. Returns the number
+    of rollup rows written.
+    """
+    written = 0
+    window_from = date_from
+    while window_from <= date_to:
+        window_to = min(date_to, window_from + timedelta(days=REBUILD_WINDOW_DAYS - 1))
+        stale = DailyOrderRollup.objects.filter(day__gte=window_from, day__lte=window_to)
+        orders = Order.objects.filter(order_created_at__gte=day_start(window_from),
+                                      order_created_at__lt=day_start(window_to + timedelta(days=1)))
+        if seller_ids is not None:
+            stale = stale.filter(seller_id__in=seller_ids)
+            orders = orders.filter(seller_id__in=seller_ids)
+        with transaction.atomic():
+            rows = _replace(stale, orders)
+        written += rows
+        if log and rows:
+            log(f'{window_from} to {window_to}: {rows} rollup rows')
+        window_from = window_to + timedelta(days=1)
+    return written
@@ -0,0 +1,105 @@
+"""
+Per-seller order sync scheduling by order velocity.
+
+Each seller is polled about every ``ORDER_SYNC_TARGET_ORDERS`` new orders:
+busy sellers every few minutes, quiet ones up to once a day. When the
+resulting request rate would exceed ``ORDER_SYNC_REQUEST_BUDGET`` all
+intervals are stretched by the same factor.
+"""
+
+import math
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from core.models import Order, Seller, SellerSyncSchedule
+
+
+# Orders per page requested by sync_orders
+ORDERS_PER_PAGE = 100
+
+
+def order_rates(now=None):
+    """Orders per hour of each seller over the last ORDER_SYNC_VELOCITY_HOURS."""
+    hours = settings.ORDER_SYNC_VELOCITY_HOURS
+    since = (now or timezone.now()) - timedelta(hours=hours)
+    counts = (Order.objects.filter(order_created_at__gte=since)
+              .values_list('seller').annotate(n=Count('pk')))
+    return {seller_id: n / hours for seller_id, n in counts}
+
+
+def velocity_interval(rate):
+    """Minutes between syncs of a seller receiving ``rate`` orders per hour."""
+    low, high = settings.ORDER_SYNC_MIN_INTERVAL, settings.ORDER_SYNC_MAX_INTERVAL
+    if rate <= 0:
+        return high
+    return int(min(high, max(low, 60 * settings.ORDER_SYNC_TARGET_ORDERS / rate)))
+
+
+def fit_budget(intervals, rates):
+    """Stretch ``intervals`` (seller -> minutes) to fit the hourly request budget.
+
+    A sync costs one request plus one per page of new orders; only the
+    per-sync request depends on the interval.
+    """
+    budget = settings.ORDER_SYNC_REQUEST_BUDGET
+    page_requests = sum(rate / ORDERS_PER_PAGE for rate in rates.values())
+    poll_requests = sum(60 / minutes for minutes in intervals.values())
+    available = max(budget - page_requests, 1)
+    if poll_requests <= available:
+        return intervals
+    factor = poll_requests / available
+    high = settings.ORDER_SYNC_MAX_INTERVAL
+    return {seller: min(high, math.ceil(minutes * factor)) for seller, minutes in intervals.items()}
+
+
+def plan_schedules(now=None):
+    """Recompute every active seller's interval and next sync time."""
+    now = now or timezone.now()
+    sellers = list(Seller.objects.filter(is_active=True).exclude(code__isnull=True).exclude(code='')
+                   .values_list('pk', flat=True))
+    SellerSyncSchedule.objects.bulk_create(
+        [SellerSyncSchedule(seller_id=pk) for pk in sellers], ignore_conflicts=True)
+
+    rates = order_rates(now)
+    rates = {pk: rates.get(pk, 0) for pk in sellers}
+    intervals = fit_budget({pk: velocity_interval(rate) for pk, rate in rates.items()}, rates)
+
+    schedules = list(SellerSyncSchedule.objects.filter(seller_id__in=sellers))
+    for schedule in schedules:
+        schedule.orders_per_hour = round(rates[schedule.seller_id], 3)
+        schedule.interval_minutes = intervals[schedule.seller_id]
+        if schedule.last_synced_at is None:
+            schedule.next_sync_at = now
+        else:
+            schedule.next_sync_at = schedule.last_synced_at + timedelta(minutes=schedule.interval_minutes)
+    SellerSyncSchedule.objects.bulk_update(
+        schedules, ['orders_per_hour', 'interval_minutes', 'next_sync_at'], batch_size=500)
+    return schedules
+
+
+def due_sellers(now=None):
+    """Active sellers to sync now: forced ones first, then the most overdue."""
+    now = now or timezone.now()
+    return list(Seller.objects
+                .filter(is_active=True, sync_schedule__isnull=False)
+                .filter(Q(sync_schedule__force=True) | Q(sync_schedule__next_sync_at__lte=now))
+                .select_related('sync_schedule')
+                .order_by('-sync_schedule__force', 'sync_schedule__next_sync_at'))
+
+
+def mark_synced(seller, started_at):
+    """Record a finished sync of ``seller`` that began at ``started_at``."""
+    schedule, _ = SellerSyncSchedule.objects.get_or_create(seller=seller)
+    schedule.last_synced_at = started_at
+    schedule.next_sync_at = started_at + timedelta(minutes=schedule.interval_minutes)
+    schedule.force = False
+    schedule.save(update_fields=['last_synced_at', 'next_sync_at', 'force'])
+
+
+def force_sync(seller):
+    """Make ``seller`` due on the next scheduled order sync."""
+    SellerSyncSchedule.objects.update_or_create(
+        seller=seller, defaults={'force': True, 'next_sync_at': timezone.now()})
@@ -0,0 +1,166 @@
+"""
+In-memory catalog of sellers shared by the seller, order and bill syncs.
+
+``SellerCatalog`` indexes every Seller row by code, guid and name from a
+single query and bulk-upserts API payloads into it. ``get_catalog`` only
+re-downloads ``/tenants/sellers`` when the last seller sync is older than
+``SELLER_CATALOG_TTL`` minutes.
+"""
+
+from datetime import timedelta
+
+import requests
+from django.conf import settings
+from django.db import transaction
+from django.utils.timezone import now
+
+from core.models import Seller, SyncStatus
+from core.utils.dashboard_cache import record_changes
+from core.utils.dates import parse_omniful_datetime
+from core.utils.sync_utils import payload_hash, update_last_sync
+
+
+# Seller columns written from the API payload
+SELLER_FIELDS = ['guid', 'name', 'phone', 'email', 'is_active',
+                 'created_at_api', 'updated_at_api', 'address', 'payload_hash']
+
+
+def seller_fields(seller_data):
+    """Map an Omniful seller payload to Seller field values."""
+    return {
+        'guid': seller_data.get('guid'),
+        'name': seller_data.get('name', ''),
+        'phone': seller_data.get('phone', ''),
+        'email': seller_data.get('email', ''),
+        'is_active': seller_data.get('is_active', True),
+        'created_at_api': parse_omniful_datetime(seller_data.get('created_at')),
+        'updated_at_api': parse_omniful_datetime(seller_data.get('updated_at')),
+        'address': seller_data.get('address', {}),
+        'payload_hash': payload_hash(seller_data),
+    }
+
+
+class SellerCatalog:
+    """Sellers indexed by code, guid and name."""
+
+    def __init__(self, sellers):
+        self.sellers = []
+        self.by_code = {}
+        self.by_guid = {}
+        self.by_name = {}
+        for seller in sellers:
+            self.sellers.append(seller)
+            self._index(seller)
+
+    @classmethod
+    def load(cls):
+        """Build the catalog from the database with one query."""
+        return cls(Seller.objects.all())
+
+    def __iter__(self):
+        return iter(self.sellers)
+
+    def __len__(self):
+        return len(self.sellers)
+
+    def _index(self, seller):
+        if seller.code:
+            self.by_code[seller.code] = seller
+        if seller.guid:
+            self.by_guid[seller.guid] = seller
+        if seller.name:
+            self.by_name[seller.name] = seller
+
+    def get(self, code=None, guid=None, name=None):
+        """Return the seller matching guid, code or name (in that order), or None."""
+        return (self.by_guid.get(guid) or self.by_code.get(code)
+                or self.by_name.get(name))
+
+    def active(self):
+        return [seller for seller in self.sellers if seller.is_active]
+
+    def upsert(self, sellers_data):
+        """Write API seller payloads in bulk, skipping unchanged ones.
+
+        Sellers are matched by code, then guid. Payloads without both are
+        ignored. Returns ``(created, updated, unchanged)``: the created and
+        updated Seller objects and the number of unchanged payloads.
+        """
+        created, updated = [], []
+        unchanged = 0
+        for seller_data in sellers_data:
+            code, guid = seller_data.get('code'), seller_data.get('guid')
+            if not code or not guid:
+                continue
+
+            fields = seller_fields(seller_data)
+            seller = self.by_code.get(code) or self.by_guid.get(guid)
+            if seller is None:
+                seller = Seller(code=code, **fields)
+                created.append(seller)
+                self.sellers.append(seller)
+            elif seller.payload_hash == fields['payload_hash']:
+                unchanged += 1
+                continue
+            else:
+                for field, value in fields.items():
+                    setattr(seller, field, value)
+                seller.updated_at_local = now()
+                # A payload repeated within one batch just refreshes the
+                # pending object
+                if seller.pk and seller not in updated:
+                    updated.append(seller)
+            self._index(seller)
+
+        with transaction.atomic():
+            Seller.objects.bulk_create(created)
+            Seller.objects.bulk_update(updated, SELLER_FIELDS + ['code', 'updated_at_local'])
+        record_changes(len(created) + len(updated))
+        return created, updated, unchanged
+
+
+def fetch_api_sellers(client, log=None):
+    """Page through /tenants/sellers and return every seller payload."""
+    sellers_data = []
+    page = 1
+    while True:
+        if log:
+            log(f'🌐 Fetching sellers from page {page}')
+        data = client.get_json('/tenants/sellers', params={'page': page, 'per_page': 100})
+        page_data = data.get('data', [])
+        if not page_data:
+            break
+        sellers_data.extend(page_data)
+
+        meta = data.get('meta', {})
+        if meta.get('current_page', page) >= meta.get('last_page', page + 1):
+            break
+        page += 1
+    return sellers_data
+
+
+def get_catalog(client, log=None, max_age=None):
+    """Return the seller catalog, refreshed from the API when it is stale.
+
+    The catalog counts as fresh for ``max_age`` (default SELLER_CATALOG_TTL
+    minutes) after the last seller sync. If the refresh fails the local
+    sellers are used as they are.
+    """
+    catalog = SellerCatalog.load()
+    max_age = timedelta(minutes=settings.SELLER_CATALOG_TTL) if max_age is None else max_age
+    last_synced = (SyncStatus.objects.filter(key='sellers')
+                   .values_list('last_synced_at', flat=True).first())
+    if last_synced and now() - last_synced < max_age:
+        return catalog
+
+    try:
+        created, updated, _ = catalog.upsert(fetch_api_sellers(client, log))
+    except requests.RequestException as e:
+        if log:
+            log(f'❌ Failed to refresh sellers, using {len(catalog)} stored sellers: {str(e)}')
+        return catalog
+
+    update_last_sync('sellers')
+    if log:
+        log(f'🔄 Seller catalog refreshed: {len(created)} created, {len(updated)} updated')
+    return catalog
@@ -0,0 +1,109 @@
+"""
+Incremental, chunked storage of sync command logs.
+
+Each command run gets a SyncLog row (one ``run_id``) and its lines are
+flushed to SyncLogChunk rows in bounded batches as the run progresses, so
+neither the command nor the pages showing the last run ever hold the whole
+log in memory.
+"""
+
+import logging
+import threading
+import traceback
+
+from django.utils import timezone
+
+from core.models import SyncLog, SyncLogChunk
+
+
+# A chunk is flushed once it holds this many lines or characters
+CHUNK_LINES = 200
+CHUNK_CHARS = 64 * 1024
+
+LEVELS = {
+    'debug': logging.DEBUG,
+    'info': logging.INFO,
+    'warning': logging.WARNING,
+    'error': logging.ERROR,
+}
+
+
+class SyncLogWriter:
+    """Callable logger for one sync run: ``log(msg, level=logging.INFO)``.
+
+    Lines go to ``stdout`` immediately and to the database in chunks.
+    Other threads may log too; their lines are buffered and written by the
+    thread that created the writer, so only one thread ever writes. Used
+    as a context manager, a run left unfinished by an exception is
+    finished as failed, so the pages following it stop waiting.
+    """
+
+    def __init__(self, key, stdout=None):
+        self.run = SyncLog.objects.create(key=key, status=SyncLog.RUNNING)
+        self.stdout = stdout
+        self._lock = threading.Lock()
+        self._owner = threading.get_ident()
+        self._buffer = []
+        self._buffer_chars = 0
+        self._seq = 0
+        self.finished = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None and not self.finished:
+            self(''.join(traceback.format_exception(exc_type, exc, tb)), logging.ERROR)
+            self.finish(f"🔥 Sync failed: {exc}", SyncLog.FAILED)
+        return False
+
+    @property
+    def run_id(self):
+        return self.run.run_id
+
+    def __call__(self, msg, level=logging.INFO):
+        if self.stdout is not None:
+            with self._lock:
+                self.stdout.write(msg + "\n")
+                self.stdout.flush()
+        with self._lock:
+            self._buffer.append([level, msg])
+            self._buffer_chars += len(msg)
+            full = len(self._buffer) >= CHUNK_LINES or self._buffer_chars >= CHUNK_CHARS
+        if full and threading.get_ident() == self._owner:
+            self.flush()
+
+    def flush(self):
+        """Write buffered lines as one SyncLogChunk."""
+        with self._lock:
+            lines, self._buffer, self._buffer_chars = self._buffer, [], 0
+        if not lines:
+            return
+        self._seq += 1
+        SyncLogChunk.objects.create(
+            log=self.run, seq=self._seq,
+            max_level=max(level for level, _ in lines), lines=lines)
+        self.run.line_count += len(lines)
+
+    def finish(self, summary, status=SyncLog.SUCCESS):
+        """Flush the remaining lines and store the run summary."""
+        self.flush()
+        self.run.content = summary
+        self.run.status = status
+        self.run.finished_at = timezone.now()
+        self.run.save(update_fields=['content', 'status', 'line_count', 'finished_at'])
+        self.finished = True
+
+
+def iter_log_lines(run, min_level=logging.DEBUG):
+    """Yield ``(level, message)`` for the lines of ``run`` at ``min_level`` or above."""
+    chunks = run.chunks.filter(max_level__gte=min_level).only('lines').iterator(chunk_size=20)
+    for chunk in chunks:
+        for level, msg in chunk.lines:
+            if level >= min_level:
+                yield level, msg
+
+
+def latest_run(key):
+    """Most recent SyncLog of ``key`` without its chunks, or None."""
+    return SyncLog.objects.filter(key=key).order_by('-created_at').first()
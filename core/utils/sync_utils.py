@@ -1,5 +1,21 @@
+import hashlib
+import json
+from datetime import timedelta
 from django.utils.timezone import now
 from core.models import SyncStatus
+from core.utils.dates import parse_omniful_datetime
+
+
+# Orders updated shortly before the stored watermark are re-read on the next
+# incremental run so that clock skew between us and Omniful can't drop them.
+WATERMARK_OVERLAP = timedelta(minutes=30)
+
+
+def payload_hash(payload) -> str:
+    """Compact, key-order independent hash of an API payload."""
+    normalized = json.dumps(payload, sort_keys=True, separators=(',', ':'),
+                            ensure_ascii=False, default=str)
+    return hashlib.blake2b(normalized.encode('utf-8'), digest_size=16).hexdigest()
 
 
 def update_last_sync(key: str):
@@ -7,3 +23,56 @@ def update_last_sync(key: str):
         key=key,
         defaults={"last_synced_at": now()}
     )
+
+
+def order_watermark_key(seller_code: str) -> str:
+    """SyncStatus key holding the order high-water mark for a seller."""
+    return f"orders:{seller_code}"
+
+
+def get_watermark(key: str):
+    """Return the stored high-water mark for ``key`` or None."""
+    status = SyncStatus.objects.filter(key=key).first()
+    return status.last_synced_at if status else None
+
+
+def advance_watermark(key: str, value):
+    """Move the high-water mark for ``key`` forward to ``value``.
+
+    The watermark never moves backwards, so a run that only saw old orders
+    can't undo the progress made by an earlier one.
+    """
+    if value is None:
+        return
+    current = get_watermark(key)
+    if current is None or value > current:
+        SyncStatus.objects.update_or_create(
+            key=key,
+            defaults={"last_synced_at": value}
+        )
+
+
+def order_activity_at(order_data: dict):
+    """Latest API timestamp of an order payload (update, else creation)."""
+    for field in ('updated_at', 'order_created_at'):
+        value = parse_omniful_datetime(order_data.get(field))
+        if value:
+            return value
+    return None
+
+
+def page_behind_watermark(orders: list, watermark) -> bool:
+    """True when every order on the page is older than the watermark.
+
+    Orders without a usable timestamp count as new, so paging continues
+    rather than silently skipping them.
+    """
+    if watermark is None or not orders:
+        return False
+    cutoff = watermark - WATERMARK_OVERLAP
+    for order_data in orders:
+        activity = order_activity_at(order_data)
+        if activity is None or activity > cutoff:
+            return False
+    return True
+
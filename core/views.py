@@ -13,7 +13,6 @@ from django.db.models import Count, Sum, Q, Avg, Max, Min, F, ExpressionWrapper,
 from django.utils import timezone
 from django.http import JsonResponse
 from django.views.decorators.http import require_POST
-from django.core.management import call_command
 from datetime import datetime, timedelta
 import requests
 import json
@@ -29,41 +28,97 @@ from django.utils.html import format_html
 from django.utils.translation import gettext_lazy as _
 from django.shortcuts import redirect, render
 from django.views.decorators.csrf import csrf_exempt
-from django.http import JsonResponse, StreamingHttpResponse
+from django.http import Http404, JsonResponse, StreamingHttpResponse
+from django.urls import reverse
 import subprocess
 from django.http import StreamingHttpResponse
 from django.utils.decorators import method_decorator
 import threading
-from .models import SyncLog
+from .models import Job, SellerSyncSchedule, SyncLog
+from core.utils.sync_log import LEVELS as LOG_LEVELS, iter_log_lines, latest_run
+from core.utils.live_updates import (
+    SharedReader, log_events, log_updates, parse_last_event_id, progress_events)
+from core.utils.progress import FIX_DATES_DEFAULTS, ORDERS_SYNC_DEFAULTS, read_progress
+from core.utils.jobs import enqueue
+from core.utils import dashboard_cache
+from core.utils.kpis import order_kpis, stale_order_q
+from core.utils.order_events import (
+    SIGNATURE_HEADER, TIMESTAMP_HEADER, parse_events, store_events, verify_signature)
+from core.utils.scheduling import force_sync
+from functools import lru_cache
+import uuid
 import logging
-from django.db.models.functions import Lower, Trim
 logger = logging.getLogger(__name__)
 
 
-@login_required
-def dashboard(request):
-    """Main dashboard view with key metrics and recent activity."""
-    # Get counts for dashboard cards
-    total_sellers = Seller.objects.count()
-    total_bills = VendorBill.objects.count()
-    total_orders = Order.objects.count()
+# GET parameters filtering the order dashboards
+ORDER_FILTERS = ['seller', 'type', 'date_from', 'date_to', 'status', 'payment_mode']
 
-    # Recent activity
-    recent_sellers = Seller.objects.order_by('-created_at_api')[:5]
-    recent_bills = VendorBill.objects.select_related(
-        'seller').order_by('-created_at_api')[:5]
-    recent_orders = Order.objects.select_related(
-        'seller').order_by('-order_created_at')[:5]
 
-    context = {
-        'total_sellers': total_sellers,
-        'total_bills': total_bills,
-        'total_orders': total_orders,
-        'recent_sellers': recent_sellers,
-        'recent_bills': recent_bills,
-        'recent_orders': recent_orders,
+def _filter_params(request, names):
+    return {name: request.GET.get(name) for name in names}
+
+
+def _parse_day(value, end_of_day=False):
+    """Naive datetime of a ``YYYY-MM-DD`` filter value, or None."""
+    try:
+        day = datetime.strptime(value, '%Y-%m-%d')
+    except (TypeError, ValueError):
+        return None
+    return day.replace(hour=23, minute=59, second=59) if end_of_day else day
+
+
+def _filter_orders(orders, params):
+    """Apply the dashboard filters in ``params`` (see ORDER_FILTERS) to ``orders``."""
+    if params.get('seller'):
+        orders = orders.filter(seller__code=params['seller'])
+    if params.get('type'):
+        orders = orders.filter(order_type=params['type'])
+    date_from = _parse_day(params.get('date_from'))
+    if date_from:
+        orders = orders.filter(order_created_at__gte=date_from)
+    date_to = _parse_day(params.get('date_to'), end_of_day=True)
+    if date_to:
+        orders = orders.filter(order_created_at__lte=date_to)
+    if params.get('status'):
+        orders = orders.filter(status_code=params['status'])
+    if params.get('payment_mode'):
+        orders = orders.filter(payment_mode=params['payment_mode'])
+    return orders
+
+
+def _filter_context(params):
+    """Selected filter values for the dashboard forms."""
+    return {
+        'selected_seller': params.get('seller'),
+        'selected_type': params.get('type'),
+        'selected_status': params.get('status'),
+        'selected_payment': params.get('payment_mode'),
+        'date_from': _parse_day(params.get('date_from')) or params.get('date_from'),
+        'date_to': _parse_day(params.get('date_to'), end_of_day=True) or params.get('date_to'),
+    }
+
+
+@dashboard_cache.register('dashboard')
+def _dashboard_data(params):
+    return {
+        # Counts for dashboard cards
+        'total_sellers': Seller.objects.count(),
+        'total_bills': VendorBill.objects.count(),
+        'total_orders': Order.objects.count(),
+        # Recent activity
+        'recent_sellers': list(Seller.objects.order_by('-created_at_api')[:5]),
+        'recent_bills': list(VendorBill.objects.select_related(
+            'seller').order_by('-created_at_api')[:5]),
+        'recent_orders': list(Order.objects.select_related(
+            'seller').order_by('-order_created_at')[:5]),
     }
 
+
+@login_required
+def dashboard(request):
+    """Main dashboard view with key metrics and recent activity."""
+    context = dashboard_cache.cached_dashboard('dashboard', {})
     return render(request, 'core/dashboard.html', context)
 
 
@@ -122,51 +177,86 @@ def handler500(request):
     return render(request, 'errors/500.html', status=500)
 
 
-@login_required
-def omniful_sync(request):
-    """Omniful sync dashboard."""
-    sellers_count = Seller.objects.count()
-    bills_count = VendorBill.objects.count()
-    orders_count = Order.objects.count()
-    recent_sellers = Seller.objects.order_by('-created_at_api')[:5]
-    recent_bills = VendorBill.objects.select_related(
-        'seller').order_by('-created_at_api')[:10]
+def _job_queued_message(request, created, label):
+    if created:
+        messages.success(request, _('{} queued. It runs in the background.').format(label))
+    else:
+        messages.info(request, _('{} is already queued.').format(label))
 
-    # Add recent orders
-    recent_orders = Order.objects.select_related(
-        'seller').order_by('-order_created_at')[:5]
 
-    context = {
-        'sellers_count': sellers_count,
-        'bills_count': bills_count,
-        'orders_count': orders_count,
-        'recent_sellers': recent_sellers,
-        'recent_bills': recent_bills,
-        'recent_orders': recent_orders,
+def _job_status(job):
+    return {
+        'job_id': job.pk,
+        'job_type': job.job_type,
+        'status': job.status,
+        'completed': job.is_finished,
+        'created_at': job.created_at,
+        'started_at': job.started_at,
+        'finished_at': job.finished_at,
+        'result': job.result if job.is_finished else None,
     }
 
-    return render(request, 'core/omniful_sync.html', context)
-
 
 @login_required
+def job_status(request, job_id):
+    """Status and output of a queued job."""
+    job = get_object_or_404(Job, pk=job_id)
+    return JsonResponse(_job_status(job))
+
+
+@csrf_exempt
 @require_POST
-def sync_sellers(request):
-    """Sync sellers from Omniful API and capture logs."""
-    stdout = io.StringIO()
-    stderr = io.StringIO()
+def order_webhook(request):
+    """Receive signed Omniful order events into the OrderEvent inbox.
+
+    Only stores the events; a queued drain_order_events job applies them.
+    """
+    secret = settings.OMNIFUL_WEBHOOK_SECRET
+    if not secret:
+        raise Http404
+    if not verify_signature(secret, request.headers.get(TIMESTAMP_HEADER),
+                            request.headers.get(SIGNATURE_HEADER), request.body):
+        return JsonResponse({'error': 'Invalid signature'}, status=401)
 
     try:
-        call_command('sync_sellers', stdout=stdout, stderr=stderr)
-        output = stdout.getvalue()
-        messages.success(request, _('Sellers synced successfully.'))
+        events = parse_events(json.loads(request.body))
+    except ValueError as e:  # bad JSON or an InvalidEvent
+        return JsonResponse({'error': str(e)}, status=400)
+
+    accepted = store_events(events)
+    if accepted:
+        enqueue('drain_order_events')
+    return JsonResponse({'accepted': accepted, 'duplicates': len(events) - accepted}, status=202)
+
+
+@dashboard_cache.register('omniful_sync')
+def _omniful_sync_data(params):
+    return {
+        'sellers_count': Seller.objects.count(),
+        'bills_count': VendorBill.objects.count(),
+        'orders_count': Order.objects.count(),
+        'recent_sellers': list(Seller.objects.order_by('-created_at_api')[:5]),
+        'recent_bills': list(VendorBill.objects.select_related(
+            'seller').order_by('-created_at_api')[:10]),
+        'recent_orders': list(Order.objects.select_related(
+            'seller').order_by('-order_created_at')[:5]),
+    }
 
-        # Store the log in session
-        request.session['sync_logs'] = output
 
-    except Exception as e:
-        error_output = stderr.getvalue() + "\n" + str(e)
-        messages.error(request, _('Error syncing sellers: {}').format(str(e)))
-        request.session['sync_logs'] = error_output
+@login_required
+def omniful_sync(request):
+    """Omniful sync dashboard."""
+    context = dashboard_cache.cached_dashboard('omniful_sync', {})
+    return render(request, 'core/omniful_sync.html', context)
+
+
+@login_required
+@require_POST
+def sync_sellers(request):
+    """Queue a seller sync; its log shows on the sellers page."""
+    job, created = enqueue('sync_sellers', user=request.user)
+    _job_queued_message(request, created, _('Seller sync'))
+    return redirect('core:sellers_list')
 
 
 @login_required
@@ -178,39 +268,26 @@ def sellers_list(request):
     last_synced_at = SyncStatus.objects.filter(key='sellers').first()
     last_synced_at = last_synced_at.last_synced_at if last_synced_at else None
 
-    # Get latest log from SyncLog model
-    latest_log = SyncLog.objects.filter(key='sellers').first()
+    # Summary of the latest run; the full log is served by sync_log_lines
+    latest_log = latest_run('sellers')
 
     return render(request, 'core/sellers_list.html', {
         'sellers': sellers,
         'total_sellers': total_sellers,
         'last_synced_at': last_synced_at,
         'sync_logs': latest_log.content if latest_log else None,
+        'sync_log_run': latest_log,
     })
 
 
 @require_POST
 @login_required
 def sync_bills(request):
-    """Sync bills from Omniful API and capture logs in DB."""
-    stdout = io.StringIO()
-    stderr = io.StringIO()
-
-    try:
-        call_command('sync_bills', stdout=stdout, stderr=stderr)
-        output = stdout.getvalue()
-        messages.success(request, _('Vendor bills synced successfully.'))
-
-    except Exception as e:
-        error_output = stderr.getvalue() + '\n' + str(e)
-        messages.error(request, _(
-            'Error syncing vendor bills: {}').format(str(e)))
-        # Optional: also store error log to SyncLog if needed
-        SyncLog.objects.update_or_create(
-            key='vendor_bills',
-            defaults={'content': error_output}
-        )
-
+    """Queue a bill sync; its log shows on the bills page."""
+    job, created = enqueue('sync_bills', user=request.user)
+    if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+        return JsonResponse(_job_status(job))
+    _job_queued_message(request, created, _('Vendor bill sync'))
     return redirect('core:bills_list')
 
 
@@ -225,8 +302,8 @@ def bills_list(request):
     last_synced = SyncStatus.objects.filter(key='vendor_bills').first()
     last_synced_at = last_synced.last_synced_at if last_synced else None
 
-    # Get latest sync logs from SyncLog
-    sync_log = SyncLog.objects.filter(key='vendor_bills').first()
+    # Summary of the latest run; the full log is served by sync_log_lines
+    sync_log = latest_run('vendor_bills')
     sync_logs = sync_log.content if sync_log else None
 
     return render(request, 'core/bills_list.html', {
@@ -234,122 +311,32 @@ def bills_list(request):
         'total_bills': total_bills,
         'last_synced_at': last_synced_at,
         'sync_logs': sync_logs,
+        'sync_log_run': sync_log,
     })
 
 
 @login_required
 @require_POST
 def sync_orders(request):
-    """Sync orders from Omniful API and capture logs in DB."""
-    stdout = io.StringIO()
-    stderr = io.StringIO()
-
-    try:
-        call_command('sync_orders', stdout=stdout, stderr=stderr)
-        output = stdout.getvalue()
-        messages.success(request, _('Orders synced successfully.'))
-
-    except Exception as e:
-        error_output = stderr.getvalue() + "\n" + str(e)
-        messages.error(request, _('Error syncing orders: {}').format(str(e)))
-
-
-@login_required
-def orders_dashboard(request):
-    """Main orders KPI dashboard."""
-    # Last sync timestamp
-    last_synced_at = SyncStatus.objects.filter(key='orders').first()
-    last_synced_at = last_synced_at.last_synced_at if last_synced_at else None
+    """Queue an incremental order sync; its log shows on the orders dashboard."""
+    job, created = enqueue('sync_orders', user=request.user)
+    _job_queued_message(request, created, _('Order sync'))
+    return redirect('core:orders_dashboard')
 
-    # Latest log
-    latest_log = SyncLog.objects.filter(
-        key='orders').order_by('-created_at').first()
-    # Get filters
-    seller_code = request.GET.get('seller')
-    order_type = request.GET.get('type')  # B2B or B2C
-    date_from = request.GET.get('date_from')
-    date_to = request.GET.get('date_to')
-    status = request.GET.get('status')
-    payment_mode = request.GET.get('payment_mode')
-
-    # Base queryset
-    orders = Order.objects.all()
-    # Apply filters
-    if seller_code:
-        orders = orders.filter(seller__code=seller_code)
 
-    if order_type:
-        orders = orders.filter(order_type=order_type)
+@dashboard_cache.register('orders_dashboard')
+def _orders_dashboard_data(params):
+    orders = _filter_orders(Order.objects.all(), params)
 
-    if date_from:
-        try:
-            date_from = datetime.strptime(date_from, '%Y-%m-%d')
-            orders = orders.filter(order_created_at__gte=date_from)
-        except:
-            pass
+    # All tiles in one aggregation pass
+    now = timezone.now()
+    kpis = order_kpis(orders, now)
 
-    if date_to:
-        try:
-            date_to = datetime.strptime(date_to, '%Y-%m-%d')
-            date_to = date_to.replace(hour=23, minute=59, second=59)
-            orders = orders.filter(order_created_at__lte=date_to)
-        except:
-            pass
-
-    if status:
-        orders = orders.filter(status_code=status)
-
-    if payment_mode:
-        orders = orders.filter(payment_mode=payment_mode)
-
-    # Calculate KPIs
-    total_orders = orders.count()
-    b2b_orders = orders.filter(order_type='B2B').count()
-    b2c_orders = orders.filter(order_type='B2C').count()
-
-    # Status breakdown
-    status_counts = orders.values('status_code').annotate(count=Count('id'))
-
-    # Payment mode breakdown
-    payment_counts = orders.values('payment_mode').annotate(count=Count('id'))
-
-    # Delivery time metrics
-    avg_delivery_time = orders.exclude(days_to_deliver__isnull=True).aggregate(
-        avg=Avg('days_to_deliver'))['avg'] or 0
-
-    # Delay metrics
-    delayed_orders = orders.filter(is_delayed=True).count()
-    on_time_rate = (total_orders - delayed_orders) / \
-        total_orders * 100 if total_orders > 0 else 0
-
-    # Delay categories
-    green_orders = orders.filter(delay_category='green').count()
-    yellow_orders = orders.filter(delay_category='yellow').count()
-    red_orders = orders.filter(delay_category='red').count()
-
-    # red_orders rows
-    red_orders_qs = (
-        orders
-        .annotate(
-            status_clean=Trim(Lower(F('status_code')))
-        )
-        .filter(
-            order_created_at__gte=timezone.now() - timedelta(days=30),  # 🔄 within last 30 days
-            order_created_at__lt=timezone.now() - timedelta(days=10)    # ⬅️ older than 10 days
-        )
-        .exclude(
-            status_clean='delivered'
-        )
-        .order_by('-order_created_at')
-    )
-
-    red_orders_count = red_orders_qs.count()
-
-    # New orders delayed (>2 days)
-    new_orders_delayed = orders.filter(
-        status_code='new_order',
-        order_created_at__lt=timezone.now() - timedelta(days=2)
-    ).count()
+    # Undelivered orders 10-30 days old, as the table's columns only; the
+    # list is cached and can be long
+    red_orders_qs = (orders.filter(stale_order_q(now)).order_by('-order_created_at')
+                     .values('order_id', 'customer_first_name', 'customer_last_name',
+                             'order_created_at', 'status_code'))
 
     # Top regions
     top_regions = orders.values('shipping_city').annotate(
@@ -357,52 +344,74 @@ def orders_dashboard(request):
     ).order_by('-count')[:5]
 
     # Recent orders
-    recent_orders = orders.order_by('-order_created_at')[:10]
+    recent_orders = orders.select_related('seller').order_by('-order_created_at')[:10]
 
     # Get all sellers for filter dropdown
     sellers = Seller.objects.filter(is_active=True).order_by('name')
 
+    return {
+        **kpis.as_dict(),
+        'kpis': kpis,
+        'top_regions': list(top_regions),
+        'recent_orders': list(recent_orders),
+        'sellers': list(sellers),
+        'red_orders_qs': list(red_orders_qs),
+        'red_orders_count': kpis.stale_orders,
+    }
+
+
+@login_required
+def orders_dashboard(request):
+    """Main orders KPI dashboard."""
+    params = _filter_params(request, ORDER_FILTERS)
+
+    # Last sync timestamp
+    last_synced_at = SyncStatus.objects.filter(key='orders').first()
+    last_synced_at = last_synced_at.last_synced_at if last_synced_at else None
+
+    # Latest log summary
+    latest_log = latest_run('orders')
+
     context = {
-        'total_orders': total_orders,
-        'b2b_orders': b2b_orders,
-        'b2c_orders': b2c_orders,
-        'status_counts': status_counts,
-        'payment_counts': payment_counts,
-        'avg_delivery_time': round(avg_delivery_time, 1),
-        'delayed_orders': delayed_orders,
-        'on_time_rate': round(on_time_rate, 1),
-        'green_orders': green_orders,
-        'yellow_orders': yellow_orders,
-        'red_orders': red_orders,
-        'new_orders_delayed': new_orders_delayed,
-        'top_regions': top_regions,
-        'recent_orders': recent_orders,
-        'sellers': sellers,
-        'selected_seller': seller_code,
-        'selected_type': order_type,
-        'selected_status': status,
-        'selected_payment': payment_mode,
-        'date_from': date_from,
-        'date_to': date_to,
-        'red_orders_qs': red_orders_qs,
-        'red_orders_count': red_orders_count,
+        **dashboard_cache.cached_dashboard('orders_dashboard', params),
+        **_filter_context(params),
         'last_synced_at': last_synced_at,
         'sync_logs': latest_log.content if latest_log else None,
+        'sync_log_run': latest_log,
     }
 
     return render(request, 'core/orders_dashboard.html', context)
 
 
 @login_required
-def refresh_bill(request, bill_name):
-    """Refresh specific bill data."""
-    try:
-        call_command('refresh_bill', bill_name)
-        messages.success(request, _(
-            'Bill {} refreshed successfully.').format(bill_name))
-    except Exception as e:
-        messages.error(request, _('Error refreshing bill: {}').format(str(e)))
+def sync_log_lines(request, run_id):
+    """Full log of one sync run as plain text, streamed chunk by chunk.
+
+    ``?level=`` (debug, info, warning, error; default info) hides lines
+    below that level.
+    """
+    run = get_object_or_404(SyncLog, run_id=run_id)
+    min_level = LOG_LEVELS.get(request.GET.get('level', 'info'), LOG_LEVELS['info'])
+    lines = (msg + '\n' for _, msg in iter_log_lines(run, min_level))
+    return StreamingHttpResponse(lines, content_type='text/plain; charset=utf-8')
+
+
+@login_required
+@require_POST
+def force_seller_sync(request, code):
+    """Sync one seller's orders now instead of waiting for its schedule."""
+    seller = get_object_or_404(Seller, code=code)
+    force_sync(seller)
+    job, created = enqueue('sync_orders', user=request.user, scheduled=True)
+    _job_queued_message(request, created, _('Order sync for {}').format(seller.name))
+    return redirect('core:seller_orders', code=code)
+
 
+@login_required
+def refresh_bill(request, bill_name):
+    """Queue a refresh of specific bill data."""
+    job, created = enqueue('refresh_bill', bill_name, user=request.user)
+    _job_queued_message(request, created, _('Refresh of bill {}').format(bill_name))
     return redirect('core:omniful_sync')
 
 
@@ -434,26 +443,25 @@ def bill_detail(request, name):
 @login_required
 @require_POST
 def refresh_bill_ajax(request, name):
-    """Refresh bill data via AJAX."""
-    try:
-        call_command('refresh_bill', name)
-        return JsonResponse({'success': True, 'message': _('Bill refreshed successfully')})
-    except Exception as e:
-        return JsonResponse({'success': False, 'message': str(e)})
+    """Queue a bill refresh via AJAX; poll job_status for the outcome."""
+    job, created = enqueue('refresh_bill', name, user=request.user)
+    return JsonResponse({
+        'success': True,
+        'message': _('Bill refresh queued'),
+        **_job_status(job),
+    })
 
 
 @login_required
 @require_POST
 def update_bill_dates(request):
-    """Update bill dates from Omniful API."""
+    """Queue an update of bill dates from Omniful API."""
     try:
         limit = int(request.POST.get('limit', 50))
-        call_command('fix_bill_dates', limit=limit)
-        messages.success(request, _('Bill dates updated successfully.'))
-    except Exception as e:
-        messages.error(request, _(
-            'Error updating bill dates: {}').format(str(e)))
-
+    except ValueError:
+        limit = 50
+    job, created = enqueue('fix_bill_dates', user=request.user, limit=limit)
+    _job_queued_message(request, created, _('Bill date update'))
     return redirect('core:bills_list')
 
 
@@ -461,52 +469,47 @@ def update_bill_dates(request):
 def fix_all_dates(request):
     """Fix all bill dates with progress tracking."""
     if request.method == 'POST':
-        # Start the process in the background
-        import subprocess
-        import os
-        import sys
+        # The page follows this run id; the worker's run reports on it
+        job, created = enqueue('fix_all_dates', user=request.user, run_id=str(uuid.uuid4()))
 
-        python_executable = sys.executable
-        manage_py = os.path.join(os.getcwd(), 'manage.py')
+        _job_queued_message(request, created, _('Date fix'))
+        return redirect(f"{reverse('core:fix_dates_progress')}?run={job.options['run_id']}")
 
-        # Run the command in the background
-        subprocess.Popen(
-            [python_executable, manage_py, 'fix_all_dates'],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE
-        )
+    return render(request, 'core/fix_all_dates.html')
 
-        messages.success(request, _(
-            'Date fix process started. Please check the progress below.'))
-        return redirect('core:fix_dates_progress')
 
-    return render(request, 'core/fix_all_dates.html')
+# Progress pages by job: (JobProgress.job, counters shown before any report)
+PROGRESS_JOBS = {
+    'fix_dates': ('fix_all_dates', FIX_DATES_DEFAULTS),
+    'orders': ('sync_all_orders', ORDERS_SYNC_DEFAULTS),
+}
+
+
+def _run_id_param(request, name='run'):
+    """UUID query parameter ``name`` as a string, or None if missing or malformed."""
+    try:
+        return str(uuid.UUID(request.GET.get(name, '')))
+    except ValueError:
+        return None
+
+
+@lru_cache(maxsize=64)
+def _progress_reader(job, run_id=None):
+    """Shared per process so concurrent progress streams read a run once per tick."""
+    job_name, defaults = PROGRESS_JOBS[job]
+    return SharedReader(lambda: read_progress(job_name, defaults, run_id))
+
+
+def _read_job_progress(request, job):
+    job_name, defaults = PROGRESS_JOBS[job]
+    return read_progress(job_name, defaults, _run_id_param(request))
 
 
 @login_required
 def fix_dates_progress(request):
     """Show progress of date fixing process."""
-    import json
-    import os
-
-    progress = {
-        'total': 0,
-        'processed': 0,
-        'success': 0,
-        'errors': 0,
-        'percentage': 0
-    }
-
-    # Try to read progress file
-    try:
-        if os.path.exists('date_fix_progress.json'):
-            with open('date_fix_progress.json', 'r') as f:
-                progress = json.load(f)
-    except:
-        pass
-
     context = {
-        'progress': progress
+        'progress': _read_job_progress(request, 'fix_dates')
     }
 
     return render(request, 'core/fix_dates_progress.html', context)
@@ -515,103 +518,32 @@ def fix_dates_progress(request):
 @login_required
 def get_fix_progress(request):
     """AJAX endpoint to get progress data."""
-    import json
-    import os
-
-    progress = {
-        'total': 0,
-        'processed': 0,
-        'success': 0,
-        'errors': 0,
-        'percentage': 0,
-        'is_complete': False
-    }
-
-    # Try to read progress file
-    try:
-        if os.path.exists('date_fix_progress.json'):
-            with open('date_fix_progress.json', 'r') as f:
-                data = json.load(f)
-                progress.update(data)
-
-                # Check if process is complete
-                if data.get('processed', 0) >= data.get('total', 0) and data.get('total', 0) > 0:
-                    progress['is_complete'] = True
-    except:
-        pass
-
-    return JsonResponse(progress)
+    return JsonResponse(_read_job_progress(request, 'fix_dates'))
 
 
 @login_required
 @require_POST
 def sync_all_orders(request):
-    """Sync all orders from Omniful API with progress tracking."""
+    """Queue a full order sync with progress tracking."""
     seller_code = request.POST.get('seller_code')
+    options = {'seller_code': seller_code} if seller_code else {}
 
-    try:
-        # Start the process in the background
-        import subprocess
-        import os
-        import sys
-
-        python_executable = sys.executable
-        manage_py = os.path.join(os.getcwd(), 'manage.py')
-
-        # Build command arguments
-        cmd = [python_executable, manage_py, 'sync_all_orders']
-        if seller_code:
-            cmd.extend(['--seller_code', seller_code])
-
-        # Run the command in the background
-        subprocess.Popen(
-            cmd,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE
-        )
-
-        if seller_code:
-            messages.success(request, _(
-                'Full order sync started for seller {}. This may take some time.').format(seller_code))
-        else:
-            messages.success(request, _(
-                'Full order sync started for all sellers. This may take some time.'))
-
-        return redirect('core:orders_sync_progress')
-    except Exception as e:
-        messages.error(request, _(
-            'Error starting order sync: {}').format(str(e)))
-        return redirect('core:orders_dashboard')
+    # The page follows this run id; per-seller runs report independently
+    job, created = enqueue('sync_all_orders', user=request.user, run_id=str(uuid.uuid4()), **options)
+
+    if seller_code:
+        _job_queued_message(request, created, _('Full order sync for seller {}').format(seller_code))
+    else:
+        _job_queued_message(request, created, _('Full order sync for all sellers'))
+
+    return redirect(f"{reverse('core:orders_sync_progress')}?run={job.options['run_id']}")
 
 
 @login_required
 def orders_sync_progress(request):
     """Show progress of order syncing process."""
-    import json
-    import os
-
-    progress = {
-        'total_sellers': 0,
-        'processed_sellers': 0,
-        'total_orders': 0,
-        'processed_orders': 0,
-        'current_seller': '',
-        'current_page': 0,
-        'total_pages': 0,
-        'percentage': 0,
-        'is_complete': False
-    }
-
-    # Try to read progress file
-    try:
-        if os.path.exists('orders_sync_progress.json'):
-            with open('orders_sync_progress.json', 'r') as f:
-                progress = json.load(f)
-    except:
-        pass
-
     context = {
-        'progress': progress
+        'progress': _read_job_progress(request, 'orders')
     }
 
     return render(request, 'core/orders_sync_progress.html', context)
@@ -620,102 +552,57 @@ def orders_sync_progress(request):
 @login_required
 def get_orders_sync_progress(request):
     """AJAX endpoint to get order sync progress data."""
-    import json
-    import os
-
-    progress = {
-        'total_sellers': 0,
-        'processed_sellers': 0,
-        'total_orders': 0,
-        'processed_orders': 0,
-        'current_seller': '',
-        'current_page': 0,
-        'total_pages': 0,
-        'percentage': 0,
-        'is_complete': False
-    }
+    return JsonResponse(_read_job_progress(request, 'orders'))
 
-    # Try to read progress file
-    try:
-        if os.path.exists('orders_sync_progress.json'):
-            with open('orders_sync_progress.json', 'r') as f:
-                progress = json.load(f)
-    except:
-        pass
 
-    return JsonResponse(progress)
+def _sse_response(events):
+    response = StreamingHttpResponse(events, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Stop nginx from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
 
 
 @login_required
-def seller_orders(request, code):
-    """Orders dashboard for a specific seller."""
-    seller = get_object_or_404(Seller, code=code)
+def sync_progress_events(request, job):
+    """Server-Sent Events stream of a background job's progress."""
+    if job not in PROGRESS_JOBS:
+        raise Http404
+    return _sse_response(progress_events(_progress_reader(job, _run_id_param(request))))
 
-    # Get filters
-    order_type = request.GET.get('type')  # B2B or B2C
-    date_from = request.GET.get('date_from')
-    date_to = request.GET.get('date_to')
-    status = request.GET.get('status')
-    payment_mode = request.GET.get('payment_mode')
 
-    # Base queryset
-    orders = Order.objects.filter(seller=seller)
+@login_required
+def sync_log_events(request, key):
+    """Server-Sent Events stream of the log of the latest ``key`` sync run.
 
-    # Apply filters
-    if order_type:
-        orders = orders.filter(order_type=order_type)
+    Resumes after the Last-Event-ID EventSource sends on reconnect.
+    """
+    run_id, after_seq = parse_last_event_id(request.headers.get('Last-Event-ID'))
+    min_level = LOG_LEVELS.get(request.GET.get('level', 'info'), logging.INFO)
+    return _sse_response(log_events(
+        key, run_id or _run_id_param(request), after_seq, min_level,
+        skip_run=_run_id_param(request, 'skip_run')))
 
-    if date_from:
-        try:
-            date_from = datetime.strptime(date_from, '%Y-%m-%d')
-            orders = orders.filter(order_created_at__gte=date_from)
-        except:
-            pass
 
-    if date_to:
-        try:
-            date_to = datetime.strptime(date_to, '%Y-%m-%d')
-            date_to = date_to.replace(hour=23, minute=59, second=59)
-            orders = orders.filter(order_created_at__lte=date_to)
-        except:
-            pass
-
-    if status:
-        orders = orders.filter(status_code=status)
-
-    if payment_mode:
-        orders = orders.filter(payment_mode=payment_mode)
-
-    # Calculate KPIs
-    total_orders = orders.count()
-    b2b_orders = orders.filter(order_type='B2B').count()
-    b2c_orders = orders.filter(order_type='B2C').count()
-
-    # Status breakdown
-    status_counts = orders.values('status_code').annotate(count=Count('id'))
-
-    # Payment mode breakdown
-    payment_counts = orders.values('payment_mode').annotate(count=Count('id'))
-
-    # Delivery time metrics
-    avg_delivery_time = orders.exclude(days_to_deliver__isnull=True).aggregate(
-        avg=Avg('days_to_deliver'))['avg'] or 0
-
-    # Delay metrics
-    delayed_orders = orders.filter(is_delayed=True).count()
-    on_time_rate = (total_orders - delayed_orders) / \
-        total_orders * 100 if total_orders > 0 else 0
-
-    # Delay categories
-    green_orders = orders.filter(delay_category='green').count()
-    yellow_orders = orders.filter(delay_category='yellow').count()
-    red_orders = orders.filter(delay_category='red').count()
-
-    # New orders delayed (>2 days)
-    new_orders_delayed = orders.filter(
-        status_code='new_order',
-        order_created_at__lt=timezone.now() - timedelta(days=2)
-    ).count()
+@login_required
+def poll_sync_log(request, key):
+    """Polling fallback for sync_log_events: log lines after chunk ``?after=``."""
+    try:
+        after_seq = int(request.GET.get('after', 0))
+    except ValueError:
+        after_seq = 0
+    min_level = LOG_LEVELS.get(request.GET.get('level', 'info'), logging.INFO)
+    update = log_updates(key, _run_id_param(request), after_seq, min_level,
+                         skip_run=_run_id_param(request, 'skip_run'))
+    return JsonResponse(update or {'run_id': None})
+
+
+@dashboard_cache.register('seller_orders', warm=False)
+def _seller_orders_data(params):
+    orders = _filter_orders(Order.objects.filter(seller_id=params['seller_id']), params)
+
+    # All tiles in one aggregation pass
+    kpis = order_kpis(orders)
 
     # Top regions
     top_regions = orders.values('shipping_city').annotate(
@@ -725,27 +612,27 @@ def seller_orders(request, code):
     # Recent orders
     recent_orders = orders.order_by('-order_created_at')[:20]
 
+    return {
+        **kpis.as_dict(),
+        'kpis': kpis,
+        'top_regions': list(top_regions),
+        'recent_orders': list(recent_orders),
+    }
+
+
+@login_required
+def seller_orders(request, code):
+    """Orders dashboard for a specific seller."""
+    seller = get_object_or_404(Seller, code=code)
+    params = _filter_params(request, [name for name in ORDER_FILTERS if name != 'seller'])
+    params['seller_id'] = seller.pk
+
     context = {
         'seller': seller,
-        'total_orders': total_orders,
-        'b2b_orders': b2b_orders,
-        'b2c_orders': b2c_orders,
-        'status_counts': status_counts,
-        'payment_counts': payment_counts,
-        'avg_delivery_time': round(avg_delivery_time, 1),
-        'delayed_orders': delayed_orders,
-        'on_time_rate': round(on_time_rate, 1),
-        'green_orders': green_orders,
-        'yellow_orders': yellow_orders,
-        'red_orders': red_orders,
-        'new_orders_delayed': new_orders_delayed,
-        'top_regions': top_regions,
-        'recent_orders': recent_orders,
-        'selected_type': order_type,
-        'selected_status': status,
-        'selected_payment': payment_mode,
-        'date_from': date_from,
-        'date_to': date_to,
+        **dashboard_cache.cached_dashboard('seller_orders', params),
+        **_filter_context(params),
+        'sync_schedule': SellerSyncSchedule.objects.filter(seller=seller).first(),
+        'sync_log_run': latest_run('orders'),
     }
 
     return render(request, 'core/seller_orders.html', context)
@@ -754,7 +641,8 @@ def seller_orders(request, code):
 @login_required
 def order_detail(request, order_id):
     """Order detail view."""
-    order = get_object_or_404(Order, order_id=order_id)
+    # The raw payload lives in its own table and is only read here
+    order = get_object_or_404(Order.objects.select_related('seller', 'payload'), order_id=order_id)
 
     context = {
         'order': order,
@@ -764,39 +652,9 @@ def order_detail(request, order_id):
     return render(request, 'core/order_detail.html', context)
 
 
-@login_required
-def customer_orders(request):
-    """Customer orders analytics."""
-    # Get filters
-    seller_code = request.GET.get('seller')
-    order_type = request.GET.get('type')  # B2B or B2C
-    date_from = request.GET.get('date_from')
-    date_to = request.GET.get('date_to')
-
-    # Base queryset
-    orders = Order.objects.all()
-
-    # Apply filters
-    if seller_code:
-        orders = orders.filter(seller__code=seller_code)
-
-    if order_type:
-        orders = orders.filter(order_type=order_type)
-
-    if date_from:
-        try:
-            date_from = datetime.strptime(date_from, '%Y-%m-%d')
-            orders = orders.filter(order_created_at__gte=date_from)
-        except:
-            pass
-
-    if date_to:
-        try:
-            date_to = datetime.strptime(date_to, '%Y-%m-%d')
-            date_to = date_to.replace(hour=23, minute=59, second=59)
-            orders = orders.filter(order_created_at__lte=date_to)
-        except:
-            pass
+@dashboard_cache.register('customer_orders')
+def _customer_orders_data(params):
+    orders = _filter_orders(Order.objects.all(), params)
 
     # Customer metrics
     customer_metrics = orders.values(
@@ -811,21 +669,27 @@ def customer_orders(request):
     # Get all sellers for filter dropdown
     sellers = Seller.objects.filter(is_active=True).order_by('name')
 
+    return {
+        'customer_metrics': list(customer_metrics),
+        'sellers': list(sellers),
+    }
+
+
+@login_required
+def customer_orders(request):
+    """Customer orders analytics."""
+    params = _filter_params(request, ['seller', 'type', 'date_from', 'date_to'])
+
     context = {
-        'customer_metrics': customer_metrics,
-        'sellers': sellers,
-        'selected_seller': seller_code,
-        'selected_type': order_type,
-        'date_from': date_from,
-        'date_to': date_to,
+        **dashboard_cache.cached_dashboard('customer_orders', params),
+        **_filter_context(params),
     }
 
     return render(request, 'core/customer_orders.html', context)
 
 
-@login_required
-def sellers_kpi_dashboard(request):
-    """Sellers KPI Dashboard with key metrics."""
+@dashboard_cache.register('sellers_kpi_dashboard')
+def _sellers_kpi_data(params):
     # Basic counts
     total_sellers = Seller.objects.count()
     total_bills = VendorBill.objects.count()
@@ -878,7 +742,13 @@ def sellers_kpi_dashboard(request):
         'most_active_seller': most_active_seller,
         'oldest_bill': oldest_bill,
         'bills_with_data': bills_with_data,
-        'seller_totals': seller_totals[:10],
+        'seller_totals': list(seller_totals[:10]),
     }
+    return context
 
+
+@login_required
+def sellers_kpi_dashboard(request):
+    """Sellers KPI Dashboard with key metrics."""
+    context = dashboard_cache.cached_dashboard('sellers_kpi_dashboard', {})
     return render(request, 'core/sellers_kpi_dashboard.html', context)
@@ -56,6 +56,8 @@ CRON_CLASSES = [
     "core.cron.SyncSellersCronJob",
     "core.cron.SyncOrdersCronJob",
     "core.cron.SyncBillsCronJob",
+    "core.cron.CleanupSyncLogsCronJob",
+    "core.cron.DrainOrderEventsCronJob",
 ]
 
 MIDDLEWARE = [
@@ -173,6 +175,96 @@ MEDIA_ROOT = BASE_DIR / 'media'
 
 # Omniful API Configuration
 OMNIFUL_ACCESS_TOKEN = config('OMNIFUL_ACCESS_TOKEN', default='')
+# Point this at a local stand-in server to run syncs without production
+OMNIFUL_BASE_URL = config(
+    'OMNIFUL_BASE_URL', default='https://prodapi.omniful.com/sales-channel/public/v1')
+OMNIFUL_TIMEOUT = config('OMNIFUL_TIMEOUT', default=30, cast=float)
+OMNIFUL_POOL_SIZE = config('OMNIFUL_POOL_SIZE', default=20, cast=int)
+OMNIFUL_MAX_RETRIES = config('OMNIFUL_MAX_RETRIES', default=3, cast=int)
+OMNIFUL_BACKOFF_BASE = config('OMNIFUL_BACKOFF_BASE', default=0.5, cast=float)
+OMNIFUL_BACKOFF_MAX = config('OMNIFUL_BACKOFF_MAX', default=30, cast=float)
+OMNIFUL_CIRCUIT_THRESHOLD = config(
+    'OMNIFUL_CIRCUIT_THRESHOLD', default=5, cast=int)
+OMNIFUL_CIRCUIT_RESET = config('OMNIFUL_CIRCUIT_RESET', default=30, cast=float)
+# Requests per second ceiling for each endpoint family; the client adapts
+# below these based on 429/503 responses and Retry-After headers
+OMNIFUL_RATE_LIMITS = {
+    'sellers': config('OMNIFUL_RATE_SELLERS', default=5, cast=float),
+    'orders': config('OMNIFUL_RATE_ORDERS', default=10, cast=float),
+    'bills': config('OMNIFUL_RATE_BILLS', default=5, cast=float),
+    'default': config('OMNIFUL_RATE_DEFAULT', default=5, cast=float),
+}
+# Minutes the local seller table is trusted before order and bill syncs
+# re-fetch /tenants/sellers themselves
+SELLER_CATALOG_TTL = config('SELLER_CATALOG_TTL', default=120, cast=int)
+
+# Commands the web pages may queue for the run_jobs worker, with how many
+# of each may run at once across all workers
+JOB_CONCURRENCY = {
+    'sync_sellers': 1,
+    'sync_orders': 1,
+    'sync_all_orders': config('JOB_CONCURRENCY_SYNC_ALL_ORDERS', default=1, cast=int),
+    'sync_bills': 1,
+    'refresh_bill': config('JOB_CONCURRENCY_REFRESH_BILL', default=4, cast=int),
+    'fix_bill_dates': 1,
+    'fix_all_dates': 1,
+    'drain_order_events': 1,
+}
+# Seconds an idle run_jobs worker waits before looking for new jobs
+JOB_POLL_INTERVAL = config('JOB_POLL_INTERVAL', default=2, cast=float)
+# Seconds a running job may go without a worker heartbeat before it is
+# failed and stops counting against its limit (workers beat every third)
+JOB_HEARTBEAT_TTL = config('JOB_HEARTBEAT_TTL', default=300, cast=int)
+
+# Seconds a live progress/log stream stays open before EventSource
+# reconnects; each open stream holds a web worker (a whole one under sync
+# gunicorn workers), so keep it short
+LIVE_STREAM_SECONDS = config('LIVE_STREAM_SECONDS', default=25, cast=int)
+
+# Shared secret of the Omniful order webhook (disabled while empty) and how
+# many seconds a signed request stays valid
+OMNIFUL_WEBHOOK_SECRET = config('OMNIFUL_WEBHOOK_SECRET', default='')
+OMNIFUL_WEBHOOK_TOLERANCE = config('OMNIFUL_WEBHOOK_TOLERANCE', default=300, cast=int)
+
+# Scheduled order sync: each seller is polled about every
+# ORDER_SYNC_TARGET_ORDERS new orders (by its rate over the last
+# ORDER_SYNC_VELOCITY_HOURS), between the min and max interval in minutes,
+# and all intervals stretch when the total would pass the hourly budget of
+# order API requests
+ORDER_SYNC_TARGET_ORDERS = config('ORDER_SYNC_TARGET_ORDERS', default=50, cast=int)
+ORDER_SYNC_VELOCITY_HOURS = config('ORDER_SYNC_VELOCITY_HOURS', default=72, cast=int)
+ORDER_SYNC_MIN_INTERVAL = config('ORDER_SYNC_MIN_INTERVAL', default=5, cast=int)
+ORDER_SYNC_MAX_INTERVAL = config('ORDER_SYNC_MAX_INTERVAL', default=24 * 60, cast=int)
+ORDER_SYNC_REQUEST_BUDGET = config('ORDER_SYNC_REQUEST_BUDGET', default=600, cast=int)
+
+# Seconds a sync holds its lease without renewing it before another run may
+# take over (a running sync renews it every third of this)
+SYNC_LEASE_TTL = config('SYNC_LEASE_TTL', default=300, cast=int)
+# Seconds a sync waits for a run with other options (e.g. sync_all_orders
+# holding the order lease) before it is skipped; keep it short, since cron
+# runs the scheduled sync in the same process as the other cron jobs
+SYNC_LEASE_WAIT = config('SYNC_LEASE_WAIT', default=30, cast=int)
+
+# Cache backend; dashboard caching only spans processes with a shared one
+# (e.g. django.core.cache.backends.redis.RedisCache)
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default=''),
+    }
+}
+
+# Dashboard data cache: seconds an entry of the current data version is
+# served (0 disables the cache), seconds the last copy is kept to serve
+# while it is recomputed, and whether syncs recompute the unfiltered
+# dashboards once they finish
+DASHBOARD_CACHE_TTL = config('DASHBOARD_CACHE_TTL', default=300, cast=int)
+DASHBOARD_CACHE_STALE_TTL = config('DASHBOARD_CACHE_STALE_TTL', default=86400, cast=int)
+DASHBOARD_CACHE_WARM = config('DASHBOARD_CACHE_WARM', default=False, cast=bool)
+
+# Days of sync run logs and job progress kept by cleanup_sync_logs (the last run of each sync
+# is always kept)
+SYNC_LOG_RETENTION_DAYS = config('SYNC_LOG_RETENTION_DAYS', default=14, cast=int)
 
 # Login/Logout URLs
 LOGIN_URL = '/accounts/login/'
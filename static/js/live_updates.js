@@ -0,0 +1,166 @@
+/**
+ * Live sync progress and logs.
+ *
+ * Listens to the server's Server-Sent Events stream and, when the browser
+ * or a proxy can't keep one open, falls back to polling the JSON endpoint
+ * with adaptive backoff: quick while things change, slower while idle or
+ * failing, and slowest while the tab is hidden.
+ */
+const LiveUpdates = (function () {
+    const MIN_DELAY = 1000;
+    const MAX_DELAY = 30000;
+
+    /**
+     * Call fetchUrl() repeatedly; handle(data) returns 'stop', true
+     * (something changed) or false (nothing new).
+     */
+    function poll(fetchUrl, handle) {
+        let delay = MIN_DELAY;
+        let timer = null;
+        let stopped = false;
+
+        function schedule() {
+            if (!stopped) {
+                timer = setTimeout(tick, document.hidden ? MAX_DELAY : delay);
+            }
+        }
+
+        function tick() {
+            fetch(fetchUrl(), { headers: { 'Accept': 'application/json' } })
+                .then(response => {
+                    if (!response.ok) throw new Error(response.status);
+                    return response.json();
+                })
+                .then(data => {
+                    const result = handle(data);
+                    if (result === 'stop') {
+                        stopped = true;
+                        return;
+                    }
+                    delay = result ? MIN_DELAY : Math.min(delay * 1.5, MAX_DELAY);
+                    schedule();
+                })
+                .catch(() => {
+                    delay = Math.min(delay * 2, MAX_DELAY);
+                    schedule();
+                });
+        }
+
+        tick();
+        return { close: () => { stopped = true; clearTimeout(timer); } };
+    }
+
+    /**
+     * Open an EventSource with the given handlers, or return null when the
+     * browser has no EventSource. onFallback runs if the stream can't be
+     * established.
+     */
+    function stream(url, handlers, onFallback) {
+        if (!window.EventSource) return null;
+
+        const source = new EventSource(url);
+        let opened = false;
+        let fallback = null;
+        source.addEventListener('open', () => { opened = true; });
+        Object.keys(handlers).forEach(name => {
+            source.addEventListener(name, event => handlers[name](JSON.parse(event.data), source));
+        });
+        source.addEventListener('error', () => {
+            // After a normal end of stream EventSource reconnects by itself
+            if (!opened || source.readyState === EventSource.CLOSED) {
+                source.close();
+                if (!fallback) fallback = onFallback();
+            }
+        });
+        return {
+            close: () => {
+                source.close();
+                if (fallback) fallback.close();
+            }
+        };
+    }
+
+    /** Follow a progress dict; onUpdate gets the merged state each time. */
+    function progress(options) {
+        const state = {};
+
+        function startPolling() {
+            return poll(() => options.pollUrl, data => {
+                let changed = false;
+                Object.keys(data).forEach(key => {
+                    if (state[key] !== data[key]) {
+                        state[key] = data[key];
+                        changed = true;
+                    }
+                });
+                if (changed) options.onUpdate(state);
+                if (state.is_complete) {
+                    if (options.onDone) options.onDone(state);
+                    return 'stop';
+                }
+                return changed;
+            });
+        }
+
+        return stream(options.sseUrl, {
+            progress: delta => {
+                Object.assign(state, delta);
+                options.onUpdate(state);
+            },
+            done: (_, source) => {
+                source.close();
+                if (options.onDone) options.onDone(state);
+            },
+        }, startPolling) || startPolling();
+    }
+
+    /**
+     * Follow the log of the latest run of a sync. Runs listed in
+     * options.skipRun (e.g. the one already on the page) are waited out.
+     */
+    function logs(options) {
+        const skip = options.skipRun ? '?skip_run=' + encodeURIComponent(options.skipRun) : '';
+        let runId = null;
+        let seq = 0;
+
+        function startPolling() {
+            return poll(() => {
+                const params = new URLSearchParams({ after: seq });
+                if (runId) params.set('run', runId);
+                if (options.skipRun) params.set('skip_run', options.skipRun);
+                return options.pollUrl + '?' + params.toString();
+            }, data => {
+                if (!data.run_id) return false;
+                if (data.run_id !== runId) {
+                    runId = data.run_id;
+                }
+                seq = data.seq;
+                if (data.lines.length) options.onLines(data.lines);
+                if (data.completed) {
+                    if (options.onDone) options.onDone(data);
+                    return 'stop';
+                }
+                return data.lines.length > 0;
+            });
+        }
+
+        return stream(options.sseUrl + skip, {
+            log: data => options.onLines(data.lines),
+            done: (data, source) => {
+                source.close();
+                if (options.onDone) options.onDone(data);
+            },
+        }, startPolling) || startPolling();
+    }
+
+    /** Wait for a queued job (core:job_status) to finish. */
+    function job(options) {
+        return poll(() => options.url, data => {
+            if (!data.completed) return false;
+            options.onDone(data);
+            return 'stop';
+        });
+    }
+
+    return { progress: progress, logs: logs, job: job };
+})();